@@ -1,11 +1,27 @@
+from .async_context import AsyncContext
 from .container import Container
 from .context import Context
-from .exc import ResourceNotProvidedError
+from .current import aresolve, current_context, resolve
+from .exc import (
+    CircularDependencyError,
+    NoCurrentContextError,
+    ResourceNotProvidedError,
+)
+from .injection import inject
+from .lazy import Lazy
 from .resource import Resource
 
 __all__ = [
+    "AsyncContext",
+    "CircularDependencyError",
     "Context",
     "Container",
+    "Lazy",
+    "NoCurrentContextError",
     "Resource",
     "ResourceNotProvidedError",
+    "aresolve",
+    "current_context",
+    "inject",
+    "resolve",
 ]
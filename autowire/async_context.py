@@ -0,0 +1,596 @@
+"""
+autowire.async_context
+======================
+
+Resource management context for asyncio.
+
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import itertools
+import threading
+import time
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from autowire.base_container import BaseContainer
+from autowire.base_resource import BaseResource
+from autowire.cache import MISSING
+from autowire.context import Context, Snapshot, TransientKey, reifying
+from autowire.current import activate
+from autowire.drain import (
+    Deadlines,
+    DrainReport,
+    arelease_managers,
+    chain_exception,
+)
+from autowire.injection import find_injection
+from autowire.metrics import Metrics
+from autowire.observer import Observer
+from autowire.plan import PlanStep, ResolutionPlan, merge_plans
+from autowire.scope import Scope
+from autowire.warmup import WarmUp
+
+R = TypeVar("R")
+
+_MISSING: Any = MISSING
+_TRANSIENT = Scope.TRANSIENT
+
+
+class AsyncContext(Context, AsyncContextManager["AsyncContext"]):
+    """
+    Resource management context that can resolve asynchronous resources.
+
+    Synchronous resources can be resolved with :meth:`resolve` as well,
+    but asynchronous ones can only be resolved by :meth:`aresolve`.
+
+    """
+
+    def __init__(
+        self,
+        container: BaseContainer,
+        parent: Optional[AsyncContext],
+        observer: Optional[Observer] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        super().__init__(container, parent, observer=observer, metrics=metrics)
+        # Resources being created by this context
+        self._pending: Dict[BaseResource[Any], asyncio.Future[Any]] = {}
+
+    async def aresolve(self, resource: BaseResource[R]) -> R:
+        """
+        Resolve resource in this context asynchronously.
+
+        Dependencies that don't depend on each other are resolved
+        concurrently.
+
+        """
+        observer = self.observer
+        if observer is not None:
+            resolved = self._lookup_observed(resource)
+        else:
+            resolved = self._lookup(resource)
+        if resolved is not _MISSING:
+            return resolved
+        pending = self._pending.get(resource)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        # Create new resource if pooled resource not found
+        if observer is None:
+            return await self._aexecute(self.container.find_plan(resource))
+        observer.on_resolve_start(self, resource)
+        try:
+            return await self._aexecute(self.container.find_plan(resource))
+        finally:
+            observer.on_resolve_end(self, resource)
+
+    async def acall(self, fn: Callable[..., Any], *args: Any, **kwargs: Any):
+        """
+        Call the function decorated by :func:`~autowire.injection.inject`,
+        injecting resources resolved in this context asynchronously. ::
+
+            @inject(session=http_session)
+            async def fetch(url: str, *, session: ClientSession) -> bytes:
+                ...
+
+            body = await context.acall(fetch, "https://example.com")
+
+        Both of coroutine functions and plain functions can be called.
+        Arguments given explicitly win over injected ones, like
+        :meth:`~autowire.context.Context.call`.
+
+        """
+        injection = find_injection(fn)
+        arg_resources = injection.arg_resources
+        kwarg_resources = injection.kwarg_resources
+        if kwargs or (args and injection.positions):
+            arg_resources, kwarg_resources, args = injection.arrange(
+                args, kwargs
+            )
+        for name, resource in kwarg_resources:
+            kwargs[name] = await self.aresolve(resource)
+        if arg_resources:
+            args = (
+                *[await self.aresolve(resource) for resource in arg_resources],
+                *args,
+            )
+        result = fn(*args, **kwargs)
+        if injection.asynchronous:
+            return await result
+        return result
+
+    async def adrain(self):
+        """
+        Drain all resources resolved by this context asynchronously.
+
+        Resources are released in reverse order of their creation after all
+        children are drained. Resources being warmed up are waited for.
+
+        """
+        if self.warming is not None:
+            self.warming.cancel()
+            await self.warming.ajoin()
+        if self._pending:
+            # Wait for resources being created
+            await asyncio.gather(
+                *self._pending.values(), return_exceptions=True
+            )
+
+        exc: Optional[BaseException] = None
+        while self.children:
+            child = self.children.pop()
+            try:
+                if isinstance(child, AsyncContext):
+                    await child.adrain()
+                else:
+                    child.drain()
+            except BaseException as e:
+                exc = chain_exception(e, exc)
+
+        exc = await arelease_managers(
+            self._pop_entries(), exc, self._exit_reporter()
+        )
+        self._caches.clear()
+
+        if exc is not None:
+            raise exc
+
+    async def adrain_concurrently(
+        self,
+        timeout: Optional[float] = None,
+        resource_timeout: Optional[float] = None,
+    ) -> DrainReport:
+        """
+        Drain all resources resolved by this context asynchronously,
+        releasing resources that don't depend on each other concurrently.
+
+        It works like :meth:`~autowire.context.Context.drain_concurrently`.
+        Asynchronous resources are released by tasks, which are cancelled on
+        timeout, and others are released on their own daemon threads, so that
+        hung ones don't block the event loop or the process from exiting.
+
+        """
+        report = DrainReport()
+        deadlines = Deadlines(timeout, resource_timeout)
+        if self.warming is not None:
+            self.warming.cancel()
+            await self.warming.ajoin(deadlines.remaining())
+        if self._pending:
+            # Wait for resources being created
+            await asyncio.wait(
+                list(self._pending.values()), timeout=deadlines.remaining()
+            )
+        while self.children:
+            child = self.children.pop()
+            if isinstance(child, AsyncContext):
+                report.merge(
+                    await child.adrain_concurrently(
+                        deadlines.remaining(), resource_timeout
+                    )
+                )
+            else:
+                report.merge(
+                    child.drain_concurrently(
+                        deadlines.remaining(), resource_timeout
+                    )
+                )
+
+        loop = asyncio.get_running_loop()
+        graph = self._take_release_graph()
+        pending = {
+            i for i in range(len(graph)) if graph.managers[i] is not None
+        }
+        tasks: Dict[asyncio.Future[Any], int] = {}
+
+        def exit_on_thread(i: int, exited: asyncio.Future[Any]):
+            try:
+                graph.managers[i].__exit__(None, None, None)
+            except BaseException as e:
+                error: Optional[BaseException] = e
+            else:
+                error = None
+            try:
+                loop.call_soon_threadsafe(_settle, exited, error)
+            except RuntimeError:
+                # The event loop is closed after the release timed out
+                pass
+
+        async def release(i: int) -> Tuple[Optional[BaseException], float]:
+            manager = graph.managers[i]
+            start = time.perf_counter()
+            try:
+                if hasattr(manager, "__aexit__"):
+                    await manager.__aexit__(None, None, None)
+                else:
+                    exited = loop.create_future()
+                    threading.Thread(
+                        target=exit_on_thread,
+                        args=(i, exited),
+                        name=f"autowire-drain-{graph.name(i)}",
+                        daemon=True,
+                    ).start()
+                    return await exited, time.perf_counter() - start
+            except asyncio.CancelledError:
+                raise
+            except BaseException as e:
+                return e, time.perf_counter() - start
+            return None, time.perf_counter() - start
+
+        while True:
+            while graph.ready and not deadlines.expired():
+                i = graph.ready.pop()
+                if i not in pending:
+                    graph.finish(i)
+                    continue
+                deadlines.start_resource(i)
+                tasks[asyncio.ensure_future(release(i))] = i
+            if not tasks or deadlines.expired():
+                break
+            finished, _ = await asyncio.wait(
+                tasks,
+                timeout=deadlines.next_timeout(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in finished:
+                i = tasks.pop(task)
+                del deadlines.running[i]
+                pending.discard(i)
+                exc, seconds = task.result()
+                if exc is None:
+                    report.released.append(graph.name(i))
+                else:
+                    report.failed.append((graph.name(i), exc))
+                self._report_exit(graph.resources[i], seconds, exc)
+                graph.finish(i)
+            overdue = set(deadlines.overdue())
+            for task, i in list(tasks.items()):
+                if i in overdue:
+                    task.cancel()
+                    del tasks[task]
+                    del deadlines.running[i]
+                    pending.discard(i)
+                    report.timed_out.append(graph.name(i))
+                    graph.finish(i)
+
+        # Left behind on timeout
+        for task in tasks:
+            task.cancel()
+        report.timed_out.extend(
+            graph.name(i) for i in sorted(pending, reverse=True)
+        )
+        self._caches.clear()
+        report.seconds = time.monotonic() - deadlines.start
+        return report
+
+    @contextlib.asynccontextmanager
+    async def async_child(
+        self,
+        preload: Sequence[BaseResource] = (),
+        parallel: bool = False,
+        snapshot: Optional[Snapshot] = None,
+    ) -> AsyncIterator[AsyncContext]:
+        """
+        Create an asynchronous child context, which is current in the
+        block ::
+
+            async with context.async_child() as child:
+                value = await child.aresolve(resource)
+                ...
+
+        :param preload: resources to be preloaded
+        :param parallel: preload independent resources concurrently
+        :param snapshot: snapshot taken by
+                         :meth:`~autowire.context.Context.snapshot` to start
+                         with
+        """
+        child = AsyncContext(self.container, self)
+        if snapshot is not None:
+            child.resource_pool = snapshot.fork()
+        self.children.append(child)
+        try:
+            async with child:
+                await child.apreload(preload, parallel=parallel)
+                with activate(child):
+                    yield child
+        finally:
+            self._forget_child(child)
+
+    async def apreload(
+        self, resources: Sequence[BaseResource], parallel: bool = False
+    ):
+        """
+        Resolve resources in advance asynchronously.
+
+        If ``parallel`` is true, resources that don't depend on each other
+        will be created concurrently. Created resources are still pooled in
+        dependency order, so that they are drained in reverse order as usual.
+
+        """
+        if not parallel:
+            for resource in resources:
+                await self.aresolve(resource)
+            return
+
+        created = len(self.resource_pool)
+        results = await asyncio.gather(
+            *(self.aresolve(resource) for resource in resources),
+            return_exceptions=True,
+        )
+        # Reorder created resources in the deterministic topological order,
+        # with entries of transient and cached resources created by each step
+        steps, _ = merge_plans(
+            [self.container.find_plan(resource) for resource in resources]
+        )
+        fresh: Dict[BaseResource[Any], List[Any]] = {}
+        for key in itertools.islice(self.resource_pool, created, None):
+            resource = key.resource if isinstance(key, TransientKey) else key
+            fresh.setdefault(resource, []).append(key)
+        for step in steps:
+            for key in fresh.pop(step.resource, ()):
+                self.resource_pool.move_to_end(key)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def awarm_up(
+        self, resources: Optional[Sequence[BaseResource[Any]]] = None
+    ) -> WarmUp:
+        """
+        Start creating resources in background tasks, returning their
+        progress. ::
+
+            async with container.async_context() as context:
+                warming = await context.awarm_up()
+                await serve(context, ready=warming.ready)
+
+        If no resources are given, ones marked as eager are created. See
+        :meth:`~autowire.base_container.BaseContainer.eager_resources`.
+        Resolving resources being created waits for them instead of creating
+        them again.
+
+        """
+        if resources is None:
+            resources = self.container.eager_resources()
+        if self.warming is None:
+            self.warming = WarmUp()
+        for resource in resources:
+            self.warming.track(
+                resource, asyncio.ensure_future(self.aresolve(resource))
+            )
+        return self.warming
+
+    #
+    # Asynchronous context manager implementation
+    #
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type_, value, traceback):
+        await self.adrain()
+
+    #
+    # Privates
+    #
+
+    async def _aexecute(self, plan: ResolutionPlan) -> Any:
+        # Execute the resolution plan, creating each resource as soon as its
+        # dependencies are ready.
+        last = len(plan.steps) - 1
+        values, needed = self._prepare(plan.steps, (last,), last)
+        if values[last] is not _MISSING:
+            # Held by its cache policy
+            return values[last]
+        tasks: Dict[int, asyncio.Future[Any]] = {}
+        for i, step in enumerate(plan.steps):
+            if not needed[i] or values[i] is not _MISSING:
+                continue
+            transient = step.scope is _TRANSIENT
+            task = None if transient else self._pending.get(step.resource)
+            if task is None:
+                waits = [
+                    tasks[slot]
+                    for slot in step.dependency_slots
+                    if slot in tasks
+                ]
+                # Dependencies are observed as nested resolutions
+                nested = (
+                    self.observer is not None
+                    and i != last
+                    and not self._delegates(step)
+                )
+                task = asyncio.ensure_future(
+                    self._acreate(step, values, tasks, waits, nested)
+                )
+                if not transient:
+                    self._pending[step.resource] = task
+                    task.add_done_callback(
+                        functools.partial(self._discard_pending, step.resource)
+                    )
+            tasks[i] = task
+
+        # Wait for all tasks, so that nothing is left being created even if
+        # some of them failed. They may be shared with other resolutions, so
+        # cancelling this one must not cancel them.
+        await asyncio.shield(
+            asyncio.gather(*tasks.values(), return_exceptions=True)
+        )
+        return tasks[len(plan.steps) - 1].result()
+
+    def _after_fork(self, sensitive: Callable[[BaseResource[Any]], bool]):
+        super()._after_fork(sensitive)
+        # Event loops are not carried over to forked child processes
+        self._pending.clear()
+
+    def _discard_pending(
+        self, resource: BaseResource[Any], task: asyncio.Future[Any]
+    ):
+        self._pending.pop(resource, None)
+
+    async def _acreate(
+        self,
+        step: PlanStep,
+        values: List[Any],
+        tasks: Dict[int, asyncio.Future[Any]],
+        waits: List[asyncio.Future[Any]],
+        nested: bool = False,
+    ) -> Any:
+        if waits:
+            await asyncio.gather(*waits)
+        if not nested:
+            return await self._acreate_step(step, values, tasks)
+
+        observer = self.observer
+        assert observer is not None
+        observer.on_resolve_start(self, step.resource)
+        try:
+            return await self._acreate_step(step, values, tasks)
+        finally:
+            observer.on_resolve_end(self, step.resource)
+
+    async def _acreate_step(
+        self,
+        step: PlanStep,
+        values: List[Any],
+        tasks: Dict[int, asyncio.Future[Any]],
+    ) -> Any:
+        resource = step.resource
+        if self._delegates(step):
+            root = self.root
+            if isinstance(root, AsyncContext):
+                return await root.aresolve(resource)
+            return root.resolve(resource)
+        if step.cache is not None:
+            cached = self._lookup_cached(step, True)
+            if cached is not _MISSING:
+                return cached
+        elif step.scope is not _TRANSIENT:
+            entry = self.resource_pool.get(resource)
+            if entry is not None:
+                # Already created while reifying other resources
+                return entry[0]
+
+        observer = self.observer
+        metrics = self.metrics
+        timed = observer is not None or (
+            metrics is not None and metrics.timings
+        )
+        manager: Any
+        if step.factory is None:
+            start = time.perf_counter() if timed else 0.0
+            resolved, manager = await self._areify_opaque(step)
+            if timed:
+                # Opaque implementations are reported as entered in no time
+                self._report_creation(
+                    resource,
+                    time.perf_counter() - start,
+                    None if manager is None else 0.0,
+                )
+            elif metrics is not None:
+                metrics.record_creation(resource, manager is not None)
+        else:
+
+            def value_of(slot: int) -> Any:
+                value = values[slot]
+                return tasks[slot].result() if value is _MISSING else value
+
+            start = time.perf_counter() if timed else 0.0
+            manager = step.factory(
+                *[value_of(slot) for slot in step.arg_slots],
+                **{name: value_of(slot) for name, slot in step.kwarg_slots},
+            )
+            reified = time.perf_counter() if timed else 0.0
+            if observer is not None:
+                observer.on_reify(self, resource, reified - start)
+            if not step.managed:
+                # The factory returned the resource itself
+                resolved, manager = manager, None
+                if metrics is not None:
+                    metrics.record_creation(resource, False, reified - start)
+            else:
+                if step.asynchronous:
+                    resolved = await manager.__aenter__()
+                else:
+                    resolved = manager.__enter__()
+                if timed:
+                    entered = time.perf_counter() - reified
+                    if observer is not None:
+                        observer.on_enter(self, resource, entered)
+                    if metrics is not None:
+                        metrics.record_creation(
+                            resource, True, reified - start, entered
+                        )
+                elif metrics is not None:
+                    metrics.record_creation(resource, True)
+        if step.cache is not None:
+            await self._arelease_evicted(
+                self._cache(step, (resolved, manager))
+            )
+            return resolved
+        # throw into resource pool
+        self._pool(step, (resolved, manager))
+        return resolved
+
+    async def _areify_opaque(self, step: PlanStep) -> Tuple[Any, Any]:
+        # Reify the implementation that resolves its own dependencies like
+        # _reify_opaque, entering asynchronous context managers it returns,
+        # like leases of pools, without blocking the event loop.
+        with reifying(step.resource):
+            if not step.managed:
+                return step.implementation.create(step.resource, self), None
+            manager: Any = step.implementation.reify(step.resource, self)
+            if hasattr(manager, "__aenter__"):
+                return await manager.__aenter__(), manager
+            return manager.__enter__(), manager
+
+    async def _arelease_evicted(self, keys: List[TransientKey]):
+        def evicted() -> Iterator[Tuple[TransientKey, Any]]:
+            for key in keys:
+                entry = self.resource_pool.pop(key, None)
+                if entry is not None:
+                    yield key, entry[1]
+
+        exc = await arelease_managers(evicted(), report=self._exit_reporter())
+        if exc is not None:
+            raise exc
+
+
+def _settle(future: asyncio.Future[Any], error: Optional[BaseException]):
+    # Report the result of a release on a thread, unless it timed out
+    if not future.done():
+        future.set_result(error)
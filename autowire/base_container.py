@@ -8,21 +8,40 @@ Base definitions of autowire.
 from __future__ import annotations
 
 import abc
-from typing import Any, Callable, ContextManager, Dict, Optional, TypeVar
+import collections
+import itertools
+import weakref
+from typing import (
+    Any,
+    AsyncContextManager,
+    Callable,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
 from autowire.base_resource import BaseResource
-from autowire.exc import ResourceNotProvidedError
+from autowire.exc import ResourceNotProvidedError, ValidationError
+from autowire.graph import DependencyGraph, build_graph
 from autowire.implementation import (
+    AsyncContextManagerImplementation,
     ConstantImplementation,
     ContextManagerImplementation,
     Implementation,
     PlainFunctionImplementation,
 )
+from autowire.lazy import Lazy
+from autowire.plan import PlanStep, ResolutionPlan, compile_plan, merge_plans
 from autowire.resource import Resource
 
 R = TypeVar("R")
 F = TypeVar("F", bound=Callable[..., Any])
 C = TypeVar("C", bound=Callable[..., ContextManager[Any]])
+A = TypeVar("A", bound=Callable[..., AsyncContextManager[Any]])
 
 
 class BaseContainer(abc.ABC):
@@ -31,10 +50,27 @@ class BaseContainer(abc.ABC):
 
     """
 
+    #: Number of merged plans kept by :meth:`find_batch_plan`, least recently
+    #: used ones are discarded first
+    max_batch_plans = 128
+
     def __init__(self, parent: Optional[BaseContainer] = None):
         super().__init__()
         self.parent = parent
         self.implementations: Dict[BaseResource[Any], Implementation[Any]] = {}
+        self._plans: Dict[BaseResource[Any], ResolutionPlan] = {}
+        self._batch_plans: collections.OrderedDict[
+            Tuple[BaseResource[Any], ...], Tuple[List[PlanStep], List[int]]
+        ] = collections.OrderedDict()
+        self._graph: Optional[DependencyGraph] = None
+        # Implementations found from this container and its ancestors
+        self._resolved_implementations: Dict[
+            BaseResource[Any], Implementation[Any]
+        ] = {}
+        self._defaults_version = Resource.defaults_version
+        self._children: weakref.WeakSet[BaseContainer] = weakref.WeakSet()
+        if parent is not None:
+            parent._children.add(self)
 
     def provide(
         self, resource: Resource[R], implementation: Implementation[R]
@@ -44,27 +80,254 @@ class BaseContainer(abc.ABC):
 
         """
         self.implementations[resource] = implementation
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Discard compiled resolution plans and cached implementations of this
+        container and its descendants.
+
+        It is called whenever :meth:`provide` changes the dependency graph.
+
+        """
+        self._plans.clear()
+        self._batch_plans.clear()
+        self._resolved_implementations.clear()
+        self._graph = None
+        self._defaults_version = Resource.defaults_version
+        for child in list(self._children):
+            child.invalidate()
+
+    def compile(self, *resources: BaseResource[Any]):
+        """
+        Compile resolution plans of resources ahead of time.
+
+        If no resources are given, every resource provided to this container
+        and its ancestors will be compiled. ::
+
+            container.compile()
+
+            with container.context() as context:
+                # Resolves without looking up implementations one by one
+                context.resolve(db_connection)
+
+        Plans are discarded when the dependency graph changes, and will be
+        compiled again on next resolution.
+
+        """
+        for resource in resources or self.provided_resources():
+            self.find_plan(resource)
+
+    def provided_resources(self) -> Tuple[BaseResource[Any], ...]:
+        """
+        Resources provided to this container and its ancestors.
+
+        """
+        containers: List[BaseContainer] = []
+        container: Optional[BaseContainer] = self
+        while container is not None:
+            containers.append(container)
+            container = container.parent
+        return tuple(
+            dict.fromkeys(
+                itertools.chain.from_iterable(
+                    c.implementations for c in containers
+                )
+            )
+        )
+
+    def eager_resources(self) -> Tuple[Resource[Any], ...]:
+        """
+        Resources marked as eager among ones provided to this container and
+        its ancestors, and their dependencies implemented by default
+        implementations.
+
+        """
+        return tuple(
+            resource
+            for resource in self.dependency_graph().dependencies
+            if isinstance(resource, Resource) and resource.eager
+        )
+
+    def dependency_graph(self) -> DependencyGraph:
+        """
+        Dependency graph of every resource provided to this container and
+        its ancestors, including their dependencies that are implemented by
+        default implementations.
+
+        The graph is built again after the dependency graph changes.
+
+        """
+        if self._defaults_version != Resource.defaults_version:
+            self.invalidate()
+        if self._graph is None:
+            self._graph = build_graph(self, self.provided_resources())
+        return self._graph
+
+    def check_cycles(self):
+        """
+        Check circular dependencies of the whole dependency graph in linear
+        time. ::
+
+            container.check_cycles()
+
+        :raises autowire.exc.CircularDependencyError: if any resource
+                                                      depends on itself.
+
+        """
+        self.dependency_graph().check_cycles()
+
+    def validate(
+        self, *resources: BaseResource[Any], check_signatures: bool = False
+    ):
+        """
+        Verify the whole dependency graph at once, so that problems are found
+        at startup rather than in the middle of a request. ::
+
+            container.validate(check_signatures=True)
+
+        Every resource provided to this container and its ancestors, or given
+        resources, and all of their dependencies are checked to be provided
+        and not to depend on themselves. If ``check_signatures`` is true,
+        declared dependencies are checked to be injectable to factories as
+        well.
+
+        It takes linear time to the size of the dependency graph.
+
+        :raises autowire.exc.ValidationError: with all problems found.
+
+        """
+        if resources:
+            graph = build_graph(self, resources)
+        else:
+            graph = self.dependency_graph()
+
+        problems: List[str] = []
+        dependents: Dict[BaseResource[Any], List[str]] = {
+            resource: [] for resource in graph.missing
+        }
+        for resource, dependencies in graph.dependencies.items():
+            for dependency in dependencies:
+                if dependency in dependents:
+                    dependents[dependency].append(resource.canonical_name)
+        for resource, names in sorted(
+            dependents.items(), key=lambda item: item[0].canonical_name
+        ):
+            problem = f"{resource.canonical_name} is not provided"
+            if names:
+                problem += f" (required by {', '.join(names)})"
+            problems.append(problem)
+
+        cycle = graph.find_cycle()
+        if cycle is not None:
+            problems.append(
+                "Circular dependency: "
+                + " -> ".join(resource.canonical_name for resource in cycle)
+            )
+
+        if check_signatures:
+            for impl in graph.implementations.values():
+                try:
+                    impl.check_signature()
+                except TypeError as e:
+                    problems.append(str(e))
+
+        if problems:
+            raise ValidationError(
+                "Invalid dependency graph",
+                sorted(resource.canonical_name for resource in graph.missing),
+                problems,
+            )
+
+    def find_plan(self, resource: BaseResource[R]) -> ResolutionPlan:
+        """
+        Find the compiled resolution plan of resource.
+
+        The plan will be compiled if it is not compiled yet.
+
+        """
+        if self._defaults_version != Resource.defaults_version:
+            # Default implementation of some resource has been changed
+            self.invalidate()
+        try:
+            return self._plans[resource]
+        except KeyError:
+            plan = self._plans[resource] = compile_plan(self, resource)
+            return plan
+
+    def find_batch_plan(
+        self, resources: Sequence[BaseResource[Any]]
+    ) -> Tuple[List[PlanStep], List[int]]:
+        """
+        Find resolution plans of resources merged by
+        :func:`~autowire.plan.merge_plans`.
+
+        Merged plans are cached as well as the plans of each resource, up to
+        :attr:`max_batch_plans` of them.
+
+        """
+        if self._defaults_version != Resource.defaults_version:
+            # Default implementation of some resource has been changed
+            self.invalidate()
+        key = tuple(resources)
+        batch = self._batch_plans.get(key)
+        if batch is not None:
+            try:
+                self._batch_plans.move_to_end(key)
+            except KeyError:
+                # Discarded by another thread
+                pass
+            return batch
+        batch = merge_plans([self.find_plan(r) for r in key])
+        self._batch_plans[key] = batch
+        while len(self._batch_plans) > self.max_batch_plans:
+            try:
+                self._batch_plans.popitem(last=False)
+            except KeyError:
+                break
+        return batch
 
     def find_implementation(
         self, resource: BaseResource[R]
     ) -> Implementation[R]:
-        if resource in self.implementations:
-            # Find from current container
-            return self.implementations[resource]
-        elif self.parent is not None:
-            # Find from parent container
-            return self.parent.find_implementation(resource)
-        elif (
-            isinstance(resource, Resource)
-            and resource.default_implementation is not None
-        ):
-            # Use default implementation if available
-            return resource.default_implementation
+        """
+        Find the implementation of resource from this container, its
+        ancestors and the default implementation of the resource, in order.
+
+        Found implementations are cached until :meth:`invalidate`, so that
+        the lookup costs the same regardless of the depth of the hierarchy.
+
+        """
+        if self._defaults_version != Resource.defaults_version:
+            # Default implementation of some resource has been changed
+            self.invalidate()
+        try:
+            return self._resolved_implementations[resource]
+        except KeyError:
+            pass
+
+        container: Optional[BaseContainer] = self
+        while container is not None:
+            impl = container.implementations.get(resource)
+            if impl is not None:
+                break
+            container = container.parent
         else:
-            raise ResourceNotProvidedError(
-                "Resource not provided to this context",
-                resource.canonical_name,
-            )
+            if (
+                isinstance(resource, Resource)
+                and resource.default_implementation is not None
+            ):
+                # Use default implementation if available
+                impl = resource.default_implementation
+            elif isinstance(resource, Lazy):
+                impl = resource.implementation
+            else:
+                raise ResourceNotProvidedError(
+                    "Resource not provided to this context",
+                    resource.canonical_name,
+                )
+        self._resolved_implementations[resource] = impl
+        return impl
 
     def plain(
         self,
@@ -140,6 +403,41 @@ class BaseContainer(abc.ABC):
 
         return decorator
 
+    def async_contextual(
+        self,
+        resource: Resource[R],
+        *arg_resources: BaseResource[Any],
+        **kwarg_resources: BaseResource[Any],
+    ) -> Callable[[A], A]:
+        """
+        Provide resource's implementation with asynchronous context manager
+
+        arg_resources and kwarg_resources will be used for dependency injection.
+        The resource can only be resolved by
+        :meth:`~autowire.async_context.AsyncContext.aresolve`.
+
+        ::
+
+            http_session = Resource("http_session", __name__)
+
+            container = Container()
+
+            @container.async_contextual(http_session, config)
+            @contextlib.asynccontextmanager
+            async def with_http_session(config: dict):
+                async with aiohttp.ClientSession(**config) as session:
+                    yield session
+        """
+
+        def decorator(manager: A) -> A:
+            impl: Implementation[R] = AsyncContextManagerImplementation(
+                manager, arg_resources, kwarg_resources
+            )
+            self.provide(resource, impl)
+            return manager
+
+        return decorator
+
     def provide_constant(self, resource: Resource[R], constant: R):
         """
         Provide resource's implementation with constant implementation
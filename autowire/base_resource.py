@@ -8,35 +8,65 @@ class BaseResource(abc.ABC, Generic[R]):
     """
     Decalarative resource definition.
 
+    Resources are immutable, their canonical name and hash are computed once
+    on creation since resources are used as keys of resource pools and
+    implementation maps.
+
     """
 
+    __slots__ = {
+        "name": "Name of resource.",
+        "namespace": "Namespace of resource.",
+        "canonical_name": "Canonical name of resource.\n\n"
+        "It's <namespace>.<name>",
+        "_hash": "Precomputed hash of resource.",
+    }
+
+    name: str
+    namespace: str
+    canonical_name: str
+    _hash: int
+
     def __init__(self, name: str, namespace: str):
         super().__init__()
         if "." in name:
             raise ValueError(
                 "Resource cannot contain a dot(.) in their name", name
             )
-        self.name = name
-        self.namespace = namespace
+        canonical_name = namespace + "." + name
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "namespace", namespace)
+        object.__setattr__(self, "canonical_name", canonical_name)
+        object.__setattr__(self, "_hash", hash((BaseResource, canonical_name)))
 
-    @property
-    def canonical_name(self) -> str:
-        """
-        Canonical name of resource.
+    def __setattr__(self, name, value):
+        if name in BaseResource.__slots__:
+            raise AttributeError(f"Cannot modify {name} of resource", name)
+        super().__setattr__(name, value)
 
-        It's <namespace>.<name>
+    def __delattr__(self, name):
+        if name in BaseResource.__slots__:
+            raise AttributeError(f"Cannot delete {name} of resource", name)
+        super().__delattr__(name)
 
-        """
-        return self.namespace + "." + self.name
+    def __setstate__(self, state):
+        # Restore slots bypassing immutability for pickling & copying
+        _, slots = state
+        for name, value in slots.items():
+            object.__setattr__(self, name, value)
+        # Hash of string differs between processes
+        object.__setattr__(
+            self, "_hash", hash((BaseResource, self.canonical_name))
+        )
 
     def __eq__(self, other):
-        return (
+        return self is other or (
             isinstance(other, BaseResource)
             and self.canonical_name == other.canonical_name
         )
 
     def __hash__(self):
-        return hash((BaseResource, self.canonical_name))
+        return self._hash
 
     def __repr__(self):  # pragma: no cover
         return f"Resource({self.name!r}, {self.namespace!r})"
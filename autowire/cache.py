@@ -0,0 +1,222 @@
+"""
+autowire.cache
+==============
+
+Policies holding resolved resources.
+
+Contexts hold resolved resources strongly until they are drained by
+default. Resources declared with a cache policy are held by the policy
+instead, which may let them go earlier, so that long-lived contexts don't
+keep large resources alive forever. Released resources are created again
+when they are resolved next time.
+
+"""
+from __future__ import annotations
+
+import abc
+import collections
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from autowire.base_resource import BaseResource
+
+#: Marker for resources that are not cached
+MISSING: Any = object()
+
+
+class Cache(abc.ABC):
+    """
+    Resolved resources held by a context for a cache policy.
+
+    Each resource is stored with the key of its context manager in the
+    resource pool of the context, or ``None`` if it has nothing to release.
+    Caches only tell contexts which keys to release.
+
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+    @abc.abstractmethod
+    def get(self, resource: BaseResource[Any]) -> Any:  # pragma: no cover
+        """
+        Find the cached value of the resource, or :data:`MISSING`.
+
+        """
+        pass
+
+    @abc.abstractmethod
+    def put(
+        self,
+        resource: BaseResource[Any],
+        value: Any,
+        key: Optional[Hashable],
+    ) -> List[Hashable]:  # pragma: no cover
+        """
+        Cache the value of the resource, returning keys of resources to be
+        released, including the one replaced by the value.
+
+        """
+        pass
+
+    @abc.abstractmethod
+    def discard(
+        self, predicate: Callable[[BaseResource[Any]], bool]
+    ):  # pragma: no cover
+        """
+        Forget resources matching the predicate without releasing them.
+
+        """
+        pass
+
+
+class CachePolicy(abc.ABC):
+    """
+    Declarative base type for cache policies. ::
+
+        lookup_table = Resource(
+            "lookup_table", __name__, cache=LRUCachePolicy(max_size=4)
+        )
+
+    A policy can be shared by resources, which will be cached together in
+    each context.
+
+    """
+
+    @abc.abstractmethod
+    def create_cache(self) -> Cache:  # pragma: no cover
+        """
+        Create a cache for a context.
+
+        """
+        pass
+
+
+class _WeakCache(Cache):
+    def __init__(self):
+        super().__init__()
+        self.entries: Dict[
+            BaseResource[Any], Tuple[weakref.ref, Optional[Hashable]]
+        ] = {}
+
+    def get(self, resource: BaseResource[Any]) -> Any:
+        with self.lock:
+            entry = self.entries.get(resource)
+        if entry is None:
+            return MISSING
+        value = entry[0]()
+        return MISSING if value is None else value
+
+    def put(
+        self,
+        resource: BaseResource[Any],
+        value: Any,
+        key: Optional[Hashable],
+    ) -> List[Hashable]:
+        try:
+            ref = weakref.ref(value)
+        except TypeError:
+            raise TypeError(
+                "Cannot cache a value without weak reference support",
+                resource.canonical_name,
+                type(value),
+            ) from None
+        with self.lock:
+            # Values of dead references are released when they are replaced
+            previous = self.entries.get(resource)
+            self.entries[resource] = (ref, key)
+            dead = [
+                other
+                for other, (other_ref, _) in self.entries.items()
+                if other_ref() is None and other != resource
+            ]
+            keys = [self.entries.pop(r)[1] for r in dead]
+        if previous is not None:
+            keys.append(previous[1])
+        return [key for key in keys if key is not None]
+
+    def discard(self, predicate: Callable[[BaseResource[Any]], bool]):
+        with self.lock:
+            for resource in [r for r in self.entries if predicate(r)]:
+                del self.entries[resource]
+
+
+class WeakCachePolicy(CachePolicy):
+    """
+    Hold resolved resources by weak references, so that they are released
+    as soon as nothing else refers to them.
+
+    Context managers of resources are released when their resources are
+    resolved again, or when contexts are drained. Since context managers
+    usually refer to their resources, it is meant for resources without
+    teardown, like ones of plain functions. Values that can't be referred
+    weakly, like dicts, can't be cached.
+
+    """
+
+    def create_cache(self) -> Cache:
+        return _WeakCache()
+
+    def __repr__(self):  # pragma: no cover
+        return "WeakCachePolicy()"
+
+
+class _LRUCache(Cache):
+    def __init__(self, max_size: int):
+        super().__init__()
+        self.max_size = max_size
+        self.entries: collections.OrderedDict[
+            BaseResource[Any], Tuple[Any, Optional[Hashable]]
+        ] = collections.OrderedDict()
+
+    def get(self, resource: BaseResource[Any]) -> Any:
+        with self.lock:
+            entry = self.entries.get(resource)
+            if entry is None:
+                return MISSING
+            self.entries.move_to_end(resource)
+            return entry[0]
+
+    def put(
+        self,
+        resource: BaseResource[Any],
+        value: Any,
+        key: Optional[Hashable],
+    ) -> List[Hashable]:
+        with self.lock:
+            keys = []
+            previous = self.entries.pop(resource, None)
+            if previous is not None:
+                keys.append(previous[1])
+            self.entries[resource] = (value, key)
+            while len(self.entries) > self.max_size:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                keys.append(evicted)
+        return [key for key in keys if key is not None]
+
+    def discard(self, predicate: Callable[[BaseResource[Any]], bool]):
+        with self.lock:
+            for resource in [r for r in self.entries if predicate(r)]:
+                del self.entries[resource]
+
+
+class LRUCachePolicy(CachePolicy):
+    """
+    Hold at most ``max_size`` resources of the policy in each context,
+    releasing least recently resolved ones first.
+
+    """
+
+    def __init__(self, max_size: int):
+        super().__init__()
+        if max_size < 1:
+            raise ValueError("Cache size must be positive", max_size)
+        self.max_size = max_size
+
+    def create_cache(self) -> Cache:
+        return _LRUCache(self.max_size)
+
+    def __repr__(self):  # pragma: no cover
+        return f"LRUCachePolicy({self.max_size!r})"
@@ -1,9 +1,13 @@
 import contextlib
-from typing import Iterator, Sequence
+from typing import AsyncIterator, Iterator, Optional, Sequence
 
+from autowire.async_context import AsyncContext
 from autowire.base_container import BaseContainer
 from autowire.base_resource import BaseResource
 from autowire.context import Context
+from autowire.current import activate
+from autowire.metrics import Metrics
+from autowire.observer import Observer
 
 
 class Container(BaseContainer):
@@ -14,20 +18,72 @@ class Container(BaseContainer):
 
     @contextlib.contextmanager
     def context(
-        self, preload: Sequence[BaseResource] = ()
+        self,
+        preload: Sequence[BaseResource] = (),
+        parallel: bool = False,
+        thread_safe: bool = False,
+        observer: Optional[Observer] = None,
+        warm_up: bool = False,
+        metrics: Optional[Metrics] = None,
     ) -> Iterator[Context]:
         """
-        Get a DI context from this container. ::
+        Get a DI context from this container, which is current in the
+        block. ::
 
             with container.context() as context:
                 value = context.resolve(resource)
                 ...
 
         :param preload: resources to be preloaded on this context.
+        :param parallel: preload independent resources concurrently.
+        :param thread_safe: make the context and its children safe to
+                            resolve resources from multiple threads.
+        :param observer: observer of the context and its children.
+        :param warm_up: create eager resources in background, which makes the
+                        context thread safe. See
+                        :meth:`~autowire.context.Context.warm_up`.
+        :param metrics: metrics counting resolutions of the context and its
+                        children.
 
         """
-        with Context(self, None) as context:
-            # Preload
-            for resource in preload:
-                context.resolve(resource)
-            yield context
+        with Context(
+            self, None, thread_safe or warm_up, observer, metrics
+        ) as context:
+            if warm_up:
+                context.warm_up()
+            context.preload(preload, parallel=parallel)
+            with activate(context):
+                yield context
+
+    @contextlib.asynccontextmanager
+    async def async_context(
+        self,
+        preload: Sequence[BaseResource] = (),
+        parallel: bool = False,
+        observer: Optional[Observer] = None,
+        warm_up: bool = False,
+        metrics: Optional[Metrics] = None,
+    ) -> AsyncIterator[AsyncContext]:
+        """
+        Get an asynchronous DI context from this container, which is current
+        in the block. ::
+
+            async with container.async_context() as context:
+                value = await context.aresolve(resource)
+                ...
+
+        :param preload: resources to be preloaded on this context.
+        :param parallel: preload independent resources concurrently.
+        :param observer: observer of the context and its children.
+        :param warm_up: create eager resources in background tasks. See
+                        :meth:`~autowire.async_context.AsyncContext.awarm_up`.
+        :param metrics: metrics counting resolutions of the context and its
+                        children.
+
+        """
+        async with AsyncContext(self, None, observer, metrics) as context:
+            if warm_up:
+                await context.awarm_up()
+            await context.apreload(preload, parallel=parallel)
+            with activate(context):
+                yield context
@@ -8,32 +8,179 @@ Base definitions of autowire.
 from __future__ import annotations
 
 import collections
+import concurrent.futures
 import contextlib
-import sys
+import contextvars
+import queue
+import threading
+import time
 from typing import (
     Any,
+    Callable,
     ContextManager,
+    Dict,
+    Iterable,
     Iterator,
     List,
     Optional,
     Sequence,
     Tuple,
     TypeVar,
+    Union,
+    cast,
 )
 
 from autowire.base_container import BaseContainer
 from autowire.base_resource import BaseResource
+from autowire.cache import MISSING, Cache, CachePolicy
+from autowire.current import activate
+from autowire.drain import (
+    Deadlines,
+    DrainReport,
+    ExitReporter,
+    ReleaseGraph,
+    chain_exception,
+    release_managers,
+)
+from autowire.exc import AsyncResourceError, CircularDependencyError
+from autowire.fork import track_context
+from autowire.injection import find_injection
+from autowire.metrics import Metrics
+from autowire.observer import Observer
+from autowire.plan import PlanStep, ResolutionPlan, merge_plans
 from autowire.provider import ResourceProvider
+from autowire.scope import Scope
+from autowire.warmup import WarmUp
 
 R = TypeVar("R")
 
+#: Marker for resources that are not found in resource pools
+_MISSING: Any = MISSING
+
+# Enum members are slow to look up from their class on hot paths
+_CONTAINER = Scope.CONTAINER
+_TRANSIENT = Scope.TRANSIENT
+
+#: Resources being reified by implementations that resolve their own
+#: dependencies, in the current thread or task
+_reifying: contextvars.ContextVar[Tuple[BaseResource[Any], ...]] = (
+    contextvars.ContextVar("autowire_reifying", default=())
+)
+
+
+def check_reifying(resource: BaseResource[Any]):
+    """
+    Fail if the resource is being reified in the current thread or task,
+    since resolving it would recurse forever.
+
+    :raises CircularDependencyError: if the resource is being reified.
+
+    """
+    reifying_ = _reifying.get()
+    if resource in reifying_:
+        path = reifying_[reifying_.index(resource) :] + (resource,)
+        raise CircularDependencyError(
+            "Circular dependency", [r.canonical_name for r in path]
+        )
+
+
+@contextlib.contextmanager
+def reifying(resource: BaseResource[Any]) -> Iterator[None]:
+    """
+    Mark the resource as being reified in the block, by an implementation
+    that resolves its own dependencies.
+
+    :raises CircularDependencyError: if the resource is being reified
+                                     already.
+
+    """
+    check_reifying(resource)
+    token = _reifying.set(_reifying.get() + (resource,))
+    try:
+        yield
+    finally:
+        _reifying.reset(token)
+
+
+class TransientKey(object):
+    """
+    Key of transient resources in resource pools.
+
+    Transient resources are kept in resource pools only to be released when
+    contexts are drained, so they are never found by their resources.
+    So are context managers of resources held by cache policies.
 
-class NotPooled(Exception):
     """
-    Internal class for fiding pooled resource
+
+    __slots__ = ("resource",)
+
+    def __init__(self, resource: BaseResource[Any]):
+        super().__init__()
+        self.resource = resource
+
+    def __repr__(self):  # pragma: no cover
+        return f"TransientKey({self.resource!r})"
+
+
+class Snapshot(object):
     """
+    Resources pooled by a context, to be forked into child contexts by
+    :meth:`Context.child`.
+
+    Forked contexts start with their own copy of the resource pool of the
+    snapshot, so that they find snapshotted resources without creating them
+    again, while resources they create are never seen by others.
+    Snapshotted values are shared by forked contexts unless ``copy`` is
+    given, which copies each of them whenever the snapshot is forked.
 
-    pass
+    Snapshotted resources are still owned by the context that they are taken
+    from, and released only when it is drained. Forked contexts should not
+    outlive it.
+
+    """
+
+    __slots__ = ("pool", "copy")
+
+    def __init__(
+        self,
+        values: Iterable[Tuple[BaseResource[Any], Any]],
+        copy: Optional[Callable[[Any], Any]] = None,
+    ):
+        super().__init__()
+        #: Frozen resource pool, holding no context managers so that forked
+        #: contexts don't release the resources
+        self.pool: collections.OrderedDict[
+            Union[BaseResource[Any], TransientKey],
+            Tuple[Any, Optional[ContextManager[Any]]],
+        ] = collections.OrderedDict(
+            (resource, (value, None)) for resource, value in values
+        )
+        #: Function copying values on fork, ``None`` to share them
+        self.copy = copy
+
+    def __len__(self) -> int:
+        return len(self.pool)
+
+    def __contains__(self, resource: BaseResource[Any]) -> bool:
+        return resource in self.pool
+
+    def fork(
+        self,
+    ) -> collections.OrderedDict[
+        Union[BaseResource[Any], TransientKey],
+        Tuple[Any, Optional[ContextManager[Any]]],
+    ]:
+        """
+        Create a new resource pool from the snapshot.
+
+        """
+        if self.copy is None:
+            return self.pool.copy()
+        copy = self.copy
+        return collections.OrderedDict(
+            (resource, (copy(value), None))
+            for resource, (value, _) in self.pool.items()
+        )
 
 
 class Context(ResourceProvider, ContextManager["Context"]):
@@ -42,70 +189,321 @@ class Context(ResourceProvider, ContextManager["Context"]):
 
     """
 
-    def __init__(self, container: BaseContainer, parent: Optional[Context]):
+    def __init__(
+        self,
+        container: BaseContainer,
+        parent: Optional[Context],
+        thread_safe: bool = False,
+        observer: Optional[Observer] = None,
+        metrics: Optional[Metrics] = None,
+    ):
         super().__init__()
         self.container = container
         self.parent = parent
         self.resource_pool: collections.OrderedDict[
-            BaseResource[Any], Tuple[Any, ContextManager[Any]]
+            Union[BaseResource[Any], TransientKey],
+            Tuple[Any, Optional[ContextManager[Any]]],
         ] = collections.OrderedDict()
         self.children: List[Context] = []
+        #: The topmost context, which holds container scoped resources
+        self.root: Context = self if parent is None else parent.root
+        #: Whether resources can be resolved from multiple threads
+        #: concurrently. Each resource will be created only once even if
+        #: multiple threads resolve it at the same time.
+        self.thread_safe = thread_safe
+        self._locks: Dict[BaseResource[Any], threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        #: Observer of this context and its children, if instrumented
+        self.observer: Optional[Observer] = observer
+        if observer is None and parent is not None:
+            self.observer = parent.observer
+        #: Metrics of this context and its children, if counted
+        self.metrics: Optional[Metrics] = metrics
+        if metrics is None and parent is not None:
+            self.metrics = parent.metrics
+        # Resources held by cache policies
+        self._caches: Dict[CachePolicy, Cache] = {}
+        #: Resources being created in background, if warmed up
+        self.warming: Optional[WarmUp] = None
+        if thread_safe and parent is None:
+            # Locks may be held by other threads when forked
+            track_context(self)
 
     def drain(self):
         """
         Drain all resources resolved by this context.
 
+        Resources are released in reverse order of their creation after all
+        children are drained. If releasing something raises an exception,
+        the exception is passed to ``__exit__`` of the rest of resources and
+        raised after all resources are released.
+
+        Resources without teardown, like ones from plain functions or
+        constants, are just discarded.
+
+        Resources not started warming up are not created anymore, and ones
+        being created are waited for.
+
         """
+        if self.warming is not None:
+            self.warming.cancel()
+            self.warming.join()
 
-        def children_drainer(children: List[Context]):
-            if not children:
-                return
-            child = children.pop(0)
+        exc: Optional[BaseException] = None
+        while self.children:
+            child = self.children.pop()
             try:
-                children_drainer(children)
-            finally:
                 child.drain()
+            except BaseException as e:
+                exc = chain_exception(e, exc)
 
-        items = list(self.resource_pool.items())
+        exc = release_managers(self._pop_entries(), exc, self._exit_reporter())
+        self._caches.clear()
 
-        def drainer(
-            items: list[BaseResource[Any], Tuple[Any, ContextManager[Any]]]
-        ):
-            if not items:
-                # Drain all children
-                children_drainer(self.children)
-                return
-            resource, (resolve, manager) = items.pop(0)
+        if exc is not None:
+            raise exc
+
+    def drain_concurrently(
+        self,
+        timeout: Optional[float] = None,
+        resource_timeout: Optional[float] = None,
+        max_workers: Optional[int] = None,
+    ) -> DrainReport:
+        """
+        Drain all resources resolved by this context, releasing resources
+        that don't depend on each other concurrently. ::
+
+            report = context.drain_concurrently(timeout=30, resource_timeout=5)
+            for name, exc in report.failed:
+                logger.error("Failed to release %s", name, exc_info=exc)
+            for name in report.timed_out:
+                logger.error("Gave up releasing %s", name)
+
+        Resources are still released after all resources depending on them,
+        in reverse order of their creation otherwise. Each of them is
+        released on its own daemon thread, at most ``max_workers`` at once.
+
+        Resources taking longer than ``resource_timeout`` seconds are left
+        behind, so that their dependencies are released without waiting for
+        them. So is everything not released in ``timeout`` seconds. Draining
+        goes on regardless of errors, and they are reported instead of being
+        raised. Unlike :meth:`drain`, exceptions are not passed to
+        ``__exit__`` of other resources.
+
+        """
+        report = DrainReport()
+        deadlines = Deadlines(timeout, resource_timeout)
+        if self.warming is not None:
+            self.warming.cancel()
+            self.warming.join(deadlines.remaining())
+        while self.children:
+            child = self.children.pop()
+            report.merge(
+                child.drain_concurrently(
+                    deadlines.remaining(), resource_timeout, max_workers
+                )
+            )
+
+        graph = self._take_release_graph()
+        pending = {
+            i for i in range(len(graph)) if graph.managers[i] is not None
+        }
+        done: queue.Queue[Tuple[int, Optional[BaseException], float]] = (
+            queue.Queue()
+        )
+
+        def release(i: int):
+            start = time.perf_counter()
             try:
-                drainer(items)
-            except Exception:
-                type_, value, traceback = sys.exc_info()
-                self.resource_pool.pop(resource)
-                manager.__exit__(type_, value, traceback)
-                raise
+                graph.managers[i].__exit__(None, None, None)
+            except BaseException as e:
+                done.put((i, e, time.perf_counter() - start))
             else:
-                self.resource_pool.pop(resource)
-                manager.__exit__(None, None, None)
+                done.put((i, None, time.perf_counter() - start))
 
-        drainer(items)
+        while True:
+            while graph.ready and not deadlines.expired():
+                if max_workers is not None:
+                    if len(deadlines.running) >= max_workers:
+                        break
+                i = graph.ready.pop()
+                if i not in pending:
+                    graph.finish(i)
+                    continue
+                deadlines.start_resource(i)
+                threading.Thread(
+                    target=release,
+                    args=(i,),
+                    name=f"autowire-drain-{graph.name(i)}",
+                    daemon=True,
+                ).start()
+            if not deadlines.running or deadlines.expired():
+                break
+            try:
+                i, exc, seconds = done.get(timeout=deadlines.next_timeout())
+            except queue.Empty:
+                for i in deadlines.overdue():
+                    del deadlines.running[i]
+                    pending.discard(i)
+                    report.timed_out.append(graph.name(i))
+                    graph.finish(i)
+                continue
+            if i not in deadlines.running:
+                # Finished after being timed out
+                continue
+            del deadlines.running[i]
+            pending.discard(i)
+            if exc is None:
+                report.released.append(graph.name(i))
+            else:
+                report.failed.append((graph.name(i), exc))
+            self._report_exit(graph.resources[i], seconds, exc)
+            graph.finish(i)
+
+        # Left behind on timeout
+        report.timed_out.extend(
+            graph.name(i) for i in sorted(pending, reverse=True)
+        )
+        self._caches.clear()
+        report.seconds = time.monotonic() - deadlines.start
+        return report
 
     @contextlib.contextmanager
-    def child(self, preload: Sequence[BaseResource] = ()) -> Iterator[Context]:
+    def child(
+        self,
+        preload: Sequence[BaseResource] = (),
+        parallel: bool = False,
+        snapshot: Optional[Snapshot] = None,
+    ) -> Iterator[Context]:
         """
-        Create a child context ::
+        Create a child context, which is current in the block ::
 
             with context.child() as child:
                 value = child.resolve(resource)
                 ...
 
         :param preload: resources to be preloaded
+        :param parallel: preload independent resources concurrently
+        :param snapshot: snapshot taken by :meth:`snapshot` to start with
+        """
+        child = Context(self.container, self, self.thread_safe, self.observer)
+        if snapshot is not None:
+            child.resource_pool = snapshot.fork()
+        self.children.append(child)
+        try:
+            with child:
+                child.preload(preload, parallel=parallel)
+                with activate(child):
+                    yield child
+        finally:
+            self._forget_child(child)
+
+    def snapshot(
+        self,
+        resources: Optional[Sequence[BaseResource[Any]]] = None,
+        copy: Optional[Callable[[Any], Any]] = None,
+    ) -> Snapshot:
+        """
+        Take a snapshot of resources resolved in this context, so that child
+        contexts forked from it don't create them again. ::
+
+            with root.child() as warm:
+                snapshot = warm.snapshot([template_engine, config_view])
+
+                for request in requests:
+                    with root.child(snapshot=snapshot) as child:
+                        handle(request, child)
+
+        Given resources are resolved in this context first. If no resources
+        are given, every resource pooled by this context is taken, except
+        transient ones.
+
+        Forked contexts share snapshotted values. Pass ``copy``, like
+        :func:`copy.copy`, for values that forked contexts may modify.
+
+        """
+        if resources is None:
+            values = [
+                (resource, value)
+                for resource, (value, _) in self.resource_pool.items()
+                if not isinstance(resource, TransientKey)
+            ]
+            return Snapshot(values, copy)
+        return Snapshot(zip(resources, self.resolve_many(resources)), copy)
+
+    def preload(
+        self,
+        resources: Sequence[BaseResource],
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Resolve resources in advance. ::
+
+            context.preload([connection_pool, template_engine], parallel=True)
+
+        If ``parallel`` is true, resources that don't depend on each other
+        will be created concurrently on a thread pool of ``max_workers``
+        threads. Created resources are still pooled in dependency order,
+        so that they are drained in reverse order as usual.
+
+        Resources created before a failure will be left in this context to be
+        drained.
+
+        In thread safe contexts, resources are pooled as soon as they are
+        created, since they may be resolved by other threads at the same
+        time.
+
+        """
+        if parallel:
+            self._preload_concurrently(resources, max_workers)
+        else:
+            self.resolve_many(resources)
+
+    def warm_up(
+        self,
+        resources: Optional[Sequence[BaseResource[Any]]] = None,
+        max_workers: Optional[int] = None,
+    ) -> WarmUp:
+        """
+        Start creating resources in background threads, returning their
+        progress. ::
+
+            with container.context(thread_safe=True) as context:
+                warming = context.warm_up()
+                serve(context, ready=warming.ready)
+
+        If no resources are given, ones marked as eager are created. See
+        :meth:`~autowire.base_container.BaseContainer.eager_resources`.
+
+        Resolving resources being created waits for them instead of creating
+        them again, so only thread safe contexts can be warmed up. Resources
+        are created by this context, so eager resources are usually container
+        scoped, to be shared by children resolving them.
+
+        Failures are reported by :attr:`WarmUp.failed
+        <autowire.warmup.WarmUp.failed>`, and failed resources are created
+        again when they are resolved.
+
         """
-        with Context(self.container, self) as child:
-            self.children.append(child)
-            # Preload
-            for resource in preload:
-                child.resolve(resource)
-            yield child
+        if not self.thread_safe:
+            raise ValueError("Only thread safe contexts can be warmed up")
+        if resources is None:
+            resources = self.container.eager_resources()
+        if self.warming is None:
+            self.warming = WarmUp()
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix="autowire-warm-up"
+        )
+        try:
+            for resource in resources:
+                self.warming.track(
+                    resource, executor.submit(self.resolve, resource)
+                )
+        finally:
+            # Workers exit after creating every resource
+            executor.shutdown(wait=False)
+        return self.warming
 
     #
     # Resource provider implementation
@@ -116,19 +514,113 @@ class Context(ResourceProvider, ContextManager["Context"]):
         Resolve resource in this context.
 
         """
-        try:
-            return self._find_resource(resource)
-        except NotPooled:
-            pass
+        if self.observer is not None:
+            return self._resolve_observed(resource)
+        resolved = self._lookup(resource)
+        if resolved is not _MISSING:
+            return resolved
 
         # Create new resource if pooled resource not found
-        impl = self.container.find_implementation(resource)
-        manager = impl.reify(resource, self)
-        resolved = manager.__enter__()
-        # throw into resource pool
-        self.resource_pool[resource] = (resolved, manager)
+        return self._execute(self.container.find_plan(resource))
+
+    def resolve_many(self, resources: Sequence[BaseResource[Any]]) -> Tuple:
+        """
+        Resolve resources at once. ::
+
+            db, cache, user = context.resolve_many([db, cache, user])
+
+        It's faster than resolving each of them, since dependencies shared by
+        them are looked up only once, with a resolution plan merged from
+        theirs.
+
+        Resources created before a failure will be left in this context to be
+        drained.
+
+        """
+        steps, targets = self.container.find_batch_plan(resources)
+        values, needed = self._prepare(steps, targets)
+        self._create_needed(steps, values, needed)
+        return tuple(values[target] for target in targets)
+
+    def release_mark(self) -> Any:
+        """
+        Key of the latest entry of the resource pool, for
+        :meth:`resolve_after`.
+
+        """
+        return next(reversed(self.resource_pool), None)
+
+    def resolve_after(self, resource: BaseResource[R], mark: Any) -> R:
+        """
+        Resolve the resource for ones pooled after ``mark``, so that it is
+        released after them.
+
+        If the resource is created by this context, entries pooled after
+        ``mark`` are moved after it and its dependencies, so that both of
+        :meth:`drain` and :meth:`drain_concurrently` release them first.
+        :class:`~autowire.lazy.Deferred` resolves lazy dependencies this way.
+
+        """
+        pool = self.resource_pool
+        keys = list(pool)
+        resolved = self.resolve(resource)
+        if next(reversed(pool), None) is (keys[-1] if keys else None):
+            # Nothing created by this context
+            return resolved
+        try:
+            start = 0 if mark is None else keys.index(mark) + 1
+        except ValueError:
+            # Released already
+            return resolved
+        for key in keys[start:]:
+            if key in pool:
+                pool.move_to_end(key)
         return resolved
 
+    def call(self, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+        """
+        Call the function decorated by :func:`~autowire.injection.inject`,
+        injecting resources resolved in this context. ::
+
+            @inject(db=db_connection)
+            def get_user(user_id: int, *, db: Connection) -> User:
+                ...
+
+            user = context.call(get_user, 42)
+
+        Arguments given explicitly win over injected ones, and their
+        resources are not resolved. ::
+
+            user = context.call(get_user, 42, db=replica)
+
+        Resources to be injected are found once on decoration, but calls
+        still cost about two to three times as much as resolving resources
+        and calling the function by hand, for forwarding arguments.
+
+        Coroutine functions are called without being awaited, so they can
+        only be injected synchronous resources.
+        Use :meth:`~autowire.async_context.AsyncContext.acall` to inject
+        asynchronous ones.
+
+        """
+        injection = find_injection(fn)
+        arg_resources = injection.arg_resources
+        kwarg_resources = injection.kwarg_resources
+        if kwargs or (args and injection.positions):
+            arg_resources, kwarg_resources, args = injection.arrange(
+                args, kwargs
+            )
+        resolve = self.resolve
+        for name, resource in kwarg_resources:
+            kwargs[name] = resolve(resource)
+        if arg_resources:
+            return fn(
+                *[resolve(resource) for resource in arg_resources],
+                *args,
+                **kwargs,
+            )
+        return fn(*args, **kwargs)
+
     #
     # Context manager implementation
     #
@@ -143,13 +635,548 @@ class Context(ResourceProvider, ContextManager["Context"]):
     # Privates
     #
 
-    def _find_resource(self, resource: BaseResource[R]) -> R:
-        # Find resolved resource from resource pool
-        if resource in self.resource_pool:
-            resolved, manager = self.resource_pool[resource]
+    def _resolve_observed(self, resource: BaseResource[R]) -> R:
+        # Resolve resource reporting to the observer
+        resolved = self._lookup_observed(resource)
+        if resolved is not _MISSING:
             return resolved
-        # Find from parent
-        if self.parent is not None:
-            return self.parent._find_resource(resource)
+        observer = self.observer
+        assert observer is not None
+        observer.on_resolve_start(self, resource)
+        try:
+            return self._execute(self.container.find_plan(resource))
+        finally:
+            observer.on_resolve_end(self, resource)
+
+    def _lookup_observed(self, resource: BaseResource[R]) -> R:
+        # Find resolved resource reporting the depth of lookup
+        assert self.observer is not None
+        metrics = self.metrics
+        depth = 0
+        context: Optional[Context] = self
+        while context is not None:
+            entry = context.resource_pool.get(resource)
+            if entry is not None:
+                if metrics is not None:
+                    hits = metrics.hits
+                    name = resource.canonical_name
+                    hits[name] = hits.get(name, 0) + 1
+                self.observer.on_lookup(self, resource, True, depth)
+                return entry[0]
+            context = context.parent
+            depth += 1
+        if metrics is not None:
+            misses = metrics.misses
+            name = resource.canonical_name
+            misses[name] = misses.get(name, 0) + 1
+        self.observer.on_lookup(self, resource, False, depth - 1)
+        return _MISSING
+
+    def _pop_entries(
+        self,
+    ) -> Iterator[Tuple[Union[BaseResource[Any], TransientKey], Any]]:
+        # Take entries out of the resource pool, latest ones first
+        while self.resource_pool:
+            key, (_, manager) = self.resource_pool.popitem()
+            yield key, manager
+
+    def _exit_reporter(self) -> Optional[ExitReporter]:
+        # Function reporting released entries, if anything observes them
+        if self.observer is None and self.metrics is None:
+            return None
+        return self._observe_exit
+
+    def _observe_exit(
+        self,
+        key: Union[BaseResource[Any], TransientKey],
+        seconds: float,
+        error: Optional[BaseException] = None,
+    ):
+        resource = key.resource if isinstance(key, TransientKey) else key
+        self._report_exit(resource, seconds, error)
+
+    def _report_exit(
+        self,
+        resource: BaseResource[Any],
+        seconds: float,
+        error: Optional[BaseException] = None,
+    ):
+        # Report the released resource to the observer and metrics
+        if self.observer is not None:
+            self.observer.on_exit(self, resource, seconds)
+            if error is not None:
+                self.observer.on_exit_error(self, resource, error)
+        if self.metrics is not None:
+            self.metrics.record_release(resource, error)
+
+    def _take_release_graph(self) -> ReleaseGraph:
+        # Take every resource out of the resource pool to be released
+        entries = list(self.resource_pool.items())
+        self.resource_pool.clear()
+        return ReleaseGraph(
+            self.container,
+            [
+                key.resource if isinstance(key, TransientKey) else key
+                for key, _ in entries
+            ],
+            [manager for _, (_, manager) in entries],
+        )
+
+    def _forget_child(self, child: Context):
+        # Finished children should not be retained
+        try:
+            self.children.remove(child)
+        except ValueError:
+            # Already drained by this context
+            pass
+
+    def _after_fork(self, sensitive: Callable[[BaseResource[Any]], bool]):
+        # Discard resources of the parent process in a forked child process
+        # without releasing them, replacing locks that may be held by threads
+        # of the parent process.
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self.warming = None
+        for key in list(self.resource_pool):
+            if sensitive(
+                key.resource if isinstance(key, TransientKey) else key
+            ):
+                del self.resource_pool[key]
+        for cache in self._caches.values():
+            cache.lock = threading.Lock()
+            cache.discard(sensitive)
+
+    def _lookup(self, resource: BaseResource[R]) -> R:
+        # Find resolved resource from resource pools of this context and its
+        # ancestors
+        context: Optional[Context] = self
+        while context is not None:
+            entry = context.resource_pool.get(resource)
+            if entry is not None:
+                metrics = self.metrics
+                if metrics is not None:
+                    # Counted inline, since it is the hottest path
+                    hits = metrics.hits
+                    name = resource.canonical_name
+                    hits[name] = hits.get(name, 0) + 1
+                return entry[0]
+            context = context.parent
+        if self.metrics is not None:
+            misses = self.metrics.misses
+            name = resource.canonical_name
+            misses[name] = misses.get(name, 0) + 1
+        return _MISSING
+
+    def _lookup_cached(self, step: PlanStep, counted: bool = False) -> Any:
+        # Find resource held by the cache policy of this context and its
+        # ancestors. If counted, the lookup was counted as a miss already,
+        # by the lookup of the resource pool or an earlier one of this.
+        assert step.cache is not None
+        context: Optional[Context] = self
+        resolved = _MISSING
+        while context is not None:
+            cache = context._caches.get(step.cache)
+            if cache is not None:
+                resolved = cache.get(step.resource)
+                if resolved is not _MISSING:
+                    break
+            context = context.parent
+        metrics = self.metrics
+        if metrics is not None:
+            name = step.resource.canonical_name
+            if resolved is not _MISSING:
+                hits = metrics.hits
+                hits[name] = hits.get(name, 0) + 1
+                if counted:
+                    misses = metrics.misses
+                    misses[name] = misses.get(name, 1) - 1
+            elif not counted:
+                misses = metrics.misses
+                misses[name] = misses.get(name, 0) + 1
+        return resolved
+
+    def _prepare(
+        self,
+        steps: Sequence[PlanStep],
+        targets: Sequence[int],
+        looked_up: int = -1,
+    ) -> Tuple[List[Any], List[bool]]:
+        # Find pooled resources backward from the targets, so that
+        # dependencies of pooled resources will not be created.
+        # The step of looked_up is known not to be pooled.
+        values = [_MISSING] * len(steps)
+        needed = [False] * len(steps)
+        for target in targets:
+            needed[target] = True
+        lookup = (
+            self._lookup if self.observer is None else self._lookup_observed
+        )
+        for i in range(len(steps) - 1, -1, -1):
+            if not needed[i]:
+                continue
+            step = steps[i]
+            if step.scope is not _TRANSIENT:
+                if step.cache is not None:
+                    resolved = self._lookup_cached(step, i == looked_up)
+                elif i == looked_up:
+                    resolved = _MISSING
+                else:
+                    resolved = lookup(step.resource)
+                if resolved is not _MISSING:
+                    values[i] = resolved
+                    continue
+                if self._delegates(step):
+                    # Root context will resolve its dependencies
+                    continue
+            for slot in step.dependency_slots:
+                needed[slot] = True
+        return values, needed
+
+    def _execute(self, plan: ResolutionPlan) -> Any:
+        # Execute the resolution plan
+        steps = plan.steps
+        if len(steps) == 1:
+            # No dependencies, and the resource is known not to be pooled
+            return self._create(steps[0], [])
+        last = len(steps) - 1
+        values, needed = self._prepare(steps, (last,), last)
+        self._create_needed(steps, values, needed, last)
+        return values[-1]
+
+    def _create_needed(
+        self,
+        steps: Sequence[PlanStep],
+        values: List[Any],
+        needed: List[bool],
+        observed: int = -1,
+    ):
+        # Create rest of resources in dependency order.
+        # The step of observed is being observed as a resolution already.
+        observer = self.observer
+        for i, step in enumerate(steps):
+            if needed[i] and values[i] is _MISSING:
+                if observer is None or i == observed or self._delegates(step):
+                    values[i] = self._create(step, values)
+                    continue
+                # Dependencies are observed as nested resolutions
+                observer.on_resolve_start(self, step.resource)
+                try:
+                    values[i] = self._create(step, values)
+                finally:
+                    observer.on_resolve_end(self, step.resource)
+
+    def _delegates(self, step: PlanStep) -> bool:
+        # Whether the resource should be resolved by the root context
+        return step.scope is _CONTAINER and self.root is not self
+
+    def _create(self, step: PlanStep, values: List[Any]) -> Any:
+        if self._delegates(step):
+            return self.root.resolve(step.resource)
+        return self._create_entry(step, values)[0]
+
+    def _create_entry(
+        self, step: PlanStep, values: List[Any]
+    ) -> Tuple[Any, Optional[ContextManager[Any]]]:
+        resource = step.resource
+        if step.scope is _TRANSIENT:
+            created = self._reify(step, values)
+            self._pool(step, created)
+            return created
+        if step.cache is not None:
+            return self._create_cached(step, values)
+        entry = self.resource_pool.get(resource)
+        if entry is not None:
+            # Already created while reifying other resources
+            return entry
+        if not self.thread_safe:
+            entry = self._reify(step, values)
+            # throw into resource pool
+            self._pool(step, entry)
+            return entry
+
+        with self._lock(step):
+            entry = self.resource_pool.get(resource)
+            if entry is None:
+                entry = self._reify(step, values)
+                self.resource_pool[resource] = entry
+            return entry
+
+    def _create_cached(
+        self, step: PlanStep, values: List[Any]
+    ) -> Tuple[Any, Optional[ContextManager[Any]]]:
+        resolved = self._lookup_cached(step, True)
+        if resolved is not _MISSING:
+            return resolved, None
+        if not self.thread_safe:
+            entry = self._reify(step, values)
+            self._pool(step, entry)
+            return entry
+
+        with self._lock(step):
+            resolved = self._lookup_cached(step, True)
+            if resolved is not _MISSING:
+                return resolved, None
+            entry = self._reify(step, values)
+            self._pool(step, entry)
+            return entry
+
+    def _lock(self, step: PlanStep) -> threading.Lock:
+        # Lock of the resource, so that only one thread creates the resource
+        # while others wait for it
+        if step.factory is None:
+            # Fail instead of waiting for the lock held by this thread
+            check_reifying(step.resource)
+        lock = self._locks.get(step.resource)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._locks.setdefault(step.resource, threading.Lock())
+        return lock
+
+    def _reify(
+        self, step: PlanStep, values: List[Any]
+    ) -> Tuple[Any, Optional[ContextManager[Any]]]:
+        # Create resource without pooling
+        if step.asynchronous:
+            raise AsyncResourceError(
+                "Asynchronous resource cannot be resolved synchronously",
+                step.resource.canonical_name,
+            )
+        metrics = self.metrics
+        if self.observer is not None or (
+            metrics is not None and metrics.timings
+        ):
+            return self._reify_observed(step, values)
+        if step.factory is None:
+            entry = self._reify_opaque(step)
+        elif not step.managed:
+            # Resources without teardown are created directly
+            entry = (
+                step.factory(
+                    *[values[slot] for slot in step.arg_slots],
+                    **{name: values[slot] for name, slot in step.kwarg_slots},
+                ),
+                None,
+            )
         else:
-            raise NotPooled()
+            manager = step.factory(
+                *[values[slot] for slot in step.arg_slots],
+                **{name: values[slot] for name, slot in step.kwarg_slots},
+            )
+            entry = manager.__enter__(), manager
+        if metrics is not None:
+            # Counted without timings
+            metrics.record_creation(step.resource, entry[1] is not None)
+        return entry
+
+    def _reify_observed(
+        self, step: PlanStep, values: List[Any]
+    ) -> Tuple[Any, Optional[ContextManager[Any]]]:
+        # Create resource reporting timings to the observer and metrics
+        observer = self.observer
+        metrics = self.metrics
+        resource = step.resource
+        start = time.perf_counter()
+        if step.factory is None:
+            entry = self._reify_opaque(step)
+            # Opaque implementations are reported as entered in no time
+            entered = None if entry[1] is None else 0.0
+            self._report_creation(
+                resource, time.perf_counter() - start, entered
+            )
+            return entry
+        created = step.factory(
+            *[values[slot] for slot in step.arg_slots],
+            **{name: values[slot] for name, slot in step.kwarg_slots},
+        )
+        reified = time.perf_counter()
+        if observer is not None:
+            observer.on_reify(self, resource, reified - start)
+        if not step.managed:
+            if metrics is not None:
+                metrics.record_creation(resource, False, reified - start)
+            return created, None
+        resolved = created.__enter__()
+        entered = time.perf_counter() - reified
+        if observer is not None:
+            observer.on_enter(self, resource, entered)
+        if metrics is not None:
+            metrics.record_creation(resource, True, reified - start, entered)
+        return resolved, created
+
+    def _report_creation(
+        self,
+        resource: BaseResource[Any],
+        reify_seconds: float,
+        enter_seconds: Optional[float] = None,
+    ):
+        # Report the created resource to the observer and metrics
+        observer = self.observer
+        if observer is not None:
+            observer.on_reify(self, resource, reify_seconds)
+            if enter_seconds is not None:
+                observer.on_enter(self, resource, enter_seconds)
+        if self.metrics is not None:
+            self.metrics.record_creation(
+                resource,
+                enter_seconds is not None,
+                reify_seconds,
+                enter_seconds,
+            )
+
+    def _reify_opaque(
+        self, step: PlanStep
+    ) -> Tuple[Any, Optional[ContextManager[Any]]]:
+        # Reify the implementation that resolves its own dependencies, which
+        # are not known until they are resolved.
+        with reifying(step.resource):
+            if not step.managed:
+                return step.implementation.create(step.resource, self), None
+            manager = step.implementation.reify(step.resource, self)
+            return manager.__enter__(), manager
+
+    def _pool(
+        self, step: PlanStep, entry: Tuple[Any, Optional[ContextManager[Any]]]
+    ):
+        if step.fork_sensitive:
+            track_context(self.root)
+        if step.scope is _TRANSIENT:
+            # Keep it only to be released on drain
+            if entry[1] is not None:
+                self.resource_pool[TransientKey(step.resource)] = entry
+        elif step.cache is not None:
+            self._release_evicted(self._cache(step, entry))
+        else:
+            self.resource_pool[step.resource] = entry
+
+    def _cache(
+        self, step: PlanStep, entry: Tuple[Any, Optional[ContextManager[Any]]]
+    ) -> List[TransientKey]:
+        # Hand the resource to its cache policy, returning keys of evicted
+        # resources to be released
+        assert step.cache is not None
+        cache = self._caches.get(step.cache)
+        if cache is None:
+            with self._locks_lock:
+                cache = self._caches.get(step.cache)
+                if cache is None:
+                    cache = self._caches[step.cache] = (
+                        step.cache.create_cache()
+                    )
+        resolved, manager = entry
+        key = None
+        if manager is not None:
+            # Keep only the context manager, to be released in order on drain
+            key = TransientKey(step.resource)
+            self.resource_pool[key] = (None, manager)
+        return cast(
+            List[TransientKey], cache.put(step.resource, resolved, key)
+        )
+
+    def _release_evicted(self, keys: List[TransientKey]):
+        def evicted() -> Iterator[Tuple[TransientKey, Any]]:
+            for key in keys:
+                entry = self.resource_pool.get(key)
+                if entry is None:
+                    continue
+                manager = entry[1]
+                if manager is None or not hasattr(manager, "__exit__"):
+                    # Asynchronous ones are released on drain
+                    continue
+                del self.resource_pool[key]
+                yield key, manager
+
+        exc = release_managers(evicted(), report=self._exit_reporter())
+        if exc is not None:
+            raise exc
+
+    def _preload_concurrently(
+        self, resources: Sequence[BaseResource], max_workers: Optional[int]
+    ):
+        steps, targets = merge_plans(
+            [self.container.find_plan(resource) for resource in resources]
+        )
+        values, needed = self._prepare(steps, targets)
+        order = [
+            i for i in range(len(steps)) if needed[i] and values[i] is _MISSING
+        ]
+        waiting = {
+            i: {
+                slot
+                for slot in steps[i].dependency_slots
+                if values[slot] is _MISSING
+            }
+            for i in order
+        }
+        dependents: Dict[int, List[int]] = collections.defaultdict(list)
+        for i in order:
+            for slot in waiting[i]:
+                dependents[slot].append(i)
+
+        def done(i: int):
+            for dependent in dependents[i]:
+                waiting[dependent].discard(i)
+                if not waiting[dependent]:
+                    ready.append(dependent)
+
+        # Implementations that resolve dependencies by themselves are reified
+        # in this thread, in their turn of topological order, since they may
+        # resolve any resource of this context. So are resources to be
+        # resolved by the root context.
+        inline = [
+            steps[i].factory is None or self._delegates(steps[i])
+            for i in range(len(steps))
+        ]
+        ready = [i for i in order if not waiting[i] and not inline[i]]
+        # Thread safe contexts pool resources as soon as they are created
+        create = self._create_entry if self.thread_safe else self._reify
+        entries: Dict[int, Tuple[Any, Optional[ContextManager[Any]]]] = {}
+        futures: Dict[concurrent.futures.Future, int] = {}
+        error: Optional[BaseException] = None
+        cursor = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            while True:
+                # Pool created resources in topological order, so that they
+                # will be drained in reverse order of dependencies.
+                while cursor < len(order):
+                    i = order[cursor]
+                    if i in entries:
+                        entry = entries.pop(i)
+                        if not self.thread_safe:
+                            self._pool(steps[i], entry)
+                    elif inline[i] and error is None:
+                        try:
+                            values[i] = self._create(steps[i], values)
+                        except BaseException as e:
+                            error = e
+                            break
+                        done(i)
+                    else:
+                        break
+                    cursor += 1
+                if error is None:
+                    while ready:
+                        i = ready.pop(0)
+                        if not inline[i]:
+                            future = executor.submit(create, steps[i], values)
+                            futures[future] = i
+                if not futures:
+                    break
+                finished, _ = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in finished:
+                    i = futures.pop(future)
+                    try:
+                        entries[i] = future.result()
+                    except BaseException as e:
+                        error = error or e
+                    else:
+                        values[i] = entries[i][0]
+                        done(i)
+
+        if error is not None:
+            # Pool rest of created resources to be drained
+            for i in order[cursor:]:
+                if i in entries and not self.thread_safe:
+                    self._pool(steps[i], entries.pop(i))
+            raise error
@@ -0,0 +1,111 @@
+"""
+autowire.current
+================
+
+Current context of threads and tasks.
+
+Contexts opened by :meth:`~autowire.container.Container.context`,
+:meth:`~autowire.context.Context.child` and their asynchronous variants become
+current until they are closed, so that code deep down in call stacks can
+resolve resources without contexts passed through every layer. ::
+
+    with container.context() as context:
+        with context.child():
+            handle_request()
+
+    def handle_request():
+        db = autowire.resolve(db_connection)
+        ...
+
+The current context is kept in a :class:`~contextvars.ContextVar`, so each
+thread has its own, and asyncio tasks see the current context of the code
+creating them without affecting each other.
+
+"""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+from typing import TYPE_CHECKING, Iterator, Optional, TypeVar
+
+from autowire.base_resource import BaseResource
+from autowire.exc import NoCurrentContextError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from autowire.context import Context
+
+R = TypeVar("R")
+
+_current: contextvars.ContextVar[Optional[Context]] = contextvars.ContextVar(
+    "autowire_current", default=None
+)
+
+
+def current_context() -> Context:
+    """
+    Get the current context.
+
+    :raises NoCurrentContextError: if no context is current.
+
+    """
+    context = _current.get()
+    if context is None:
+        raise NoCurrentContextError("No context is current")
+    return context
+
+
+@contextlib.contextmanager
+def activate(context: Context) -> Iterator[Context]:
+    """
+    Make the context current in the block, for contexts used by other
+    threads or tasks than ones which opened them. ::
+
+        def work():
+            with activate(context):
+                handle_request()
+
+        threading.Thread(target=work).start()
+
+    """
+    token = _current.set(context)
+    try:
+        yield context
+    finally:
+        _current.reset(token)
+
+
+def resolve(resource: BaseResource[R]) -> R:
+    """
+    Resolve the resource from the current context.
+
+    :raises NoCurrentContextError: if no context is current.
+
+    """
+    context = _current.get()
+    if context is None:
+        raise NoCurrentContextError(
+            f"No context is current to resolve {resource.canonical_name}"
+        )
+    return context.resolve(resource)
+
+
+async def aresolve(resource: BaseResource[R]) -> R:
+    """
+    Resolve the resource from the current context, which must be
+    asynchronous.
+
+    :raises NoCurrentContextError: if no asynchronous context is current.
+
+    """
+    context = _current.get()
+    if context is None:
+        raise NoCurrentContextError(
+            f"No context is current to resolve {resource.canonical_name}"
+        )
+    aresolve_ = getattr(context, "aresolve", None)
+    if aresolve_ is None:
+        raise NoCurrentContextError(
+            f"Current context is not asynchronous to resolve "
+            f"{resource.canonical_name}"
+        )
+    return await aresolve_(resource)
@@ -0,0 +1,352 @@
+"""
+autowire.drain
+==============
+
+Concurrent teardown of contexts.
+
+:meth:`~autowire.context.Context.drain` releases resources one by one,
+taking as long as all of them together. Draining concurrently releases
+resources that don't depend on each other at the same time, still releasing
+dependents before their dependencies, and gives up on resources taking
+longer than timeouts instead of waiting for them forever.
+
+"""
+from __future__ import annotations
+
+import collections
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from autowire.base_resource import BaseResource
+from autowire.exc import ResourceNotProvidedError
+from autowire.implementation import (
+    AsyncContextManagerImplementation,
+    ContextManagerImplementation,
+)
+from autowire.lazy import Lazy
+
+if TYPE_CHECKING:  # pragma: no cover
+    from autowire.base_container import BaseContainer
+
+#: Function reporting a released entry with seconds spent and its error
+ExitReporter = Callable[[Any, float, Optional[BaseException]], None]
+
+
+class DrainReport(object):
+    """
+    Outcome of draining a context concurrently.
+
+    Resources are named by their canonical names, which may appear more
+    than once for transient resources.
+
+    """
+
+    __slots__ = ("released", "failed", "timed_out", "seconds")
+
+    def __init__(self):
+        super().__init__()
+        #: Resources released successfully
+        self.released: List[str] = []
+        #: Resources failed to be released, with their exceptions
+        self.failed: List[Tuple[str, BaseException]] = []
+        #: Resources not released in time, which are left behind
+        self.timed_out: List[str] = []
+        #: Time spent for draining
+        self.seconds = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether every resource is released successfully.
+
+        """
+        return not self.failed and not self.timed_out
+
+    def merge(self, other: DrainReport):
+        """
+        Add outcomes of another report, like the one of a child context.
+
+        """
+        self.released.extend(other.released)
+        self.failed.extend(other.failed)
+        self.timed_out.extend(other.timed_out)
+
+    def __repr__(self):  # pragma: no cover
+        return (
+            f"DrainReport(released={len(self.released)}, "
+            f"failed={[name for name, _ in self.failed]!r}, "
+            f"timed_out={self.timed_out!r})"
+        )
+
+
+class ReleaseGraph(object):
+    """
+    Resources taken out of the resource pool of a context, to be released
+    after the resources depending on them.
+
+    Resources are released in reverse order of creation as long as they
+    don't depend on each other, like :meth:`~autowire.context.Context.drain`
+    does.
+
+    Dependencies are the ones declared by implementations. Resources of
+    implementations resolving their own dependencies are assumed to depend
+    on every resource created before them.
+
+    """
+
+    def __init__(
+        self,
+        container: BaseContainer,
+        resources: List[BaseResource[Any]],
+        managers: List[Any],
+    ):
+        super().__init__()
+        self.container = container
+        #: Resources in order of creation
+        self.resources = resources
+        #: Context managers to be released, ``None`` if nothing to release
+        self.managers = managers
+        self.dependencies: List[Set[int]] = []
+        positions: Dict[BaseResource[Any], List[int]] = (
+            collections.defaultdict(list)
+        )
+        for i, resource in enumerate(self.resources):
+            declared = self._declared_dependencies(resource)
+            if declared is None:
+                self.dependencies.append(set(range(i)))
+            else:
+                self.dependencies.append(
+                    {j for d in declared for j in positions.get(d, ())}
+                )
+            positions[resource].append(i)
+        # Number of dependents not released yet
+        self._dependents = [0] * len(resources)
+        for dependencies in self.dependencies:
+            for j in dependencies:
+                self._dependents[j] += 1
+        #: Resources whose dependents are all released, latest ones last
+        self.ready = [i for i, n in enumerate(self._dependents) if n == 0]
+
+    def __len__(self) -> int:
+        return len(self.resources)
+
+    def name(self, i: int) -> str:
+        return self.resources[i].canonical_name
+
+    def finish(self, i: int):
+        """
+        Mark the resource to be done, so that its dependencies can be
+        released.
+
+        """
+        for j in sorted(self.dependencies[i]):
+            self._dependents[j] -= 1
+            if self._dependents[j] == 0:
+                self.ready.append(j)
+
+    def _declared_dependencies(
+        self, resource: BaseResource[Any]
+    ) -> Optional[Tuple[BaseResource[Any], ...]]:
+        try:
+            impl = self.container.find_implementation(resource)
+        except ResourceNotProvidedError:
+            return None
+        dependencies = impl.dependencies()
+        if not dependencies and not isinstance(
+            impl,
+            (ContextManagerImplementation, AsyncContextManagerImplementation),
+        ):
+            # Dependencies are not known until they are resolved
+            return None
+        # Lazy dependencies are pooled before their dependents once resolved
+        return tuple(
+            d.resource if isinstance(d, Lazy) else d for d in dependencies
+        )
+
+
+class Deadlines(object):
+    """
+    Overall and per resource deadlines of draining.
+
+    """
+
+    def __init__(
+        self, timeout: Optional[float], resource_timeout: Optional[float]
+    ):
+        super().__init__()
+        self.start = time.monotonic()
+        self.deadline = None if timeout is None else self.start + timeout
+        self.resource_timeout = resource_timeout
+        #: Deadlines of resources being released
+        self.running: Dict[int, Optional[float]] = {}
+
+    def remaining(self) -> Optional[float]:
+        """
+        Remaining time of the overall timeout.
+
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def start_resource(self, i: int):
+        self.running[i] = (
+            None
+            if self.resource_timeout is None
+            else time.monotonic() + self.resource_timeout
+        )
+
+    def next_timeout(self) -> Optional[float]:
+        """
+        Time to wait until the earliest deadline.
+
+        """
+        deadlines = [d for d in self.running.values() if d is not None]
+        if self.deadline is not None:
+            deadlines.append(self.deadline)
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0.0)
+
+    def overdue(self) -> List[int]:
+        """
+        Resources being released longer than the timeout of resources.
+
+        """
+        now = time.monotonic()
+        return [
+            i
+            for i, deadline in self.running.items()
+            if deadline is not None and deadline <= now
+        ]
+
+
+def chain_exception(
+    exc: BaseException, previous: Optional[BaseException]
+) -> BaseException:
+    """
+    Make ``exc`` be raised as if it was raised while handling ``previous``,
+    like :class:`contextlib.ExitStack` does.
+
+    """
+    if previous is None or exc is previous:
+        return exc
+    context = exc
+    while context.__context__ is not None:
+        if context.__context__ is previous:
+            return exc
+        context = context.__context__
+    if context is not previous:
+        context.__context__ = previous
+    return exc
+
+
+def exit_managers(
+    entries: Iterable[Tuple[Any, Any]],
+    exc: Optional[BaseException] = None,
+    report: Optional[ExitReporter] = None,
+) -> Generator[
+    Tuple[Any, Tuple[Any, Any, Any]],
+    Optional[BaseException],
+    Optional[BaseException],
+]:
+    """
+    Release context managers of entries of resource pools one by one, in
+    the given order, like :meth:`~autowire.context.Context.drain` does.
+
+    An exception raised by releasing one is passed to ``__exit__`` of the
+    rest, and chained to exceptions raised by them. Each released entry is
+    reported with seconds spent and the exception it raised, if ``report``
+    is given.
+
+    It yields each context manager with arguments of its exit, to be sent
+    back the exception raised by exiting it, so that synchronous and
+    asynchronous contexts share it. See :func:`release_managers` and
+    :func:`arelease_managers` which drive it. The exception to be raised
+    after all is returned.
+
+    """
+    for key, manager in entries:
+        if manager is None:
+            continue
+        if exc is None:
+            args: Tuple[Any, Any, Any] = (None, None, None)
+        else:
+            args = (type(exc), exc, exc.__traceback__)
+        start = 0.0 if report is None else time.perf_counter()
+        raised = yield manager, args
+        error: Optional[BaseException] = None
+        if raised is not None:
+            # Not the one passed to be propagated
+            error = None if raised is exc else raised
+            exc = chain_exception(raised, exc)
+        if report is not None:
+            report(key, time.perf_counter() - start, error)
+    return exc
+
+
+def release_managers(
+    entries: Iterable[Tuple[Any, Any]],
+    exc: Optional[BaseException] = None,
+    report: Optional[ExitReporter] = None,
+) -> Optional[BaseException]:
+    """
+    Release synchronous context managers of entries by
+    :func:`exit_managers`, returning the exception to be raised.
+
+    """
+    exiting = exit_managers(entries, exc, report)
+    raised: Optional[BaseException] = None
+    while True:
+        try:
+            manager, args = exiting.send(raised)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            manager.__exit__(*args)
+        except BaseException as e:
+            raised = e
+        else:
+            raised = None
+
+
+async def arelease_managers(
+    entries: Iterable[Tuple[Any, Any]],
+    exc: Optional[BaseException] = None,
+    report: Optional[ExitReporter] = None,
+) -> Optional[BaseException]:
+    """
+    Release context managers of entries by :func:`exit_managers`, awaiting
+    asynchronous ones, returning the exception to be raised.
+
+    """
+    exiting = exit_managers(entries, exc, report)
+    raised: Optional[BaseException] = None
+    while True:
+        try:
+            manager, args = exiting.send(raised)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            if hasattr(manager, "__aexit__"):
+                await manager.__aexit__(*args)
+            else:
+                manager.__exit__(*args)
+        except BaseException as e:
+            raised = e
+        else:
+            raised = None
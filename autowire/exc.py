@@ -5,6 +5,7 @@ autowire.exc
 Exception definitions.
 
 """
+from typing import Sequence
 
 
 class ResourceNotProvidedError(RuntimeError):
@@ -13,3 +14,62 @@ class ResourceNotProvidedError(RuntimeError):
     """
 
     pass
+
+
+class AsyncResourceError(RuntimeError):
+    """
+    Error for resolving an asynchronous resource synchronously.
+    """
+
+    pass
+
+
+class PoolExhaustedError(RuntimeError):
+    """
+    Error for waiting too long for an instance of a pooled resource.
+    """
+
+    pass
+
+
+class NoCurrentContextError(RuntimeError):
+    """
+    Error for resolving a resource without current context.
+    """
+
+    pass
+
+
+class CircularDependencyError(RecursionError):
+    """
+    Error for resources depending on themselves.
+
+    ``path`` is canonical names of resources on the cycle, which begins and
+    ends with the same resource.
+    """
+
+    def __init__(self, message: str, path: Sequence[str]):
+        super().__init__(message, list(path))
+        self.path = tuple(path)
+
+    def __str__(self):
+        return f"{self.args[0]}: {' -> '.join(self.path)}"
+
+
+class ValidationError(RuntimeError):
+    """
+    Error for invalid dependency graph of containers.
+
+    ``missing`` is canonical names of resources that are not provided, and
+    ``problems`` is descriptions of every problem found including them.
+    """
+
+    def __init__(
+        self, message: str, missing: Sequence[str], problems: Sequence[str]
+    ):
+        super().__init__(message, list(missing), list(problems))
+        self.missing = tuple(missing)
+        self.problems = tuple(problems)
+
+    def __str__(self):
+        return "\n- ".join([self.args[0], *self.problems])
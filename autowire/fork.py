@@ -0,0 +1,148 @@
+"""
+autowire.fork
+=============
+
+Fork safety of contexts.
+
+Prefork servers create contexts in their master processes, so that worker
+processes forked from it inherit resources already created. Some resources,
+like sockets, thread pools or locks, can't be shared by processes though.
+
+Resources marked as fork sensitive, and resources depending on them, are
+discarded from contexts in forked child processes without being released,
+since they still belong to the parent process. They are created again when
+they are resolved in child processes. Other resources stay shared
+copy-on-write.
+
+Contexts are fixed up by :func:`after_fork` in child processes forked by
+:func:`os.fork`, including ones of :mod:`multiprocessing` and prefork
+servers like gunicorn.
+
+"""
+from __future__ import annotations
+
+import os
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Dict, Tuple
+
+from autowire.base_resource import BaseResource
+from autowire.exc import ResourceNotProvidedError
+from autowire.implementation import (
+    AsyncContextManagerImplementation,
+    ContextManagerImplementation,
+)
+from autowire.lazy import Lazy
+from autowire.resource import Resource
+
+if TYPE_CHECKING:  # pragma: no cover
+    from autowire.base_container import BaseContainer
+    from autowire.context import Context
+
+# Root contexts to be fixed up in forked child processes
+_roots: weakref.WeakSet[Context] = weakref.WeakSet()
+
+
+def track_context(root: Context):
+    """
+    Fix up the root context and its descendants in forked child processes.
+
+    Root contexts that are thread safe or hold fork sensitive resources are
+    tracked automatically.
+
+    """
+    _roots.add(root)
+
+
+def after_fork():
+    """
+    Fix up tracked contexts in a forked child process.
+
+    Fork sensitive resources and resources depending on them are discarded,
+    and locks possibly held by other threads of the parent process are
+    replaced. Warm-ups in progress are abandoned since their threads don't
+    exist in child processes.
+
+    It is called automatically in child processes forked by :func:`os.fork`.
+    Call it in child processes forked by other ways.
+
+    """
+    sensitivities: Dict[BaseContainer, Callable[[BaseResource[Any]], bool]]
+    sensitivities = {}
+    for root in list(_roots):
+        contexts = [root]
+        while contexts:
+            context = contexts.pop()
+            contexts.extend(context.children)
+            sensitive = sensitivities.get(context.container)
+            if sensitive is None:
+                sensitive = sensitivities[context.container] = (
+                    fork_sensitivity(context.container)
+                )
+            context._after_fork(sensitive)
+
+
+def fork_sensitivity(
+    container: BaseContainer,
+) -> Callable[[BaseResource[Any]], bool]:
+    """
+    Make a predicate telling whether resources of the container are fork
+    sensitive, or depend on fork sensitive resources.
+
+    Dependencies of implementations resolving their own dependencies are
+    unknown, so their resources are sensitive only if they are marked as fork
+    sensitive themselves. Lazy dependencies are as sensitive as their
+    targets, since they hold resolved targets.
+
+    """
+    memo: Dict[BaseResource[Any], bool] = {}
+
+    def marked(resource: BaseResource[Any]) -> bool:
+        return isinstance(resource, Resource) and resource.fork_sensitive
+
+    def dependencies(
+        resource: BaseResource[Any],
+    ) -> Tuple[BaseResource[Any], ...]:
+        if marked(resource):
+            return ()
+        if isinstance(resource, Lazy):
+            return (resource.resource,)
+        try:
+            impl = container.find_implementation(resource)
+        except ResourceNotProvidedError:
+            return ()
+        if not isinstance(
+            impl,
+            (ContextManagerImplementation, AsyncContextManagerImplementation),
+        ):
+            return ()
+        return impl.dependencies()
+
+    def sensitive(resource: BaseResource[Any]) -> bool:
+        result = memo.get(resource)
+        if result is not None:
+            return result
+        # Walk dependencies without recursion, like compiling plans
+        stack = [(resource, iter(dependencies(resource)))]
+        on_path = {resource}
+        while stack:
+            current, rest = stack[-1]
+            for dependency in rest:
+                if dependency in memo or dependency in on_path:
+                    continue
+                stack.append((dependency, iter(dependencies(dependency))))
+                on_path.add(dependency)
+                break
+            else:
+                stack.pop()
+                on_path.discard(current)
+                memo[current] = marked(current) or any(
+                    memo.get(dependency, False)
+                    for dependency in dependencies(current)
+                )
+        return memo[resource]
+
+    return sensitive
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=after_fork)
@@ -0,0 +1,133 @@
+"""
+autowire.graph
+==============
+
+Dependency graphs of containers.
+
+The graph of a container holds every resource reachable from the resources
+provided to the container and its ancestors, so that the whole graph can be
+checked once at startup instead of failing in the middle of a request.
+
+"""
+from __future__ import annotations
+
+import collections
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from autowire.base_resource import BaseResource
+from autowire.exc import CircularDependencyError, ResourceNotProvidedError
+from autowire.implementation import Implementation
+from autowire.lazy import Lazy
+
+if TYPE_CHECKING:  # pragma: no cover
+    from autowire.base_container import BaseContainer
+
+
+class DependencyGraph(object):
+    """
+    Declared dependencies of resources.
+
+    """
+
+    def __init__(
+        self,
+        dependencies: Dict[BaseResource[Any], Tuple[BaseResource[Any], ...]],
+        missing: Set[BaseResource[Any]],
+        implementations: Dict[BaseResource[Any], Implementation[Any]],
+    ):
+        super().__init__()
+        #: Dependencies of each resource, in order of declaration
+        self.dependencies = dependencies
+        #: Resources that are depended on but not provided
+        self.missing = missing
+        #: Implementation of each resource
+        self.implementations = implementations
+
+    def __len__(self) -> int:
+        return len(self.dependencies)
+
+    def __contains__(self, resource: BaseResource[Any]) -> bool:
+        return resource in self.dependencies
+
+    def find_cycle(self) -> Optional[List[BaseResource[Any]]]:
+        """
+        Find a circular dependency in linear time.
+
+        Returns resources on the cycle, which begins and ends with the same
+        resource, or ``None`` if there's no cycle.
+
+        """
+        done: Set[BaseResource[Any]] = set()
+        for start in self.dependencies:
+            if start in done:
+                continue
+            path = [start]
+            on_path = {start}
+            stack = [iter(self.dependencies[start])]
+            while stack:
+                for dependency in stack[-1]:
+                    if dependency in done or dependency in self.missing:
+                        continue
+                    if dependency in on_path:
+                        return path[path.index(dependency) :] + [dependency]
+                    path.append(dependency)
+                    on_path.add(dependency)
+                    stack.append(iter(self.dependencies[dependency]))
+                    break
+                else:
+                    stack.pop()
+                    done.add(path[-1])
+                    on_path.discard(path.pop())
+        return None
+
+    def check_cycles(self):
+        """
+        Raise :class:`~autowire.exc.CircularDependencyError` if any resource
+        depends on itself.
+
+        """
+        cycle = self.find_cycle()
+        if cycle is not None:
+            raise CircularDependencyError(
+                "Circular dependency",
+                [resource.canonical_name for resource in cycle],
+            )
+
+
+def build_graph(
+    container: BaseContainer, resources: Iterable[BaseResource[Any]]
+) -> DependencyGraph:
+    """
+    Build the dependency graph of resources and all of their dependencies
+    from the container.
+
+    """
+    dependencies: Dict[BaseResource[Any], Tuple[BaseResource[Any], ...]] = {}
+    missing: Set[BaseResource[Any]] = set()
+    implementations: Dict[BaseResource[Any], Implementation[Any]] = {}
+    queue = collections.deque(resources)
+    while queue:
+        resource = queue.popleft()
+        if resource in dependencies or resource in missing:
+            continue
+        try:
+            impl = container.find_implementation(resource)
+        except ResourceNotProvidedError:
+            missing.add(resource)
+            continue
+        implementations[resource] = impl
+        dependencies[resource] = impl.dependencies()
+        queue.extend(dependencies[resource])
+        if isinstance(resource, Lazy):
+            # Not a dependency, but still has to be provided
+            queue.append(resource.resource)
+    return DependencyGraph(dependencies, missing, implementations)
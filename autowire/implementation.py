@@ -2,10 +2,23 @@ from __future__ import annotations
 
 import abc
 import contextlib
-from typing import Any, Callable, ContextManager, Dict, Generic, Tuple, TypeVar
+import inspect
+from typing import (
+    Any,
+    AsyncContextManager,
+    Callable,
+    ContextManager,
+    Dict,
+    Generic,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 from autowire.base_resource import BaseResource
+from autowire.exc import AsyncResourceError
 from autowire.provider import ResourceProvider
+from autowire.scope import Scope
 
 R = TypeVar("R")
 
@@ -16,6 +29,16 @@ class Implementation(Generic[R], metaclass=abc.ABCMeta):
 
     """
 
+    #: Lifetime of reified resources.
+    #: ``None`` to follow the scope of the resource.
+    scope: Optional[Scope] = None
+
+    #: Whether reified resources have to be released when contexts are
+    #: drained. Implementations without teardown should set it false and
+    #: override :meth:`create`, so that contexts can create resources
+    #: directly without entering context managers.
+    managed: bool = True
+
     @abc.abstractmethod
     def reify(
         self,
@@ -28,6 +51,38 @@ class Implementation(Generic[R], metaclass=abc.ABCMeta):
         """
         pass
 
+    def dependencies(self) -> Tuple[BaseResource[Any], ...]:
+        """
+        Resources that this implementation declares to be injected.
+
+        Implementations that resolve their dependencies dynamically in
+        :meth:`reify` can leave this empty.
+
+        """
+        return ()
+
+    def check_signature(self):
+        """
+        Check that declared dependencies can be injected.
+
+        :raises TypeError: if they don't match with the signature of the
+                           factory.
+
+        """
+        pass
+
+    def create(
+        self, resource: BaseResource[R], provider: ResourceProvider
+    ) -> R:
+        """
+        Create the resource without context manager.
+
+        It is used instead of :meth:`reify` if :attr:`managed` is false.
+
+        """
+        with self.reify(resource, provider) as resolved:
+            return resolved
+
 
 class ContextManagerImplementation(Implementation[R]):
     """
@@ -40,11 +95,42 @@ class ContextManagerImplementation(Implementation[R]):
         manager_generator: Callable[..., ContextManager[R]],
         arg_resources: Tuple[BaseResource[Any], ...],
         kwarg_resources: Dict[str, BaseResource[Any]],
+        scope: Optional[Scope] = None,
     ):
         super().__init__()
         self.manager_generator = manager_generator
         self.arg_resources = arg_resources
         self.kwarg_resources = kwarg_resources
+        self.scope = None if scope is None else Scope(scope)
+        #: Function creating resources from injected values directly,
+        #: if resources need no teardown
+        self.function: Optional[Callable[..., R]] = None
+
+    def dependencies(self) -> Tuple[BaseResource[Any], ...]:
+        return self.arg_resources + tuple(self.kwarg_resources.values())
+
+    def check_signature(self):
+        _check_arguments(
+            self.manager_generator if self.function is None else self.function,
+            self.arg_resources,
+            self.kwarg_resources,
+        )
+
+    @property
+    def managed(self) -> bool:  # type: ignore[override]
+        return self.function is None
+
+    def create(
+        self, resource: BaseResource[R], provider: ResourceProvider
+    ) -> R:
+        if self.function is None:
+            return super().create(resource, provider)
+        args = [provider.resolve(arg) for arg in self.arg_resources]
+        kwargs = {
+            name: provider.resolve(arg)
+            for name, arg in self.kwarg_resources.items()
+        }
+        return self.function(*args, **kwargs)
 
     def reify(
         self,
@@ -71,13 +157,15 @@ class PlainFunctionImplementation(ContextManagerImplementation[R]):
         fn: Callable[..., R],
         arg_resources: Tuple[BaseResource[Any], ...],
         kwarg_resources: Dict[str, BaseResource[Any]],
+        scope: Optional[Scope] = None,
     ):
         @contextlib.contextmanager
         def manager(*args, **kwargs):
             yield fn(*args, **kwargs)
 
-        super().__init__(manager, arg_resources, kwarg_resources)
+        super().__init__(manager, arg_resources, kwarg_resources, scope)
         self.fn = fn
+        self.function = fn
 
 
 class ConstantImplementation(ContextManagerImplementation[R]):
@@ -86,13 +174,70 @@ class ConstantImplementation(ContextManagerImplementation[R]):
 
     """
 
-    def __init__(
-        self,
-        value: R
-    ):
+    def __init__(self, value: R, scope: Optional[Scope] = None):
         @contextlib.contextmanager
         def manager():
             yield value
 
-        super().__init__(manager, (), {})
+        super().__init__(manager, (), {}, scope)
         self.value = value
+        self.function = lambda: value
+
+
+class AsyncContextManagerImplementation(Implementation[R]):
+    """
+    Use asynchronous context manager as an implementation
+
+    It can only be resolved by :meth:`autowire.async_context.AsyncContext.aresolve`.
+
+    """
+
+    def __init__(
+        self,
+        manager_generator: Callable[..., AsyncContextManager[R]],
+        arg_resources: Tuple[BaseResource[Any], ...],
+        kwarg_resources: Dict[str, BaseResource[Any]],
+        scope: Optional[Scope] = None,
+    ):
+        super().__init__()
+        self.manager_generator = manager_generator
+        self.arg_resources = arg_resources
+        self.kwarg_resources = kwarg_resources
+        self.scope = None if scope is None else Scope(scope)
+
+    def dependencies(self) -> Tuple[BaseResource[Any], ...]:
+        return self.arg_resources + tuple(self.kwarg_resources.values())
+
+    def check_signature(self):
+        _check_arguments(
+            self.manager_generator, self.arg_resources, self.kwarg_resources
+        )
+
+    def reify(
+        self,
+        resource: BaseResource[R],
+        provider: ResourceProvider,
+    ) -> ContextManager[R]:
+        raise AsyncResourceError(
+            "Asynchronous resource cannot be resolved synchronously",
+            resource.canonical_name,
+        )
+
+
+def _check_arguments(
+    fn: Callable[..., Any],
+    arg_resources: Tuple[BaseResource[Any], ...],
+    kwarg_resources: Dict[str, BaseResource[Any]],
+):
+    try:
+        signature = inspect.signature(fn)
+    except (TypeError, ValueError):
+        # Signature of some builtins can't be inspected
+        return
+    try:
+        signature.bind(*arg_resources, **kwarg_resources)
+    except TypeError as e:
+        name = getattr(fn, "__qualname__", repr(fn))
+        raise TypeError(
+            f"Cannot inject resources to {name}{signature}: {e}"
+        ) from e
@@ -0,0 +1,171 @@
+"""
+autowire.injection
+==================
+
+Injecting resources into function calls.
+
+"""
+from __future__ import annotations
+
+import inspect
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
+
+from autowire.base_resource import BaseResource
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+#: Attribute of functions holding their injections
+_ATTRIBUTE = "__autowire_injection__"
+
+
+class Injection(object):
+    """
+    Resources to be injected into a function, computed once on decoration.
+
+    """
+
+    __slots__ = (
+        "fn",
+        "arg_resources",
+        "kwarg_resources",
+        "asynchronous",
+        "arg_names",
+        "rest_names",
+        "positions",
+    )
+
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        arg_resources: Tuple[BaseResource[Any], ...],
+        kwarg_resources: Dict[str, BaseResource[Any]],
+    ):
+        super().__init__()
+        self.fn = fn
+        self.arg_resources = arg_resources
+        #: Pairs of keyword argument names and resources
+        self.kwarg_resources = tuple(kwarg_resources.items())
+        #: Whether the function is a coroutine function
+        self.asynchronous = inspect.iscoroutinefunction(fn)
+        try:
+            parameters = list(inspect.signature(fn).parameters.values())
+        except (TypeError, ValueError):
+            parameters = []
+        positional = [
+            parameter.name
+            for parameter in parameters
+            if parameter.kind
+            in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+        ]
+        injected = len(arg_resources)
+        #: Names of parameters injected positionally
+        self.arg_names = tuple(positional[:injected])
+        #: Names of positional parameters following them
+        self.rest_names = tuple(positional[injected:])
+        #: Names of parameters injected by keywords that can be given
+        #: positionally, with the number of positional arguments of callers
+        #: binding them
+        self.positions = tuple(
+            (name, positional.index(name) - injected + 1)
+            for name in kwarg_resources
+            if name in positional[injected:]
+        )
+
+    @property
+    def resources(self) -> Tuple[BaseResource[Any], ...]:
+        """
+        Every resource to be injected, positional ones first.
+
+        """
+        return self.arg_resources + tuple(
+            resource for _, resource in self.kwarg_resources
+        )
+
+    def arrange(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[
+        Tuple[BaseResource[Any], ...],
+        Tuple[Tuple[str, BaseResource[Any]], ...],
+        Tuple[Any, ...],
+    ]:
+        """
+        Leave out resources of parameters given by callers, since explicit
+        arguments win over injected ones.
+
+        Returns resources to be injected positionally, ones to be injected
+        by keywords, and positional arguments to be passed. If parameters
+        injected positionally are given by keywords, the rest of them are
+        injected by keywords as well, and positional arguments are moved
+        into ``kwargs`` by names of the parameters following them.
+
+        """
+        kwarg_resources = tuple(
+            (name, resource)
+            for name, resource in self.kwarg_resources
+            if name not in kwargs
+        )
+        if self.positions and args:
+            bound = {name for name, n in self.positions if len(args) >= n}
+            kwarg_resources = tuple(
+                (name, resource)
+                for name, resource in kwarg_resources
+                if name not in bound
+            )
+        if not any(name in kwargs for name in self.arg_names):
+            return self.arg_resources, kwarg_resources, args
+        if len(args) > len(self.rest_names):
+            raise TypeError(
+                "Too many positional arguments to be passed with injected "
+                "ones given by keywords",
+                self.fn,
+            )
+        rest: List[Tuple[str, BaseResource[Any]]] = [
+            (name, resource)
+            for name, resource in zip(self.arg_names, self.arg_resources)
+            if name not in kwargs
+        ]
+        kwargs.update(zip(self.rest_names, args))
+        return (), tuple(rest) + kwarg_resources, ()
+
+    def __repr__(self):  # pragma: no cover
+        names = [resource.canonical_name for resource in self.resources]
+        return f"Injection({self.fn!r}, {names!r})"
+
+
+def inject(
+    *arg_resources: BaseResource[Any], **kwarg_resources: BaseResource[Any]
+) -> Callable[[F], F]:
+    """
+    Declare resources to be injected into the function when it is called by
+    :meth:`~autowire.context.Context.call`.
+
+    arg_resources are passed before other positional arguments, and
+    kwarg_resources are passed as keyword arguments. ::
+
+        @inject(db=db_connection, cache=cache_client)
+        def get_user(user_id: int, *, db: Connection, cache: Client) -> User:
+            ...
+
+        with container.context() as context:
+            user = context.call(get_user, 42)
+
+    The function is left as is, so it can still be called with explicit
+    arguments. Arguments given to :meth:`~autowire.context.Context.call`
+    win over injected ones as well, so those resources are not resolved.
+
+    """
+
+    def decorator(fn: F) -> F:
+        setattr(fn, _ATTRIBUTE, Injection(fn, arg_resources, kwarg_resources))
+        return fn
+
+    return decorator
+
+
+def find_injection(fn: Callable[..., Any]) -> Injection:
+    """
+    Find the injection of the function decorated by :func:`inject`.
+
+    """
+    try:
+        return getattr(fn, _ATTRIBUTE)
+    except AttributeError:
+        raise TypeError("Function is not decorated by inject()", fn) from None
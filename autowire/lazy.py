@@ -0,0 +1,143 @@
+"""
+autowire.lazy
+=============
+
+Deferred injection of resources.
+
+A dependency declared with :class:`Lazy` is not resolved before its
+dependent is created. The dependent receives a :class:`Deferred` instead,
+which resolves the resource in the resolving context when it is called for
+the first time, so resources used only by some code paths are not created
+for nothing.
+
+"""
+from __future__ import annotations
+
+import contextlib
+from typing import Any, ContextManager, Generic, TypeVar
+
+from autowire.base_resource import BaseResource
+from autowire.implementation import Implementation
+from autowire.provider import ResourceProvider
+from autowire.scope import Scope
+
+R = TypeVar("R")
+
+#: Marker for deferred values that are not resolved yet
+_UNRESOLVED: Any = object()
+
+
+class Deferred(Generic[R]):
+    """
+    Resource to be resolved on first call. ::
+
+        connection = deferred()
+
+    The resource is resolved by the context that created the dependent, and
+    pooled there as if it was injected eagerly. It is still released after
+    the dependent, which is pooled before it. Further calls return the same
+    value without looking it up again.
+
+    """
+
+    __slots__ = ("provider", "resource", "_value", "_mark")
+
+    def __init__(self, provider: ResourceProvider, resource: BaseResource[R]):
+        super().__init__()
+        self.provider = provider
+        self.resource = resource
+        self._value: Any = _UNRESOLVED
+        # Created right before the dependent, which is resolved after it
+        self._mark = provider.release_mark()
+
+    @property
+    def resolved(self) -> bool:
+        """
+        Whether the resource has been resolved.
+
+        """
+        return self._value is not _UNRESOLVED
+
+    def __call__(self) -> R:
+        value = self._value
+        if value is _UNRESOLVED:
+            value = self._value = self.provider.resolve_after(
+                self.resource, self._mark
+            )
+        return value
+
+    def __repr__(self):  # pragma: no cover
+        state = "resolved" if self.resolved else "unresolved"
+        return f"Deferred({self.resource.canonical_name!r}, {state})"
+
+
+class LazyImplementation(Implementation[Deferred[Any]]):
+    """
+    Implementation of :class:`Lazy` resources, creating
+    :class:`Deferred` bound to the resolving context.
+
+    """
+
+    #: Every dependent gets its own deferred value, bound to the context
+    #: creating the dependent
+    scope = Scope.TRANSIENT
+
+    managed = False
+
+    def reify(
+        self, resource: BaseResource[Deferred[Any]], provider: ResourceProvider
+    ) -> ContextManager[Deferred[Any]]:
+        return contextlib.nullcontext(self.create(resource, provider))
+
+    def create(
+        self, resource: BaseResource[Deferred[Any]], provider: ResourceProvider
+    ) -> Deferred[Any]:
+        assert isinstance(resource, Lazy)
+        return Deferred(provider, resource.resource)
+
+
+#: Shared by every lazy resource, since it holds no state
+_IMPLEMENTATION = LazyImplementation()
+
+
+class Lazy(BaseResource[Deferred[R]]):
+    """
+    Declare a dependency to be resolved on first access. ::
+
+        @user_service.plain(cache_client, db=Lazy(db_connection))
+        def create_user_service(cache: Client, *, db: Deferred[Connection]):
+            return UserService(cache, get_db=db)
+
+    The dependent is injected a :class:`Deferred` resolving the resource
+    when it is called, so the resource and its dependencies are created only
+    if the dependent actually uses them.
+
+    The resource is resolved by the context that created the dependent, and
+    released when the context is drained. Deferred values should not be
+    called after the context is drained.
+
+    Lazy dependencies are not followed by resolution plans, so they don't
+    make circular dependencies either. They are still checked to be
+    provided by :meth:`~autowire.base_container.BaseContainer.validate`.
+
+    """
+
+    __slots__ = ("resource",)
+
+    #: Resource to be resolved on first access
+    resource: BaseResource[R]
+
+    def __init__(self, resource: BaseResource[R]):
+        super().__init__("<lazy>", resource.canonical_name)
+        object.__setattr__(self, "resource", resource)
+
+    @property
+    def implementation(self) -> Implementation[Any]:
+        """
+        Implementation creating deferred values of the resource.
+
+        """
+        return _IMPLEMENTATION
+
+    def __repr__(self):  # pragma: no cover
+        return f"Lazy({self.resource!r})"
@@ -0,0 +1,116 @@
+"""
+autowire.observer
+=================
+
+Instrumentation hooks of contexts.
+
+An observer given to a context receives events of resolving, creating and
+releasing resources of the context and its children. Contexts without an
+observer don't pay for the instrumentation.
+
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from autowire.base_resource import BaseResource
+
+if TYPE_CHECKING:  # pragma: no cover
+    from autowire.context import Context
+
+
+class Observer(object):
+    """
+    Base class of observers, which ignores every event. ::
+
+        class SlowResourceLogger(Observer):
+            def on_enter(self, context, resource, seconds):
+                if seconds > 0.1:
+                    logger.warning("%s is slow", resource.canonical_name)
+
+        with container.context(observer=SlowResourceLogger()) as context:
+            ...
+
+    Events may be sent from multiple threads in thread safe contexts or
+    when resources are preloaded in parallel.
+
+    """
+
+    def on_lookup(
+        self,
+        context: Context,
+        resource: BaseResource[Any],
+        hit: bool,
+        depth: int,
+    ):
+        """
+        Called when a resource is looked up from resource pools.
+
+        :param hit: whether the resource was pooled already.
+        :param depth: number of parent contexts looked up, which is the
+                      distance to the context pooling the resource if hit.
+        """
+        pass
+
+    def on_resolve_start(self, context: Context, resource: BaseResource[Any]):
+        """
+        Called before creating a resource that is not pooled, and its
+        dependencies that are not pooled either.
+
+        Resolutions are nested, dependencies are resolved while the resource
+        depending on them is being resolved.
+
+        """
+        pass
+
+    def on_resolve_end(self, context: Context, resource: BaseResource[Any]):
+        """
+        Called after a resource is created, or failed to be created.
+
+        """
+        pass
+
+    def on_reify(
+        self, context: Context, resource: BaseResource[Any], seconds: float
+    ):
+        """
+        Called after the implementation of a resource is reified into its
+        context manager, or into the resource itself if it has nothing to
+        release.
+
+        Implementations resolving their own dependencies are timed with
+        entering their context managers, and reported as entered in no time.
+
+        """
+        pass
+
+    def on_enter(
+        self, context: Context, resource: BaseResource[Any], seconds: float
+    ):
+        """
+        Called after the context manager of a resource is entered.
+
+        """
+        pass
+
+    def on_exit(
+        self, context: Context, resource: BaseResource[Any], seconds: float
+    ):
+        """
+        Called after the context manager of a resource is exited on drain.
+
+        """
+        pass
+
+    def on_exit_error(
+        self,
+        context: Context,
+        resource: BaseResource[Any],
+        exc: BaseException,
+    ):
+        """
+        Called after the context manager of a resource failed to be exited,
+        following :meth:`on_exit`.
+
+        """
+        pass
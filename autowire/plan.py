@@ -0,0 +1,231 @@
+"""
+autowire.plan
+=============
+
+Compiled resolution plans.
+
+A plan flattens the dependency graph of a resource into a topologically
+ordered list of steps, so that a context can build the resource and all of
+its dependencies with a single loop instead of recursive lookups.
+
+"""
+from __future__ import annotations
+
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from autowire.base_resource import BaseResource
+from autowire.cache import CachePolicy
+from autowire.exc import CircularDependencyError
+from autowire.implementation import (
+    AsyncContextManagerImplementation,
+    ContextManagerImplementation,
+    Implementation,
+)
+from autowire.resource import Resource
+from autowire.scope import Scope
+
+if TYPE_CHECKING:  # pragma: no cover
+    from autowire.base_container import BaseContainer
+
+
+class PlanStep(NamedTuple):
+    """
+    A step of resolution plan that reifies a single resource.
+
+    Slots are indices of the plan steps whose values should be injected.
+
+    """
+
+    resource: BaseResource[Any]
+    implementation: Implementation[Any]
+    #: Factory of the context manager.
+    #: ``None`` if the implementation should be reified by itself.
+    factory: Optional[Callable[..., Any]]
+    arg_slots: Tuple[int, ...]
+    kwarg_slots: Tuple[Tuple[str, int], ...]
+    dependency_slots: Tuple[int, ...]
+    #: Whether the factory creates an asynchronous context manager
+    asynchronous: bool = False
+    #: Lifetime of the resource
+    scope: Scope = Scope.CONTEXT
+    #: Whether the resource is created by a context manager.
+    #: Otherwise the factory returns the resource itself, and nothing has to
+    #: be released on drain.
+    managed: bool = True
+    #: Policy holding the resource instead of the resource pool
+    cache: Optional[CachePolicy] = None
+    #: Whether the resource should be discarded in forked child processes
+    fork_sensitive: bool = False
+
+
+class ResolutionPlan(object):
+    """
+    Topologically ordered steps for resolving a resource.
+
+    The last step always reifies the resource itself.
+
+    """
+
+    def __init__(self, resource: BaseResource[Any], steps: List[PlanStep]):
+        super().__init__()
+        self.resource = resource
+        self.steps = tuple(steps)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __iter__(self) -> Iterator[PlanStep]:
+        return iter(self.steps)
+
+    def __repr__(self):  # pragma: no cover
+        names = ", ".join(step.resource.canonical_name for step in self.steps)
+        return f"ResolutionPlan({self.resource.canonical_name!r}, [{names}])"
+
+
+def compile_plan(
+    container: BaseContainer, resource: BaseResource[Any]
+) -> ResolutionPlan:
+    """
+    Compile the resolution plan of the resource from the container.
+
+    """
+    steps: List[PlanStep] = []
+    index: Dict[BaseResource[Any], int] = {}
+    on_path: Set[BaseResource[Any]] = {resource}
+
+    impl = container.find_implementation(resource)
+    stack = [(resource, impl, iter(impl.dependencies()))]
+    while stack:
+        current, impl, dependencies = stack[-1]
+        for dependency in dependencies:
+            if dependency in index:
+                continue
+            if dependency in on_path:
+                path = [entry[0].canonical_name for entry in stack]
+                raise CircularDependencyError(
+                    "Circular dependency",
+                    path[path.index(dependency.canonical_name) :]
+                    + [dependency.canonical_name],
+                )
+            dependency_impl = container.find_implementation(dependency)
+            stack.append(
+                (
+                    dependency,
+                    dependency_impl,
+                    iter(dependency_impl.dependencies()),
+                )
+            )
+            on_path.add(dependency)
+            break
+        else:
+            stack.pop()
+            on_path.discard(current)
+            index[current] = len(steps)
+            steps.append(_make_step(current, impl, index))
+    return ResolutionPlan(resource, steps)
+
+
+def merge_plans(
+    plans: Sequence[ResolutionPlan],
+) -> Tuple[List[PlanStep], List[int]]:
+    """
+    Merge resolution plans into topologically ordered steps without
+    duplication.
+
+    Steps of transient resources are not merged but kept for each plan, so
+    that they are created for each of them as if they were resolved one by
+    one.
+
+    Returns merged steps and indices of the steps for planned resources.
+
+    """
+    steps: List[PlanStep] = []
+    index: Dict[BaseResource[Any], int] = {}
+    targets: List[int] = []
+    for plan in plans:
+        slots = [0] * len(plan.steps)
+        for i, step in enumerate(plan.steps):
+            if step.scope is Scope.TRANSIENT:
+                slots[i] = len(steps)
+            elif step.resource in index:
+                slots[i] = index[step.resource]
+                continue
+            else:
+                slots[i] = index[step.resource] = len(steps)
+            steps.append(
+                step._replace(
+                    arg_slots=tuple(slots[s] for s in step.arg_slots),
+                    kwarg_slots=tuple(
+                        (name, slots[s]) for name, s in step.kwarg_slots
+                    ),
+                    dependency_slots=tuple(
+                        slots[s] for s in step.dependency_slots
+                    ),
+                )
+            )
+        targets.append(slots[-1])
+    return steps, targets
+
+
+def _make_step(
+    resource: BaseResource[Any],
+    impl: Implementation[Any],
+    index: Dict[BaseResource[Any], int],
+) -> PlanStep:
+    scope = impl.scope
+    if scope is None:
+        scope = (
+            resource.scope if isinstance(resource, Resource) else Scope.CONTEXT
+        )
+    cache = None
+    if isinstance(resource, Resource) and scope is not Scope.TRANSIENT:
+        cache = resource.cache
+    fork_sensitive = isinstance(resource, Resource) and resource.fork_sensitive
+    if not isinstance(
+        impl,
+        (ContextManagerImplementation, AsyncContextManagerImplementation),
+    ):
+        # Opaque implementation, resolves its own dependencies
+        return PlanStep(
+            resource,
+            impl,
+            None,
+            (),
+            (),
+            (),
+            False,
+            scope,
+            impl.managed,
+            cache,
+            fork_sensitive,
+        )
+    arg_slots = tuple(index[arg] for arg in impl.arg_resources)
+    kwarg_slots = tuple(
+        (name, index[arg]) for name, arg in impl.kwarg_resources.items()
+    )
+    function = getattr(impl, "function", None)
+    return PlanStep(
+        resource,
+        impl,
+        impl.manager_generator if function is None else function,
+        arg_slots,
+        kwarg_slots,
+        arg_slots + tuple(slot for _, slot in kwarg_slots),
+        isinstance(impl, AsyncContextManagerImplementation),
+        scope,
+        function is None,
+        cache,
+        fork_sensitive,
+    )
@@ -0,0 +1,492 @@
+"""
+autowire.pool
+=============
+
+Pooling implementation for expensive resources.
+
+Resources of a :class:`PooledImplementation` are not created and released
+for each context. Their context managers are entered once, kept in a bounded
+pool shared by every context, and lent to contexts resolving them until the
+contexts are drained.
+
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from autowire.async_context import AsyncContext
+from autowire.base_resource import BaseResource
+from autowire.exc import PoolExhaustedError
+from autowire.implementation import Implementation, _check_arguments
+from autowire.provider import ResourceProvider
+from autowire.scope import Scope
+
+R = TypeVar("R")
+
+
+class PoolStats(object):
+    """
+    Counters of a resource pool.
+
+    """
+
+    __slots__ = (
+        "hits",
+        "misses",
+        "waits",
+        "timeouts",
+        "created",
+        "closed",
+        "unhealthy",
+    )
+
+    def __init__(self):
+        super().__init__()
+        #: Number of acquisitions served by idle instances
+        self.hits = 0
+        #: Number of acquisitions that created new instances
+        self.misses = 0
+        #: Number of acquisitions that waited for instances to be returned
+        self.waits = 0
+        #: Number of acquisitions that gave up waiting
+        self.timeouts = 0
+        #: Number of created instances
+        self.created = 0
+        #: Number of released instances
+        self.closed = 0
+        #: Number of instances failed health checks or resets
+        self.unhealthy = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):  # pragma: no cover
+        return f"PoolStats({self.as_dict()!r})"
+
+
+class _Idle(object):
+    # Instance waiting in the pool
+    __slots__ = ("value", "manager", "since")
+
+    def __init__(self, value: Any, manager: ContextManager[Any]):
+        super().__init__()
+        self.value = value
+        self.manager = manager
+        self.since = time.monotonic()
+
+
+class _Lease(object):
+    # Context manager lending an instance to a context until it is drained
+    __slots__ = ("pool", "resource", "provider", "idle")
+
+    def __init__(
+        self,
+        pool: PooledImplementation[Any],
+        resource: BaseResource[Any],
+        provider: ResourceProvider,
+    ):
+        super().__init__()
+        self.pool = pool
+        self.resource = resource
+        self.provider = provider
+        self.idle: Optional[_Idle] = None
+
+    def __enter__(self):
+        self.idle = self.pool._acquire(self.resource, self.provider)
+        return self.idle.value
+
+    def __exit__(self, type_, value, traceback):
+        idle, self.idle = self.idle, None
+        if idle is not None:
+            self.pool._release(idle)
+
+    async def __aenter__(self):
+        self.idle = await self.pool._aacquire(self.resource, self.provider)
+        return self.idle.value
+
+    async def __aexit__(self, type_, value, traceback):
+        self.__exit__(type_, value, traceback)
+
+
+class PooledImplementation(Implementation[R]):
+    """
+    Use context manager as an implementation, pooling entered instances to
+    be reused by following contexts. ::
+
+        @contextlib.contextmanager
+        def connect(config: dict):
+            with psycopg.connect(config["DSN"]) as connection:
+                yield connection
+
+        container.provide(
+            db_connection,
+            PooledImplementation(
+                connect,
+                (global_config,),
+                max_size=10,
+                max_idle=300,
+                reset=lambda connection: connection.rollback(),
+                check=lambda connection: not connection.closed,
+            ),
+        )
+
+    Contexts draining pooled resources return them to the pool instead of
+    exiting their context managers. ``reset`` is called with returned
+    instances, and ``check`` tells whether idle instances are still usable
+    before they are lent again. Instances failing either of them are
+    released. So are instances idle longer than ``max_idle`` seconds, when
+    the pool is used next time or by :meth:`prune`.
+
+    At most ``max_size`` instances are created. Contexts resolving pooled
+    resources wait for others to return them if the pool is exhausted, and
+    raise :class:`~autowire.exc.PoolExhaustedError` after ``timeout``
+    seconds. Asynchronous contexts wait without blocking their event loops.
+
+    Dependencies are resolved by the context creating an instance, which is
+    then shared by other contexts. So pooled resources should only depend on
+    resources living longer than the pool, like container scoped ones.
+    Asynchronous contexts resolve them asynchronously, so they may be
+    asynchronous resources, but context managers of instances are still
+    entered synchronously.
+
+    """
+
+    def __init__(
+        self,
+        manager_generator: Callable[..., ContextManager[R]],
+        arg_resources: Tuple[BaseResource[Any], ...] = (),
+        kwarg_resources: Optional[Dict[str, BaseResource[Any]]] = None,
+        max_size: int = 10,
+        max_idle: Optional[float] = None,
+        timeout: Optional[float] = None,
+        reset: Optional[Callable[[R], Any]] = None,
+        check: Optional[Callable[[R], bool]] = None,
+        scope: Optional[Scope] = None,
+    ):
+        super().__init__()
+        if max_size < 1:
+            raise ValueError("Pool size must be positive", max_size)
+        self.manager_generator = manager_generator
+        self.arg_resources = arg_resources
+        self.kwarg_resources = kwarg_resources or {}
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.reset = reset
+        self.check = check
+        self.scope = None if scope is None else Scope(scope)
+        #: Counters of the pool
+        self.stats = PoolStats()
+        # Most recently returned instances are lent first
+        self._idle: Deque[_Idle] = collections.deque()
+        # Number of instances created and not released yet
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        # Tasks waiting for instances, with their event loops
+        self._waiters: List[
+            Tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]
+        ] = []
+
+    @property
+    def size(self) -> int:
+        """
+        Number of instances, including idle ones and lent ones.
+
+        """
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        """
+        Number of idle instances.
+
+        """
+        return len(self._idle)
+
+    def dependencies(self) -> Tuple[BaseResource[Any], ...]:
+        return self.arg_resources + tuple(self.kwarg_resources.values())
+
+    def check_signature(self):
+        _check_arguments(
+            self.manager_generator, self.arg_resources, self.kwarg_resources
+        )
+
+    def reify(
+        self, resource: BaseResource[R], provider: ResourceProvider
+    ) -> ContextManager[R]:
+        return _Lease(self, resource, provider)
+
+    def prune(self):
+        """
+        Release instances idle longer than ``max_idle`` seconds.
+
+        """
+        with self._condition:
+            expired = self._expire()
+        exc = self._close(expired)
+        if exc is not None:
+            raise exc
+
+    def close(self):
+        """
+        Release every idle instance. Instances lent to contexts are released
+        when they are returned, and the pool can't be used anymore.
+
+        """
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._notify(None)
+        exc = self._close(idle)
+        if exc is not None:
+            raise exc
+
+    #
+    # Privates
+    #
+
+    def _acquire(
+        self, resource: BaseResource[R], provider: ResourceProvider
+    ) -> _Idle:
+        deadline = None
+        waited = False
+        while True:
+            idle: Optional[_Idle] = None
+            expired: List[_Idle] = []
+            try:
+                with self._condition:
+                    expired = self._expire()
+                    while True:
+                        taken, idle = self._take(resource)
+                        if taken:
+                            break
+                        # Wait for other contexts to return instances
+                        if not waited:
+                            waited = True
+                            self.stats.waits += 1
+                        if deadline is None and self.timeout is not None:
+                            deadline = time.monotonic() + self.timeout
+                        self._condition.wait(
+                            self._wait_time(resource, deadline)
+                        )
+            finally:
+                # Failing to release expired instances shouldn't fail
+                # unrelated contexts
+                self._close(expired)
+
+            if idle is None:
+                return self._create(provider)
+            if self.check is None or self._healthy(idle):
+                return idle
+            self._discard(idle)
+
+    async def _aacquire(
+        self, resource: BaseResource[R], provider: ResourceProvider
+    ) -> _Idle:
+        # Acquire an instance like _acquire, but waiting on the event loop,
+        # since other tasks on the same loop may be the ones to return them
+        loop = asyncio.get_running_loop()
+        deadline = None
+        waited = False
+        while True:
+            idle: Optional[_Idle] = None
+            expired: List[_Idle] = []
+            waiter: Optional[asyncio.Future[None]] = None
+            try:
+                with self._condition:
+                    expired = self._expire()
+                    taken, idle = self._take(resource)
+                    if not taken:
+                        if not waited:
+                            waited = True
+                            self.stats.waits += 1
+                        if deadline is None and self.timeout is not None:
+                            deadline = time.monotonic() + self.timeout
+                        timeout = self._wait_time(resource, deadline)
+                        waiter = loop.create_future()
+                        self._waiters.append((loop, waiter))
+            finally:
+                self._close(expired)
+
+            if waiter is not None:
+                try:
+                    await asyncio.wait_for(waiter, timeout)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._condition:
+                        if (loop, waiter) in self._waiters:
+                            self._waiters.remove((loop, waiter))
+                continue
+            if idle is None:
+                return await self._acreate(provider)
+            if self.check is None or self._healthy(idle):
+                return idle
+            self._discard(idle)
+
+    def _take(
+        self, resource: BaseResource[Any]
+    ) -> Tuple[bool, Optional[_Idle]]:
+        # Take an idle instance, or reserve a slot for a new one with the lock
+        # held. Nothing is taken if the pool is exhausted.
+        if self._closed:
+            raise RuntimeError("Pool is closed", resource.canonical_name)
+        if self._idle:
+            self.stats.hits += 1
+            return True, self._idle.pop()
+        if self._size < self.max_size:
+            self._size += 1
+            self.stats.misses += 1
+            return True, None
+        return False, None
+
+    def _wait_time(
+        self, resource: BaseResource[Any], deadline: Optional[float]
+    ) -> Optional[float]:
+        # Seconds to wait for instances until the deadline, with the lock held
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            self.stats.timeouts += 1
+            raise PoolExhaustedError(
+                "Timed out waiting for pooled resource",
+                resource.canonical_name,
+            )
+        return remaining
+
+    def _notify(self, n: Optional[int] = 1):
+        # Wake up threads waiting for instances with the lock held, or all of
+        # them if n is None. Waiting tasks are all woken up to compete for
+        # instances, since they can't be woken up atomically from other
+        # threads.
+        if n is None:
+            self._condition.notify_all()
+        else:
+            self._condition.notify(n)
+        waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def _create(self, provider: ResourceProvider) -> _Idle:
+        # Create an instance for the slot reserved by _acquire
+        try:
+            args = [provider.resolve(arg) for arg in self.arg_resources]
+            kwargs = {
+                name: provider.resolve(arg)
+                for name, arg in self.kwarg_resources.items()
+            }
+            return self._enter(args, kwargs)
+        except BaseException:
+            self._cancel()
+            raise
+
+    async def _acreate(self, provider: ResourceProvider) -> _Idle:
+        # Create an instance like _create, resolving dependencies without
+        # blocking the event loop if the provider is an asynchronous context
+        if not isinstance(provider, AsyncContext):
+            return self._create(provider)
+        try:
+            args = [await provider.aresolve(arg) for arg in self.arg_resources]
+            kwargs = {
+                name: await provider.aresolve(arg)
+                for name, arg in self.kwarg_resources.items()
+            }
+            return self._enter(args, kwargs)
+        except BaseException:
+            self._cancel()
+            raise
+
+    def _enter(self, args: List[Any], kwargs: Dict[str, Any]) -> _Idle:
+        manager = self.manager_generator(*args, **kwargs)
+        value = manager.__enter__()
+        with self._condition:
+            self.stats.created += 1
+        return _Idle(value, manager)
+
+    def _cancel(self):
+        # Give up the slot reserved by _acquire
+        with self._condition:
+            self._size -= 1
+            self._notify()
+
+    def _healthy(self, idle: _Idle) -> bool:
+        assert self.check is not None
+        try:
+            return bool(self.check(idle.value))
+        except Exception:
+            return False
+
+    def _release(self, idle: _Idle):
+        # Return the instance lent to a context
+        if self.reset is not None:
+            try:
+                self.reset(idle.value)
+            except Exception:
+                self._discard(idle)
+                return
+        with self._condition:
+            if not self._closed:
+                idle.since = time.monotonic()
+                self._idle.append(idle)
+                self._notify()
+                return
+            self._size -= 1
+        exc = self._close([idle])
+        if exc is not None:
+            raise exc
+
+    def _discard(self, idle: _Idle):
+        # Release an unusable instance, making room for a new one
+        with self._condition:
+            self.stats.unhealthy += 1
+            self._size -= 1
+            self._notify()
+        self._close([idle])
+
+    def _expire(self) -> List[_Idle]:
+        # Remove instances idle for too long, with the lock held
+        if self.max_idle is None:
+            return []
+        deadline = time.monotonic() - self.max_idle
+        expired: List[_Idle] = []
+        # Least recently returned instances are at the left
+        while self._idle and self._idle[0].since <= deadline:
+            expired.append(self._idle.popleft())
+        if expired:
+            self._size -= len(expired)
+            self._notify(len(expired))
+        return expired
+
+    def _close(self, instances: List[_Idle]) -> Optional[BaseException]:
+        # Release instances without the lock held, returning the first error
+        exc: Optional[BaseException] = None
+        for idle in instances:
+            try:
+                idle.manager.__exit__(None, None, None)
+            except Exception as e:
+                exc = exc or e
+        if instances:
+            with self._condition:
+                self.stats.closed += len(instances)
+        return exc
+
+
+def _wake(waiter: asyncio.Future[None]):
+    if not waiter.done():
+        waiter.set_result(None)
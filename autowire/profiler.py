@@ -0,0 +1,238 @@
+"""
+autowire.profiler
+=================
+
+Built-in observer aggregating resolution profiles.
+
+"""
+from __future__ import annotations
+
+import collections
+import contextvars
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from autowire.base_resource import BaseResource
+from autowire.observer import Observer
+
+if TYPE_CHECKING:  # pragma: no cover
+    from autowire.context import Context
+
+
+class ResourceProfile(object):
+    """
+    Aggregated profile of a resource.
+
+    """
+
+    __slots__ = (
+        "name",
+        "hits",
+        "misses",
+        "depth",
+        "created",
+        "reify_seconds",
+        "enter_seconds",
+        "exited",
+        "exit_seconds",
+    )
+
+    def __init__(self, name: str):
+        super().__init__()
+        #: Canonical name of the resource
+        self.name = name
+        #: Number of lookups that found the resource pooled
+        self.hits = 0
+        #: Number of lookups that didn't find the resource
+        self.misses = 0
+        #: Total number of parent contexts looked up
+        self.depth = 0
+        #: Number of created resources
+        self.created = 0
+        self.reify_seconds = 0.0
+        self.enter_seconds = 0.0
+        #: Number of released resources
+        self.exited = 0
+        self.exit_seconds = 0.0
+
+    @property
+    def total_seconds(self) -> float:
+        """
+        Time spent for creating and releasing the resource.
+
+        """
+        return self.reify_seconds + self.enter_seconds + self.exit_seconds
+
+    def __repr__(self):  # pragma: no cover
+        return f"ResourceProfile({self.name!r})"
+
+
+class _Frame(object):
+    # Resolution in progress
+    __slots__ = ("name", "start", "children")
+
+    def __init__(self, name: str, start: float):
+        super().__init__()
+        self.name = name
+        self.start = start
+        # Time spent for nested resolutions
+        self.children = 0.0
+
+
+class Profiler(Observer):
+    """
+    Observer that profiles resolutions by resources. ::
+
+        profiler = Profiler()
+
+        with container.context(observer=profiler) as context:
+            handle_request(context)
+
+        print(profiler.report())
+
+        with open("resolve.folded", "w") as f:
+            f.write(profiler.collapsed_stacks())
+
+    """
+
+    def __init__(self):
+        super().__init__()
+        #: Profiles by canonical names of resources
+        self.profiles: Dict[str, ResourceProfile] = {}
+        #: Self time of nested resolutions by their stacks
+        self.stacks: Dict[Tuple[str, ...], float] = collections.defaultdict(
+            float
+        )
+        self._lock = threading.Lock()
+        # Resolutions in progress, in the current thread or task
+        self._frames: contextvars.ContextVar[Tuple[_Frame, ...]] = (
+            contextvars.ContextVar(f"autowire_profiler_{id(self)}", default=())
+        )
+
+    def reset(self):
+        """
+        Discard aggregated profiles.
+
+        """
+        with self._lock:
+            self.profiles.clear()
+            self.stacks.clear()
+
+    def report(self, limit: Optional[int] = None) -> str:
+        """
+        Format profiles as a table sorted by total time spent for resources.
+
+        """
+        with self._lock:
+            profiles = sorted(
+                self.profiles.values(),
+                key=lambda profile: profile.total_seconds,
+                reverse=True,
+            )[:limit]
+        width = max([len("resource")] + [len(p.name) for p in profiles])
+        lines = [
+            f"{'resource':<{width}} {'total ms':>10} {'reify ms':>10} "
+            f"{'enter ms':>10} {'exit ms':>10} {'created':>8} {'hits':>8} "
+            f"{'misses':>8} {'depth':>6}"
+        ]
+        for p in profiles:
+            lookups = p.hits + p.misses
+            depth = p.depth / lookups if lookups else 0.0
+            lines.append(
+                f"{p.name:<{width}} {p.total_seconds * 1e3:>10.3f} "
+                f"{p.reify_seconds * 1e3:>10.3f} "
+                f"{p.enter_seconds * 1e3:>10.3f} "
+                f"{p.exit_seconds * 1e3:>10.3f} {p.created:>8} "
+                f"{p.hits:>8} {p.misses:>8} {depth:>6.2f}"
+            )
+        return "\n".join(lines)
+
+    def collapsed_stacks(self) -> str:
+        """
+        Format self time of resolutions in microseconds, in the collapsed
+        stack format of flame graph tools ::
+
+            app.service;app.pool;app.config 120
+            app.service;app.pool 3400
+            app.service 80
+
+        Dependencies are nested under resources depending on them.
+
+        """
+        with self._lock:
+            stacks = sorted(self.stacks.items())
+        return "".join(
+            f"{';'.join(stack)} {round(seconds * 1e6)}\n"
+            for stack, seconds in stacks
+        )
+
+    #
+    # Observer implementation
+    #
+
+    def on_lookup(
+        self,
+        context: Context,
+        resource: BaseResource[Any],
+        hit: bool,
+        depth: int,
+    ):
+        with self._lock:
+            profile = self._profile(resource)
+            if hit:
+                profile.hits += 1
+            else:
+                profile.misses += 1
+            profile.depth += depth
+
+    def on_resolve_start(self, context: Context, resource: BaseResource[Any]):
+        frame = _Frame(resource.canonical_name, time.perf_counter())
+        self._frames.set(self._frames.get() + (frame,))
+
+    def on_resolve_end(self, context: Context, resource: BaseResource[Any]):
+        frames = self._frames.get()
+        if not frames:  # pragma: no cover
+            return
+        frame = frames[-1]
+        elapsed = time.perf_counter() - frame.start
+        self._frames.set(frames[:-1])
+        stack = tuple(f.name for f in frames)
+        with self._lock:
+            # Concurrent dependencies may take longer than their dependent
+            self.stacks[stack] += max(elapsed - frame.children, 0.0)
+            if len(frames) > 1:
+                frames[-2].children += elapsed
+
+    def on_reify(
+        self, context: Context, resource: BaseResource[Any], seconds: float
+    ):
+        with self._lock:
+            profile = self._profile(resource)
+            profile.created += 1
+            profile.reify_seconds += seconds
+
+    def on_enter(
+        self, context: Context, resource: BaseResource[Any], seconds: float
+    ):
+        with self._lock:
+            self._profile(resource).enter_seconds += seconds
+
+    def on_exit(
+        self, context: Context, resource: BaseResource[Any], seconds: float
+    ):
+        with self._lock:
+            profile = self._profile(resource)
+            profile.exited += 1
+            profile.exit_seconds += seconds
+
+    #
+    # Privates
+    #
+
+    def _profile(self, resource: BaseResource[Any]) -> ResourceProfile:
+        name = resource.canonical_name
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = ResourceProfile(name)
+        return profile
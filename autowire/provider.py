@@ -1,5 +1,5 @@
 import abc
-from typing import TypeVar
+from typing import Any, TypeVar
 
 from autowire.base_resource import BaseResource
 
@@ -14,3 +14,19 @@ class ResourceProvider(abc.ABC):
     @abc.abstractmethod
     def resolve(self, resource: BaseResource[R]) -> R:  # pragma: no cover
         pass
+
+    def release_mark(self) -> Any:
+        """
+        Mark of resources resolved so far, for :meth:`resolve_after`.
+
+        """
+        return None
+
+    def resolve_after(self, resource: BaseResource[R], mark: Any) -> R:
+        """
+        Resolve the resource for ones resolved after ``mark``, so that it is
+        released after them even if it is created later, like lazy
+        dependencies.
+
+        """
+        return self.resolve(resource)
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
-from typing import Any, Callable, ContextManager, Optional, TypeVar
+from typing import (
+    Any,
+    AsyncContextManager,
+    Callable,
+    ContextManager,
+    Optional,
+    TypeVar,
+)
 
 from autowire.base_resource import BaseResource
+from autowire.cache import CachePolicy
 from autowire.implementation import (
+    AsyncContextManagerImplementation,
     ConstantImplementation,
     ContextManagerImplementation,
     Implementation,
     PlainFunctionImplementation,
 )
+from autowire.scope import Scope
 
 R = TypeVar("R")
 F = TypeVar("F", bound=Callable[..., Any])
 C = TypeVar("C", bound=Callable[..., ContextManager[Any]])
+A = TypeVar("A", bound=Callable[..., AsyncContextManager[Any]])
 
 
 class Resource(BaseResource[R]):
@@ -25,11 +36,109 @@ class Resource(BaseResource[R]):
 
         >>> resource = BaseResource('name', __name__)
 
+    `scope` determines how long resolved resources live.
+    See :class:`~autowire.scope.Scope` for details. ::
+
+        >>> connection_pool = Resource('pool', __name__, scope=Scope.CONTAINER)
+
+    `cache` lets a policy hold resolved resources instead of contexts.
+    See :mod:`autowire.cache` for details. ::
+
+        >>> model = Resource('model', __name__, cache=LRUCachePolicy(2))
+
+    `eager` marks resources to be created in background when contexts are
+    warmed up. See :mod:`autowire.warmup` for details. ::
+
+        >>> templates = Resource('templates', __name__, eager=True)
+
+    `fork_sensitive` marks resources that can't be shared with forked child
+    processes, like sockets. See :mod:`autowire.fork` for details. ::
+
+        >>> connection = Resource('connection', __name__, fork_sensitive=True)
+
     """
 
-    def __init__(self, name: str, namespace: str):
+    __slots__ = (
+        "_default_implementation",
+        "_scope",
+        "_cache",
+        "_eager",
+        "_fork_sensitive",
+    )
+
+    #: Incremented whenever a default implementation of any resource
+    #: changes, so containers can tell their compiled plans are stale.
+    defaults_version = 0
+
+    def __init__(
+        self,
+        name: str,
+        namespace: str,
+        scope: Scope = Scope.CONTEXT,
+        cache: Optional[CachePolicy] = None,
+        eager: bool = False,
+        fork_sensitive: bool = False,
+    ):
         super().__init__(name, namespace)
-        self.default_implementation: Optional[Implementation[R]] = None
+        self._default_implementation: Optional[Implementation[R]] = None
+        self._scope = Scope(scope)
+        self._cache = cache
+        self._eager = eager
+        self._fork_sensitive = fork_sensitive
+
+    @property
+    def scope(self) -> Scope:
+        """
+        Lifetime of resolved resource.
+
+        Implementations can override it with their own scope.
+
+        """
+        return self._scope
+
+    @property
+    def cache(self) -> Optional[CachePolicy]:
+        """
+        Policy holding resolved resource, or ``None`` to be held by the
+        resolving context until it is drained.
+
+        Transient resources are never cached.
+
+        """
+        return self._cache
+
+    @property
+    def eager(self) -> bool:
+        """
+        Whether the resource is created in background when contexts are
+        warmed up, instead of when it is resolved first.
+
+        """
+        return self._eager
+
+    @property
+    def fork_sensitive(self) -> bool:
+        """
+        Whether resolved resource is discarded in forked child processes, to
+        be created again in them.
+
+        """
+        return self._fork_sensitive
+
+    @property
+    def default_implementation(self) -> Optional[Implementation[R]]:
+        """
+        Implementation to be used when no container provides one.
+
+        """
+        return self._default_implementation
+
+    @default_implementation.setter
+    def default_implementation(
+        self, implementation: Optional[Implementation[R]]
+    ):
+        self._default_implementation = implementation
+        Resource.defaults_version += 1
 
     def plain(
         self,
@@ -98,6 +207,38 @@ class Resource(BaseResource[R]):
 
         return decorator
 
+    def async_contextual(
+        self,
+        *arg_resources: BaseResource[Any],
+        **kwarg_resources: BaseResource[Any],
+    ) -> Callable[[A], A]:
+        """
+        Set the default implementation with asynchronous context manager
+
+        arg_resources and kwarg_resources will be used for dependency injection.
+        The resource can only be resolved by
+        :meth:`~autowire.async_context.AsyncContext.aresolve`.
+
+        ::
+
+            http_session = Resource("http_session", __name__)
+
+            @http_session.async_contextual(config)
+            @contextlib.asynccontextmanager
+            async def with_http_session(config: dict):
+                async with aiohttp.ClientSession(**config) as session:
+                    yield session
+
+        """
+
+        def decorator(manager: A) -> A:
+            self.default_implementation = AsyncContextManagerImplementation(
+                manager, arg_resources, kwarg_resources
+            )
+            return manager
+
+        return decorator
+
     def set_constant(self, constant: R):
         """
         Set the default implementation with constant implementation
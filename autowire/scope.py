@@ -0,0 +1,27 @@
+"""
+autowire.scope
+==============
+
+Lifetimes of resolved resources.
+
+"""
+import enum
+
+
+class Scope(str, enum.Enum):
+    """
+    Lifetime of resolved resources.
+
+    """
+
+    #: Pooled in the context that resolved it first, and released when the
+    #: context is drained. This is the default scope.
+    CONTEXT = "context"
+
+    #: Pooled in the root context, so that it is shared by all of its
+    #: children. Its dependencies are resolved in the root context as well.
+    CONTAINER = "container"
+
+    #: Never pooled, created on every resolution and released when the
+    #: resolving context is drained.
+    TRANSIENT = "transient"
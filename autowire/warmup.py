@@ -0,0 +1,190 @@
+"""
+autowire.warmup
+===============
+
+Creating resources in background.
+
+Resources are created lazily when they are resolved first, which makes the
+first requests after startup slow. Warming up a context creates resources
+marked as eager in background as soon as the context is opened. Resolving
+them from the context returns them immediately once they are created, or
+waits for them being created instead of creating them again.
+
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from autowire.base_resource import BaseResource
+
+_Future = Union["concurrent.futures.Future[Any]", "asyncio.Future[Any]"]
+
+
+class WarmUp(object):
+    """
+    Progress of resources being created in background. ::
+
+        with container.context(warm_up=True) as context:
+            ...
+
+            def health_check() -> bool:
+                return context.warming.ready
+
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._futures: List[Tuple[BaseResource[Any], _Future]] = []
+
+    def track(self, resource: BaseResource[Any], future: _Future):
+        """
+        Track the future creating the resource, either of a thread pool or
+        of an event loop.
+
+        """
+        with self._lock:
+            self._futures.append((resource, future))
+        # Failures are reported by the warm-up rather than logged as
+        # exceptions never retrieved
+        future.add_done_callback(_retrieve)
+
+    @property
+    def total(self) -> int:
+        """
+        Number of resources to be created.
+
+        """
+        return len(self._futures)
+
+    @property
+    def completed(self) -> int:
+        """
+        Number of resources finished being created, including failed ones.
+
+        """
+        return sum(future.done() for _, future in self._snapshot())
+
+    @property
+    def progress(self) -> float:
+        """
+        Ratio of completed resources, from 0.0 to 1.0.
+
+        """
+        total = len(self._futures)
+        return 1.0 if total == 0 else self.completed / total
+
+    @property
+    def done(self) -> bool:
+        """
+        Whether nothing is being created anymore.
+
+        """
+        return all(future.done() for _, future in self._snapshot())
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether every resource is created successfully.
+
+        """
+        return all(
+            future.done()
+            and not future.cancelled()
+            and future.exception() is None
+            for _, future in self._snapshot()
+        )
+
+    @property
+    def pending(self) -> List[str]:
+        """
+        Names of resources still being created.
+
+        """
+        return [
+            resource.canonical_name
+            for resource, future in self._snapshot()
+            if not future.done()
+        ]
+
+    @property
+    def failed(self) -> Dict[str, BaseException]:
+        """
+        Exceptions of resources failed to be created, by their names.
+
+        """
+        failed: Dict[str, BaseException] = {}
+        for resource, future in self._snapshot():
+            if future.done() and not future.cancelled():
+                exc = future.exception()
+                if exc is not None:
+                    failed[resource.canonical_name] = exc
+        return failed
+
+    def cancel(self):
+        """
+        Stop creating resources that are not started yet.
+
+        Resources being created on event loops are left to be created,
+        so that none of them is abandoned halfway.
+
+        """
+        for _, future in self._snapshot():
+            if isinstance(future, concurrent.futures.Future):
+                future.cancel()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for resources being created in threads, returning whether
+        every resource is ready.
+
+        """
+        futures = [
+            future
+            for _, future in self._snapshot()
+            if isinstance(future, concurrent.futures.Future)
+        ]
+        concurrent.futures.wait(futures, timeout)
+        return self.ready
+
+    async def ajoin(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for resources being created asynchronously, returning whether
+        every resource is ready.
+
+        """
+        futures = [
+            (
+                asyncio.wrap_future(future)
+                if isinstance(future, concurrent.futures.Future)
+                else future
+            )
+            for _, future in self._snapshot()
+        ]
+        if futures:
+            await asyncio.wait(futures, timeout=timeout)
+        return self.ready
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "total": self.total,
+            "completed": self.completed,
+            "pending": self.pending,
+            "failed": sorted(self.failed),
+        }
+
+    def _snapshot(self) -> List[Tuple[BaseResource[Any], _Future]]:
+        with self._lock:
+            return list(self._futures)
+
+    def __repr__(self):  # pragma: no cover
+        return f"WarmUp({self.as_dict()!r})"
+
+
+def _retrieve(future: _Future):
+    if not future.cancelled():
+        future.exception()
@@ -0,0 +1,12 @@
+"""
+Benchmarks of autowire.
+
+Each ``bench_*`` module can be run by itself ::
+
+    $ python -m benchmarks.bench_resource
+
+or all together, comparing with the stored baseline ::
+
+    $ python -m benchmarks compare
+
+"""
@@ -0,0 +1,97 @@
+"""
+Run all benchmarks, store a baseline or compare with it. ::
+
+    $ python -m benchmarks run
+    $ python -m benchmarks run --rounds 5 --save benchmarks/baseline.json
+    $ python -m benchmarks compare --threshold 0.2 resolve.
+
+``compare`` exits with status 1 if any benchmark got slower than the
+threshold relative to its reference benchmark measured in the same run,
+like ``injection.call`` to ``injection.manual``. Absolute timings are only
+compared with ``--absolute``, against a baseline from the same machine.
+
+"""
+import argparse
+import importlib
+import os
+import pkgutil
+import sys
+
+from benchmarks import harness
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def load_benchmarks():
+    for module in pkgutil.iter_modules([os.path.dirname(__file__)]):
+        if module.name.startswith("bench_"):
+            importlib.import_module(f"benchmarks.{module.name}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("command", choices=["run", "compare"])
+    parser.add_argument(
+        "prefix", nargs="?", default="", help="run benchmarks of the prefix"
+    )
+    parser.add_argument(
+        "--baseline", default=BASELINE, help="path of the baseline"
+    )
+    parser.add_argument(
+        "--save",
+        metavar="PATH",
+        help="store the results as a baseline, merged with the existing one",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="slowdown of ratios to references to be reported as a regression",
+    )
+    parser.add_argument(
+        "--absolute",
+        type=float,
+        metavar="THRESHOLD",
+        help="also report absolute slowdowns over the threshold, like 1.0",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=1,
+        help="take the best of rounds of running every benchmark",
+    )
+    args = parser.parse_args(argv)
+
+    load_benchmarks()
+    if args.command == "run":
+        results = harness.run(args.prefix, args.repeat, rounds=args.rounds)
+        if args.save:
+            baseline = (
+                harness.load(args.save)
+                if os.path.exists(args.save)
+                else {"results": {}, "ratios": {}}
+            )
+            # Ratios are only taken from benchmarks run together
+            baseline["results"].update(results)
+            baseline["ratios"].update(harness.ratios(results))
+            harness.save(args.save, baseline)
+        return 0
+
+    baseline = harness.load(args.baseline)
+    results = harness.run(
+        args.prefix, args.repeat, verbose=False, rounds=args.rounds
+    )
+    regressions = harness.compare(
+        baseline, results, args.threshold, args.absolute
+    )
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) got slower:", file=sys.stderr)
+        for name in regressions:
+            print(f"  {name}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
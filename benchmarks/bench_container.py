@@ -0,0 +1,64 @@
+"""
+Implementation lookup cost through container hierarchies.
+
+``legacy`` benchmarks use the recursive lookup that containers used before
+found implementations were cached, which walks every ancestor on each call.
+
+"""
+from typing import Any
+
+from autowire.base_container import BaseContainer
+from autowire.container import Container
+from autowire.exc import ResourceNotProvidedError
+from autowire.resource import Resource
+from benchmarks.harness import benchmark, main
+
+SIZE = 100
+
+RESOURCES = [Resource(f"r{i}", __name__) for i in range(SIZE)]
+
+
+def legacy_find_implementation(
+    self: BaseContainer, resource: Resource[Any]
+) -> Any:
+    if resource in self.implementations:
+        return self.implementations[resource]
+    elif self.parent is not None:
+        return legacy_find_implementation(self.parent, resource)
+    elif resource.default_implementation is not None:
+        return resource.default_implementation
+    else:
+        raise ResourceNotProvidedError(
+            "Resource not provided to this context", resource.canonical_name
+        )
+
+
+def find_from_leaf(depth: int, find=BaseContainer.find_implementation):
+    # Resources are provided to the root container, so lookups from the
+    # leaf have to pass through every level
+    container = Container()
+    for resource in RESOURCES:
+        container.provide_constant(resource, None)
+    for _ in range(depth - 1):
+        container = Container(container)
+
+    def stmt():
+        for resource in RESOURCES:
+            find(container, resource)
+
+    return stmt
+
+
+for depth in (1, 5, 20):
+    benchmark(f"container.find_implementation.{depth}.legacy", ops=SIZE)(
+        lambda depth=depth: find_from_leaf(depth, legacy_find_implementation)
+    )
+    benchmark(
+        f"container.find_implementation.{depth}",
+        ops=SIZE,
+        reference=f"container.find_implementation.{depth}.legacy",
+    )(lambda depth=depth: find_from_leaf(depth))
+
+
+if __name__ == "__main__":
+    main("container.")
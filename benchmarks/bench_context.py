@@ -0,0 +1,263 @@
+"""
+Resolution cost of contexts.
+
+``resolve.cached`` resolves pooled resources, while ``resolve.uncached``
+creates them in fresh contexts. ``resolve.parent_chain`` resolves resources
+pooled by the root context from the end of long chains of children, and
+``resolve.fan_out`` creates resources depending on many others.
+``context.child_churn`` mimics requests, each creating a child context,
+resolving request scoped resources on top of shared ones and draining it.
+``context.child_rebuild`` creates expensive request scoped resources in
+every child, while ``context.child_snapshot`` forks children from a snapshot
+of them, copying each value.
+``resolve.many`` resolves resources sharing dependencies at once in fresh
+child contexts, while ``resolve.each`` resolves them one by one.
+``metrics`` benchmarks count resolutions with :class:`Metrics`, and
+``timings`` ones time creations as well.
+``resolve.current`` resolves pooled resources from the current context.
+
+"""
+import contextlib
+import copy
+
+from autowire.container import Container
+from autowire.context import Context
+from autowire.current import activate, resolve
+from autowire.metrics import Metrics
+from autowire.resource import Resource
+from benchmarks.harness import benchmark, main
+
+SIZE = 100
+
+RESOURCES = [Resource(f"r{i}", __name__) for i in range(SIZE)]
+
+
+def provide_all(container: Container):
+    for i, resource in enumerate(RESOURCES):
+        container.provide_constant(resource, i)
+    container.compile()
+
+
+@benchmark("resolve.cached", ops=SIZE)
+def resolve_cached(metrics=None):
+    container = Container()
+    provide_all(container)
+    context = Context(container, None, metrics=metrics)
+    context.preload(RESOURCES)
+
+    def stmt():
+        for resource in RESOURCES:
+            context.resolve(resource)
+
+    return stmt
+
+
+@benchmark("resolve.uncached", ops=SIZE)
+def resolve_uncached(metrics=None):
+    container = Container()
+    provide_all(container)
+
+    def stmt():
+        context = Context(container, None, metrics=metrics)
+        for resource in RESOURCES:
+            context.resolve(resource)
+        context.drain()
+
+    return stmt
+
+
+@benchmark("resolve.cached.metrics", ops=SIZE, reference="resolve.cached")
+def resolve_cached_metrics():
+    return resolve_cached(Metrics())
+
+
+@benchmark("resolve.uncached.metrics", ops=SIZE, reference="resolve.uncached")
+def resolve_uncached_metrics():
+    return resolve_uncached(Metrics())
+
+
+@benchmark("resolve.uncached.timings", ops=SIZE, reference="resolve.uncached")
+def resolve_uncached_timings():
+    return resolve_uncached(Metrics(timings=True))
+
+
+@benchmark("resolve.current", ops=SIZE, reference="resolve.cached")
+def resolve_current():
+    container = Container()
+    provide_all(container)
+    context = Context(container, None)
+    context.preload(RESOURCES)
+
+    def stmt():
+        with activate(context):
+            for resource in RESOURCES:
+                resolve(resource)
+
+    return stmt
+
+
+def resolve_from_chain(depth: int):
+    container = Container()
+    provide_all(container)
+    context = Context(container, None)
+    context.preload(RESOURCES)
+    for _ in range(depth):
+        child = Context(container, context)
+        context.children.append(child)
+        context = child
+
+    def stmt():
+        for resource in RESOURCES:
+            context.resolve(resource)
+
+    return stmt
+
+
+def fan_out(width: int):
+    container = Container()
+    provide_all(container)
+    top = Resource("top", __name__)
+    container.plain(top, *RESOURCES[:width])(lambda *args: len(args))
+    container.compile()
+
+    def stmt():
+        context = Context(container, None)
+        context.resolve(top)
+        context.drain()
+
+    return stmt
+
+
+@benchmark("context.child_churn")
+def child_churn():
+    config = Resource("config", __name__)
+    pool = Resource("pool", __name__)
+    session = Resource("session", __name__)
+    user = Resource("user", __name__)
+    handler = Resource("handler", __name__)
+
+    container = Container()
+    container.provide_constant(config, {})
+    container.plain(pool, config)(lambda config: object())
+
+    @container.contextual(session, pool)
+    @contextlib.contextmanager
+    def with_session(pool):
+        yield object()
+
+    container.plain(user, session)(lambda session: "user")
+    container.plain(handler, session, user=user)(
+        lambda session, *, user: "handler"
+    )
+    container.compile()
+
+    root = Context(container, None)
+    root.preload([pool])
+
+    def stmt():
+        with root.child() as child:
+            child.resolve(handler)
+
+    return stmt
+
+
+def prototype_resources(count: int):
+    # Request scoped resources which are expensive to build but cheap to copy
+    container = Container()
+    config = Resource("config", __name__)
+    container.provide_constant(config, [str(i) for i in range(100)])
+    prototypes = [Resource(f"prototype{i}", __name__) for i in range(count)]
+    for resource in prototypes:
+        container.plain(resource, config)(
+            lambda config: {key: int(key) for key in config}
+        )
+    handler = Resource("handler", __name__)
+    container.plain(handler, *prototypes)(lambda *args: len(args))
+    container.compile()
+    root = Context(container, None)
+    root.preload([config])
+    return root, prototypes, handler
+
+
+@benchmark("context.child_rebuild")
+def child_rebuild():
+    root, _, handler = prototype_resources(10)
+
+    def stmt():
+        with root.child() as child:
+            child.resolve(handler)
+
+    return stmt
+
+
+@benchmark("context.child_snapshot", reference="context.child_rebuild")
+def child_snapshot():
+    root, prototypes, handler = prototype_resources(10)
+    warm = Context(root.container, root)
+    root.children.append(warm)
+    snapshot = warm.snapshot(prototypes, copy=copy.copy)
+
+    def stmt():
+        with root.child(snapshot=snapshot) as child:
+            child.resolve(handler)
+
+    return stmt
+
+
+def handler_resources(count: int):
+    # Request scoped resources sharing a session, on top of pooled ones
+    container = Container()
+    provide_all(container)
+    session = Resource("session", __name__)
+    container.plain(session, *RESOURCES[:10])(lambda *args: object())
+    resources = [Resource(f"handler{i}", __name__) for i in range(count)]
+    for i, resource in enumerate(resources):
+        container.plain(resource, session, RESOURCES[i])(
+            lambda session, value: value
+        )
+    container.compile()
+    root = Context(container, None)
+    root.preload(RESOURCES)
+    return root, resources
+
+
+@benchmark("resolve.many.20", reference="resolve.each.20")
+def resolve_many():
+    root, resources = handler_resources(20)
+
+    def stmt():
+        with root.child() as child:
+            child.resolve_many(resources)
+
+    return stmt
+
+
+@benchmark("resolve.each.20")
+def resolve_each():
+    root, resources = handler_resources(20)
+
+    def stmt():
+        with root.child() as child:
+            for resource in resources:
+                child.resolve(resource)
+
+    return stmt
+
+
+for depth in (1, 10, 100):
+    benchmark(
+        f"resolve.parent_chain.{depth}",
+        ops=SIZE,
+        reference=None if depth == 1 else "resolve.parent_chain.1",
+    )(lambda depth=depth: resolve_from_chain(depth))
+
+for width in (10, 100):
+    benchmark(
+        f"resolve.fan_out.{width}",
+        reference=None if width == 10 else "resolve.fan_out.10",
+    )(lambda width=width: fan_out(width))
+
+
+if __name__ == "__main__":
+    main("resolve.")
+    main("context.")
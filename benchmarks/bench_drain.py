@@ -0,0 +1,149 @@
+"""
+Drain time of large contexts.
+
+Each statement fills a context with dummy entries and drains it, so the
+numbers include the cost of filling the context.
+
+``legacy`` benchmarks use the recursive drain that contexts used before,
+which could only handle a few hundred resources before ``RecursionError``.
+
+``slow`` benchmarks drain independent resources taking a millisecond each
+to be released, one by one and concurrently.
+
+"""
+import contextlib
+import sys
+import time
+from typing import Any, List, Tuple
+
+from autowire.container import Container
+from autowire.context import Context
+from autowire.resource import Resource
+from benchmarks.harness import benchmark, main
+
+RESOURCES = [Resource(f"r{i}", __name__) for i in range(10000)]
+
+
+def legacy_drain(self: Context):
+    def children_drainer(children: List[Context]):
+        if not children:
+            return
+        child = children.pop(0)
+        try:
+            children_drainer(children)
+        finally:
+            legacy_drain(child)
+
+    items = list(self.resource_pool.items())
+
+    def drainer(items: List[Tuple[Any, Any]]):
+        if not items:
+            children_drainer(self.children)
+            return
+        resource, (resolve, manager) = items.pop(0)
+        try:
+            drainer(items)
+        except Exception:
+            type_, value, traceback = sys.exc_info()
+            self.resource_pool.pop(resource)
+            manager.__exit__(type_, value, traceback)
+            raise
+        else:
+            self.resource_pool.pop(resource)
+            manager.__exit__(None, None, None)
+
+    drainer(items)
+
+
+def drain_resources(size: int, drain=Context.drain):
+    container = Container()
+    resources = RESOURCES[:size]
+    manager = contextlib.nullcontext()
+
+    def stmt():
+        context = Context(container, None)
+        for resource in resources:
+            context.resource_pool[resource] = (None, manager)
+        drain(context)
+
+    return stmt
+
+
+def drain_children(size: int, drain=Context.drain):
+    container = Container()
+
+    def stmt():
+        context = Context(container, None)
+        for _ in range(size):
+            context.children.append(Context(container, context))
+        drain(context)
+
+    return stmt
+
+
+def drain_slow_resources(size: int, drain=Context.drain):
+    container = Container()
+    resources = RESOURCES[:size]
+
+    @contextlib.contextmanager
+    def slow():
+        yield
+        time.sleep(0.001)
+
+    for resource in resources:
+        container.contextual(resource)(slow)
+
+    def stmt():
+        context = Context(container, None)
+        context.resolve_many(resources)
+        drain(context)
+
+    return stmt
+
+
+@benchmark("drain.resources.300.legacy", ops=300)
+def resources_300_legacy():
+    return drain_resources(300, legacy_drain)
+
+
+@benchmark(
+    "drain.resources.300", ops=300, reference="drain.resources.300.legacy"
+)
+def resources_300():
+    return drain_resources(300)
+
+
+@benchmark("drain.resources.10000", ops=10000, reference="drain.resources.300")
+def resources_10000():
+    return drain_resources(10000)
+
+
+@benchmark("drain.slow.16", ops=16)
+def slow_16():
+    return drain_slow_resources(16)
+
+
+@benchmark("drain.slow.16.concurrent", ops=16, reference="drain.slow.16")
+def slow_16_concurrent():
+    return drain_slow_resources(16, Context.drain_concurrently)
+
+
+@benchmark("drain.children.300.legacy", ops=300)
+def children_300_legacy():
+    return drain_children(300, legacy_drain)
+
+
+@benchmark(
+    "drain.children.300", ops=300, reference="drain.children.300.legacy"
+)
+def children_300():
+    return drain_children(300)
+
+
+@benchmark("drain.children.10000", ops=10000, reference="drain.children.300")
+def children_10000():
+    return drain_children(10000)
+
+
+if __name__ == "__main__":
+    main("drain.")
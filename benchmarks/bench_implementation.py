@@ -0,0 +1,160 @@
+"""
+Resolve throughput per implementation type.
+
+Each statement resolves a resource in a fresh context and drains it, since
+resolving a pooled resource does not touch its implementation.
+
+``lazy`` benchmarks resolve resources depending on an expensive resource
+they never use, declared eagerly or with :class:`~autowire.lazy.Lazy`.
+
+``pooled`` resources are returned to their pools on drain, and lent again
+to the next context instead of entering context managers again. Compared
+with ``contextual``, whose context managers do nothing, it measures the
+overhead of lending instances.
+
+``legacy`` benchmarks provide the same resources with context managers
+wrapping plain functions and constants, as plain function and constant
+implementations did before they were created without context managers.
+
+"""
+import contextlib
+
+from autowire.container import Container
+from autowire.context import Context
+from autowire.implementation import (
+    ConstantImplementation,
+    ContextManagerImplementation,
+    Implementation,
+    PlainFunctionImplementation,
+)
+from autowire.lazy import Lazy
+from autowire.pool import PooledImplementation
+from autowire.resource import Resource
+from benchmarks.harness import benchmark, main
+
+SIZE = 100
+
+RESOURCES = [Resource(f"r{i}", __name__) for i in range(SIZE)]
+
+
+def legacy(impl: ContextManagerImplementation) -> Implementation:
+    return ContextManagerImplementation(
+        impl.manager_generator, impl.arg_resources, impl.kwarg_resources
+    )
+
+
+def resolve_all(make_impl, wrap=lambda impl: impl):
+    container = Container()
+    for resource in RESOURCES:
+        container.provide(resource, wrap(make_impl()))
+    container.compile()
+
+    def stmt():
+        context = Context(container, None)
+        for resource in RESOURCES:
+            context.resolve(resource)
+        context.drain()
+
+    return stmt
+
+
+def constant():
+    return ConstantImplementation("constant")
+
+
+def plain():
+    return PlainFunctionImplementation(object, (), {})
+
+
+def contextual():
+    return ContextManagerImplementation(contextlib.nullcontext, (), {})
+
+
+@benchmark("implementation.constant.legacy", ops=SIZE)
+def constant_legacy():
+    return resolve_all(constant, legacy)
+
+
+@benchmark(
+    "implementation.constant",
+    ops=SIZE,
+    reference="implementation.constant.legacy",
+)
+def constant_resolve():
+    return resolve_all(constant)
+
+
+@benchmark("implementation.plain.legacy", ops=SIZE)
+def plain_legacy():
+    return resolve_all(plain, legacy)
+
+
+@benchmark(
+    "implementation.plain", ops=SIZE, reference="implementation.plain.legacy"
+)
+def plain_resolve():
+    return resolve_all(plain)
+
+
+def pooled():
+    return PooledImplementation(contextlib.nullcontext)
+
+
+@benchmark(
+    "implementation.contextual", ops=SIZE, reference="implementation.plain"
+)
+def contextual_resolve():
+    return resolve_all(contextual)
+
+
+@benchmark(
+    "implementation.pooled", ops=SIZE, reference="implementation.contextual"
+)
+def pooled_resolve():
+    return resolve_all(pooled)
+
+
+def depend_on_unused(make_dependency):
+    expensive = Resource("expensive", __name__)
+    container = Container()
+    container.provide(
+        expensive,
+        ContextManagerImplementation(contextlib.nullcontext, (), {}),
+    )
+    for resource in RESOURCES:
+        container.provide(
+            resource,
+            PlainFunctionImplementation(
+                lambda dependency: dependency,
+                (make_dependency(expensive),),
+                {},
+            ),
+        )
+    container.compile()
+
+    def stmt():
+        context = Context(container, None)
+        for resource in RESOURCES:
+            context.resolve(resource)
+            # Released as soon as possible like per request contexts
+            context.drain()
+
+    return stmt
+
+
+@benchmark("implementation.lazy.eager", ops=SIZE)
+def lazy_eager():
+    return depend_on_unused(lambda resource: resource)
+
+
+@benchmark(
+    "implementation.lazy.unused",
+    ops=SIZE,
+    reference="implementation.lazy.eager",
+)
+def lazy_unused():
+    return depend_on_unused(Lazy)
+
+
+if __name__ == "__main__":
+    main("implementation.")
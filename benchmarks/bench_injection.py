@@ -0,0 +1,62 @@
+"""
+Cost of calling functions with injected resources.
+
+``injection.call`` calls a function injecting three pooled resources with
+``Context.call``, while ``injection.manual`` resolves them by hand.
+Resources to be injected are found once on decoration, so the difference
+is mostly the cost of forwarding arguments through ``Context.call``.
+
+"""
+from autowire.container import Container
+from autowire.context import Context
+from autowire.injection import inject
+from autowire.resource import Resource
+from benchmarks.harness import benchmark, main
+
+config = Resource("config", __name__)
+db = Resource("db", __name__)
+cache = Resource("cache", __name__)
+
+
+def handle(request, *, config, db, cache):
+    return request
+
+
+def make_context() -> Context:
+    container = Container()
+    container.provide_constant(config, {})
+    container.plain(db, config)(lambda config: object())
+    container.plain(cache, config)(lambda config: object())
+    context = Context(container, None)
+    context.preload([config, db, cache])
+    return context
+
+
+@benchmark("injection.manual")
+def manual():
+    context = make_context()
+
+    def stmt():
+        handle(
+            "request",
+            config=context.resolve(config),
+            db=context.resolve(db),
+            cache=context.resolve(cache),
+        )
+
+    return stmt
+
+
+@benchmark("injection.call", reference="injection.manual")
+def call():
+    context = make_context()
+    injected = inject(config=config, db=db, cache=cache)(handle)
+
+    def stmt():
+        context.call(injected, "request")
+
+    return stmt
+
+
+if __name__ == "__main__":
+    main("injection.")
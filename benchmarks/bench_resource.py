@@ -0,0 +1,123 @@
+"""
+Dict lookup cost of resources, as done by ``Context.resource_pool`` and
+``BaseContainer.implementations``.
+
+``legacy`` benchmarks use a resource that builds its canonical name on every
+``__hash__`` and ``__eq__`` call, as resources did before canonical names and
+hashes were precomputed.
+
+"""
+import abc
+from typing import Generic, TypeVar
+
+from autowire.container import Container
+from autowire.implementation import ConstantImplementation
+from autowire.resource import Resource
+from benchmarks.harness import benchmark, main
+
+R = TypeVar("R")
+
+SIZE = 1000
+
+
+class LegacyResource(abc.ABC, Generic[R]):
+    def __init__(self, name: str, namespace: str):
+        super().__init__()
+        self.name = name
+        self.namespace = namespace
+
+    @property
+    def canonical_name(self) -> str:
+        return self.namespace + "." + self.name
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, LegacyResource)
+            and self.canonical_name == other.canonical_name
+        )
+
+    def __hash__(self):
+        return hash((LegacyResource, self.canonical_name))
+
+
+def lookup_same(resource_type):
+    # Look up with the very resources that were used as keys
+    resources = [resource_type(f"r{i}", __name__) for i in range(SIZE)]
+    pool = {resource: (i, None) for i, resource in enumerate(resources)}
+
+    def stmt():
+        for resource in resources:
+            pool[resource]
+
+    return stmt
+
+
+def lookup_equal(resource_type):
+    # Look up with equal resources declared separately
+    pool = {resource_type(f"r{i}", __name__): (i, None) for i in range(SIZE)}
+    resources = [resource_type(f"r{i}", __name__) for i in range(SIZE)]
+
+    def stmt():
+        for resource in resources:
+            pool[resource]
+
+    return stmt
+
+
+@benchmark("resource.resource_pool.same.legacy", ops=SIZE)
+def resource_pool_same_legacy():
+    return lookup_same(LegacyResource)
+
+
+@benchmark(
+    "resource.resource_pool.same",
+    ops=SIZE,
+    reference="resource.resource_pool.same.legacy",
+)
+def resource_pool_same():
+    return lookup_same(Resource)
+
+
+@benchmark("resource.resource_pool.equal.legacy", ops=SIZE)
+def resource_pool_equal_legacy():
+    return lookup_equal(LegacyResource)
+
+
+@benchmark(
+    "resource.resource_pool.equal",
+    ops=SIZE,
+    reference="resource.resource_pool.equal.legacy",
+)
+def resource_pool_equal():
+    return lookup_equal(Resource)
+
+
+def find_implementation(resource_type):
+    container = Container()
+    resources = [resource_type(f"r{i}", __name__) for i in range(SIZE)]
+    for resource in resources:
+        container.implementations[resource] = ConstantImplementation(None)
+
+    def stmt():
+        for resource in resources:
+            container.find_implementation(resource)
+
+    return stmt
+
+
+@benchmark("resource.implementations.legacy", ops=SIZE)
+def implementations_legacy():
+    return find_implementation(LegacyResource)
+
+
+@benchmark(
+    "resource.implementations",
+    ops=SIZE,
+    reference="resource.implementations.legacy",
+)
+def implementations():
+    return find_implementation(Resource)
+
+
+if __name__ == "__main__":
+    main("resource.")
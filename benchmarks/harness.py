@@ -0,0 +1,160 @@
+"""
+benchmarks.harness
+==================
+
+Minimal timing harness shared by benchmark modules.
+
+"""
+import json
+import timeit
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+class Benchmark(NamedTuple):
+    name: str
+    #: Prepares fixtures and returns the statement to be timed
+    setup: Callable[[], Callable[[], Any]]
+    #: Number of operations performed by a single statement call
+    ops: int
+    #: Benchmark this one is compared with as a ratio, measured in the same
+    #: run, so that the ratio doesn't depend on the machine
+    reference: Optional[str] = None
+
+
+#: Registered benchmarks by their names
+REGISTRY: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, ops: int = 1, reference: Optional[str] = None):
+    """
+    Register a benchmark. ::
+
+        @benchmark("resolve.cached")
+        def resolve_cached():
+            context = ...
+            return lambda: context.resolve(resource)
+
+    Benchmarks with a ``reference`` are gated by their ratios to it rather
+    than by their absolute timings.
+
+    """
+
+    def decorator(setup):
+        REGISTRY[name] = Benchmark(name, setup, ops, reference)
+        return setup
+
+    return decorator
+
+
+def measure(bench: Benchmark, repeat: int = 5) -> float:
+    """
+    Measure the best seconds per operation of the benchmark.
+
+    """
+    timer = timeit.Timer(bench.setup())
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number / bench.ops
+
+
+def run(
+    prefix: str = "", repeat: int = 5, verbose: bool = True, rounds: int = 1
+):
+    """
+    Run registered benchmarks whose names start with prefix.
+
+    Returns nanoseconds per operation of each benchmark, the best of
+    ``rounds`` runs of every benchmark.
+
+    """
+    names = [name for name in sorted(REGISTRY) if name.startswith(prefix)]
+    results: Dict[str, float] = {}
+    for _ in range(rounds):
+        for name in names:
+            result = measure(REGISTRY[name], repeat) * 1e9
+            results[name] = min(results.get(name, result), result)
+    if verbose:
+        for name in names:
+            print(f"{name:<50} {results[name]:>12.1f} ns/op")
+    return results
+
+
+def ratios(results: Dict[str, float]) -> Dict[str, float]:
+    """
+    Ratios of results to their references, by names of benchmarks.
+
+    """
+    found = {}
+    for name, result in results.items():
+        bench = REGISTRY.get(name)
+        if bench is not None and bench.reference in results:
+            found[name] = result / results[bench.reference]
+    return found
+
+
+def save(path: str, baseline: Dict[str, Dict[str, float]]):
+    """
+    Store a baseline, which holds ``results`` and their ``ratios``.
+
+    """
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path: str) -> Dict[str, Dict[str, float]]:
+    """
+    Load a baseline stored by :func:`save`.
+
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(
+    baseline: Dict[str, Dict[str, float]],
+    results: Dict[str, float],
+    threshold: float,
+    absolute: Optional[float] = None,
+) -> List[str]:
+    """
+    Compare results with the baseline, and print the changes.
+
+    Returns names of benchmarks whose ratios to their references got worse
+    than ``threshold``, which is a ratio of the baseline. Absolute timings
+    depend on the machine, and are only compared with ``absolute`` in the
+    same way.
+
+    """
+    regressions = []
+    current = ratios(results)
+    for name, result in sorted(results.items()):
+        line = f"{name:<50} {result:>12.1f} ns/op"
+        if name in baseline["results"]:
+            change = result / baseline["results"][name] - 1
+            line += f" {change:>+10.1%}"
+            if absolute is not None and change > absolute:
+                regressions.append(name)
+                line += " slower"
+        else:
+            line += f" {'(new)':>10}"
+        if name in current:
+            reference = REGISTRY[name].reference
+            line += f"  {current[name]:.2f}x of {reference}"
+            if name in baseline["ratios"]:
+                change = current[name] / baseline["ratios"][name] - 1
+                line += f" {change:+.1%}"
+                if change > threshold:
+                    if name not in regressions:
+                        regressions.append(name)
+                    line += " slower"
+        print(line)
+    return regressions
+
+
+def main(prefix: str = ""):
+    """
+    Run registered benchmarks whose names start with prefix.
+
+    """
+    run(prefix)
@@ -3,7 +3,7 @@ from setuptools import setup
 
 setup(
     name="Autowire",
-    packages=setuptools.find_packages(exclude=["tests"]),
+    packages=setuptools.find_packages(exclude=["tests", "benchmarks"]),
     version="1.1.4-dev",
     description="Simple dependency injection.",
     author="Choi Geonu",
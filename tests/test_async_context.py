@@ -0,0 +1,326 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from autowire.container import Container
+from autowire.exc import AsyncResourceError
+from autowire.resource import Resource
+from autowire.scope import Scope
+
+
+def test_aresolve():
+    container = Container()
+
+    config = Resource("config", __name__)
+    session = Resource("session", __name__)
+    client = Resource("client", __name__)
+
+    events = []
+
+    container.provide_constant(config, "config")
+
+    @container.async_contextual(session, config)
+    @contextlib.asynccontextmanager
+    async def with_session(config: str):
+        events.append("open-session")
+        try:
+            yield f"session.{config}"
+        finally:
+            events.append("close-session")
+
+    @container.contextual(client, session=session)
+    @contextlib.contextmanager
+    def with_client(*, session: str):
+        events.append("open-client")
+        try:
+            yield f"client.{session}"
+        finally:
+            events.append("close-client")
+
+    async def main():
+        async with container.async_context() as context:
+            assert "client.session.config" == await context.aresolve(client)
+            assert "client.session.config" == await context.aresolve(client)
+            assert "config" == context.resolve(config)
+
+    asyncio.run(main())
+    assert [
+        "open-session",
+        "open-client",
+        "close-client",
+        "close-session",
+    ] == events
+
+    # Asynchronous resources cannot be resolved synchronously
+    with container.context() as context:
+        with pytest.raises(AsyncResourceError):
+            context.resolve(client)
+
+
+def test_concurrent_dependencies():
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+    baz = Resource("baz", __name__)
+    shared = Resource("shared", __name__)
+
+    container = Container()
+
+    running = 0
+    max_running = 0
+    shared_count = 0
+
+    @container.async_contextual(shared)
+    @contextlib.asynccontextmanager
+    async def with_shared():
+        nonlocal shared_count
+        shared_count += 1
+        await asyncio.sleep(0)
+        yield "shared"
+
+    def slow(name):
+        @contextlib.asynccontextmanager
+        async def manager(shared):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(running, max_running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            yield name
+
+        return manager
+
+    container.async_contextual(foo, shared)(slow("foo"))
+    container.async_contextual(bar, shared)(slow("bar"))
+
+    @container.plain(baz, foo, bar)
+    def get_baz(foo, bar):
+        return f"{foo}.{bar}"
+
+    async def main():
+        async with container.async_context() as context:
+            results = await asyncio.gather(
+                context.aresolve(baz), context.aresolve(foo)
+            )
+            assert ["foo.bar", "foo"] == results
+
+    asyncio.run(main())
+    assert 2 == max_running
+    assert 1 == shared_count
+
+
+def test_adrain_exception():
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+    failing = Resource("failing", __name__)
+
+    container = Container()
+
+    foo_alive = False
+
+    @foo.async_contextual()
+    @contextlib.asynccontextmanager
+    async def with_foo():
+        nonlocal foo_alive
+        foo_alive = True
+        try:
+            with pytest.raises(ZeroDivisionError):
+                yield "foo"
+        finally:
+            foo_alive = False
+
+    @bar.async_contextual(foo)
+    @contextlib.asynccontextmanager
+    async def with_bar(foo):
+        try:
+            yield "bar"
+        finally:
+            1 / 0
+
+    @failing.async_contextual(foo)
+    @contextlib.asynccontextmanager
+    async def with_failing(foo):
+        raise KeyError("failing")
+        yield  # pragma: no cover
+
+    async def main():
+        async with container.async_context(preload=[bar]) as context:
+            assert foo_alive is True
+            with pytest.raises(KeyError):
+                await context.aresolve(failing)
+
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(main())
+    assert foo_alive is False
+
+
+def test_async_child():
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+
+    container = Container()
+
+    bar_refs = 0
+
+    container.provide_constant(foo, "foo")
+
+    @container.async_contextual(bar, foo)
+    @contextlib.asynccontextmanager
+    async def with_bar(foo):
+        nonlocal bar_refs
+        bar_refs += 1
+        try:
+            yield f"bar.{foo}"
+        finally:
+            bar_refs -= 1
+
+    async def main():
+        async with container.async_context(preload=[foo]) as parent:
+            async with parent.async_child(preload=[bar]) as child:
+                assert 1 == bar_refs
+                assert "bar.foo" == await child.aresolve(bar)
+                assert bar not in parent.resource_pool
+            assert 0 == bar_refs
+
+            # Children are drained with their parent
+            async with parent.async_child() as child:
+                await child.aresolve(bar)
+                assert 1 == bar_refs
+                await parent.adrain()
+                assert 0 == bar_refs
+
+            # Forked children share resources of the snapshot
+            async with parent.async_child(preload=[bar]) as warm:
+                snapshot = warm.snapshot()
+                async with parent.async_child(snapshot=snapshot) as child:
+                    assert "bar.foo" == await child.aresolve(bar)
+                    assert 1 == bar_refs
+                assert 1 == bar_refs
+            assert 0 == bar_refs
+
+    asyncio.run(main())
+
+
+def test_parallel_preload():
+    config = Resource("config", __name__)
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+
+    container = Container()
+
+    container.provide_constant(config, "config")
+
+    @container.async_contextual(foo, config)
+    @contextlib.asynccontextmanager
+    async def with_foo(config):
+        await asyncio.sleep(0.02)
+        yield "foo"
+
+    @container.async_contextual(bar, config)
+    @contextlib.asynccontextmanager
+    async def with_bar(config):
+        yield "bar"
+
+    async def main():
+        async with container.async_context(
+            preload=[foo, bar], parallel=True
+        ) as context:
+            # bar finished first but pooled in order
+            assert [config, foo, bar] == list(context.resource_pool)
+            async with context.async_child(
+                preload=[foo, bar], parallel=True
+            ) as child:
+                assert not child.resource_pool
+
+    asyncio.run(main())
+
+
+def test_parallel_preload_transient():
+    config = Resource("config", __name__)
+    token = Resource("token", __name__, scope=Scope.TRANSIENT)
+    log = []
+
+    container = Container()
+
+    @container.async_contextual(config)
+    @contextlib.asynccontextmanager
+    async def with_config():
+        yield "config"
+        log.append("close config")
+
+    @container.contextual(token, config)
+    @contextlib.contextmanager
+    def with_token(config):
+        yield "token"
+        log.append("close token")
+
+    async def main():
+        async with container.async_context() as context:
+            await context.apreload([config, token], parallel=True)
+            # Entries of transient resources are reordered as well
+            assert [config, token] == [
+                getattr(key, "resource", key) for key in context.resource_pool
+            ]
+
+    asyncio.run(main())
+    assert ["close token", "close config"] == log
+
+
+def test_scopes():
+    pool = Resource("pool", __name__, scope=Scope.CONTAINER)
+    counter = Resource("counter", __name__, scope=Scope.TRANSIENT)
+
+    container = Container()
+
+    count = 0
+
+    @container.async_contextual(pool)
+    @contextlib.asynccontextmanager
+    async def with_pool():
+        yield "pool"
+
+    @container.plain(counter)
+    def next_count():
+        nonlocal count
+        count += 1
+        return count
+
+    async def main():
+        async with container.async_context() as context:
+            async with context.async_child() as child:
+                assert "pool" == await child.aresolve(pool)
+                assert 1 == await child.aresolve(counter)
+                assert 2 == await child.aresolve(counter)
+                assert pool not in child.resource_pool
+            assert [pool] == list(context.resource_pool)
+
+    asyncio.run(main())
+
+
+def test_cancel_aresolve():
+    slow = Resource("slow", __name__)
+
+    container = Container()
+    created = []
+
+    @container.async_contextual(slow)
+    @contextlib.asynccontextmanager
+    async def with_slow():
+        await asyncio.sleep(0.05)
+        created.append("slow")
+        yield "slow"
+
+    async def main():
+        async with container.async_context() as context:
+            cancelled = asyncio.ensure_future(context.aresolve(slow))
+            waiting = asyncio.ensure_future(context.aresolve(slow))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            # Shared build is left to finish for the other resolution
+            assert "slow" == await waiting
+            assert "slow" == await context.aresolve(slow)
+
+    asyncio.run(main())
+    assert ["slow"] == created
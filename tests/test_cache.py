@@ -0,0 +1,171 @@
+import asyncio
+import contextlib
+import gc
+
+import pytest
+
+from autowire.async_context import AsyncContext
+from autowire.cache import LRUCachePolicy, WeakCachePolicy
+from autowire.container import Container
+from autowire.resource import Resource
+from autowire.scope import Scope
+
+
+class Model(object):
+    def __init__(self, name):
+        self.name = name
+
+
+def test_lru_cache():
+    policy = LRUCachePolicy(2)
+    models = [Resource(f"model{i}", __name__, cache=policy) for i in range(3)]
+    config = Resource("config", __name__)
+    log = []
+
+    container = Container()
+    container.provide_constant(config, "config")
+    for i, model in enumerate(models):
+
+        @container.contextual(model, config)
+        @contextlib.contextmanager
+        def load(config, i=i):
+            log.append(f"load {i}")
+            yield Model(f"{i}.{config}")
+            log.append(f"unload {i}")
+
+    with container.context() as context:
+        first = context.resolve(models[0])
+        assert "0.config" == first.name
+        context.resolve(models[1])
+        # Recently used ones are kept
+        assert first is context.resolve(models[0])
+        assert ["load 0", "load 1"] == log
+
+        context.resolve(models[2])
+        assert ["load 0", "load 1", "load 2", "unload 1"] == log
+
+        # Evicted ones are created again
+        with context.child() as child:
+            child.resolve(models[1])
+            assert first is child.resolve(models[0])
+        assert ["load 1", "unload 1"] == log[-2:]
+
+        # Looking up from children counts as use
+        context.resolve(models[1])
+        assert ["load 1", "unload 2"] == log[-2:]
+        log.clear()
+
+    # The rest are released in reverse order on drain
+    assert ["unload 1", "unload 0"] == log
+
+
+def test_weak_cache():
+    model = Resource("model", __name__, cache=WeakCachePolicy())
+    table = Resource("table", __name__, cache=WeakCachePolicy())
+    created = []
+
+    container = Container()
+
+    @container.plain(model)
+    def load_model():
+        created.append(Model("model"))
+        return created[-1]
+
+    container.provide_constant(table, {"key": "value"})
+
+    with container.context() as context:
+        value = context.resolve(model)
+        created.clear()
+        assert value is context.resolve(model)
+
+        # Released as soon as nothing refers to it
+        del value
+        gc.collect()
+        value = context.resolve(model)
+        assert [value] == created
+
+        with pytest.raises(TypeError):
+            context.resolve(table)
+
+
+def test_cache_scope():
+    policy = LRUCachePolicy(1)
+    shared = Resource("shared", __name__, scope=Scope.CONTAINER, cache=policy)
+    transient = Resource(
+        "transient", __name__, scope=Scope.TRANSIENT, cache=policy
+    )
+
+    container = Container()
+    container.plain(shared)(lambda: Model("shared"))
+    container.plain(transient)(lambda: Model("transient"))
+
+    with container.context() as context:
+        with context.child() as child:
+            value = child.resolve(shared)
+        assert value is context.resolve(shared)
+        # Transient resources are never cached
+        assert context.resolve(transient) is not context.resolve(transient)
+        assert value is context.resolve(shared)
+
+
+def test_cache_thread_safe():
+    model = Resource("model", __name__, cache=LRUCachePolicy(1))
+    container = Container()
+    container.plain(model)(lambda: Model("model"))
+
+    with container.context(thread_safe=True) as context:
+        assert context.resolve(model) is context.resolve(model)
+
+
+def test_cache_async():
+    policy = LRUCachePolicy(1)
+    first = Resource("first", __name__, cache=policy)
+    second = Resource("second", __name__, cache=policy)
+    log = []
+
+    container = Container()
+    for resource in (first, second):
+
+        @container.async_contextual(resource)
+        @contextlib.asynccontextmanager
+        async def connect(name=resource.name):
+            log.append(f"connect {name}")
+            yield Model(name)
+            log.append(f"disconnect {name}")
+
+    async def main():
+        async with container.async_context() as context:
+            value = await context.aresolve(first)
+            assert value is await context.aresolve(first)
+            await context.aresolve(second)
+            assert ["connect first", "connect second"] == log[:2]
+            assert "disconnect first" == log[-1]
+            log.clear()
+
+    asyncio.run(main())
+    assert ["disconnect second"] == log
+
+
+def test_cache_adrain():
+    model = Resource("model", __name__, cache=LRUCachePolicy(1))
+    log = []
+
+    container = Container()
+
+    @container.contextual(model)
+    @contextlib.contextmanager
+    def load():
+        log.append("load")
+        yield Model("model")
+        log.append("unload")
+
+    async def main():
+        context = AsyncContext(container, None)
+        async with context:
+            first = context.resolve(model)
+        # Released ones are not cached anymore
+        assert first is not await context.aresolve(model)
+        await context.adrain()
+
+    asyncio.run(main())
+    assert ["load", "unload", "load", "unload"] == log
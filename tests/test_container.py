@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import contextlib
+import time
 
 import pytest
 
 from autowire.container import Container
 from autowire.context import Context
-from autowire.exc import ResourceNotProvidedError
+from autowire.exc import ResourceNotProvidedError, ValidationError
 from autowire.implementation import Implementation
 from autowire.resource import Resource
 
@@ -153,3 +154,173 @@ def test_inheritance():
     assert bar_impl == parent.find_implementation(bar)
     assert foo_impl2 == child.find_implementation(foo)
     assert bar_impl == child.find_implementation(bar)
+
+
+def test_compile():
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+
+    parent = Container()
+    child = Container(parent)
+
+    parent.provide_constant(bar, "bar")
+
+    @parent.plain(foo, bar)
+    def get_foo(bar):
+        return f"foo.{bar}"
+
+    child.compile()
+    assert {foo, bar} == set(child._plans)
+    with child.context() as context:
+        assert "foo.bar" == context.resolve(foo)
+
+    # Providing to an ancestor invalidates compiled plans
+    parent.provide_constant(bar, "baz")
+    assert not child._plans
+    with child.context() as context:
+        assert "foo.baz" == context.resolve(foo)
+
+    # And so does changing default implementations
+    plan = child.find_plan(foo)
+    assert plan is child.find_plan(foo)
+    Resource("baz", __name__).set_constant("baz")
+    assert plan is not child.find_plan(foo)
+
+
+def test_find_implementation_cache():
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+
+    root = Container()
+    containers = [root]
+    for _ in range(5):
+        containers.append(Container(containers[-1]))
+    leaf = containers[-1]
+
+    root.provide_constant(foo, "foo")
+    foo_impl = root.implementations[foo]
+    assert foo_impl is leaf.find_implementation(foo)
+    assert foo in leaf._resolved_implementations
+
+    # Providing to any ancestor discards cached implementations
+    containers[2].provide_constant(foo, "foo-2")
+    assert foo not in leaf._resolved_implementations
+    assert containers[2].implementations[foo] is leaf.find_implementation(foo)
+    assert foo_impl is containers[1].find_implementation(foo)
+
+    # Missing resources are not cached
+    with pytest.raises(ResourceNotProvidedError):
+        leaf.find_implementation(bar)
+    bar.set_constant("bar")
+    assert bar.default_implementation is leaf.find_implementation(bar)
+
+    # Changing default implementations discards cached ones as well
+    bar.set_constant("baz")
+    assert bar.default_implementation is leaf.find_implementation(bar)
+
+
+def test_find_batch_plan_cache():
+    resources = [Resource(f"r{i}", __name__) for i in range(4)]
+
+    container = Container()
+    container.max_batch_plans = 2
+    for resource in resources:
+        container.provide_constant(resource, resource.name)
+
+    batch = container.find_batch_plan(resources[:2])
+    assert batch is container.find_batch_plan(resources[:2])
+    container.find_batch_plan(resources[1:3])
+    # Recently used ones are kept
+    assert batch is container.find_batch_plan(resources[:2])
+    container.find_batch_plan(resources[2:])
+    assert 2 == len(container._batch_plans)
+    assert tuple(resources[1:3]) not in container._batch_plans
+    assert batch is container.find_batch_plan(resources[:2])
+
+
+def test_validate():
+    config = Resource("config", __name__)
+    pool = Resource("pool", __name__)
+    cache = Resource("cache", __name__)
+    service = Resource("service", __name__)
+    logger = Resource("logger", __name__)
+
+    parent = Container()
+    child = Container(parent)
+
+    @parent.plain(pool, config)
+    def get_pool(config):
+        pass  # pragma: no cover
+
+    @child.contextual(service, pool, cache=cache, logger=logger)
+    @contextlib.contextmanager
+    def with_service(pool, *, cache, logger):
+        yield  # pragma: no cover
+
+    with pytest.raises(ValidationError) as excinfo:
+        child.validate()
+    # All missing resources are reported at once
+    assert (
+        f"{__name__}.cache",
+        f"{__name__}.config",
+        f"{__name__}.logger",
+    ) == excinfo.value.missing
+    assert (
+        f"{__name__}.cache is not provided (required by {__name__}.service)",
+        f"{__name__}.config is not provided (required by {__name__}.pool)",
+        f"{__name__}.logger is not provided (required by {__name__}.service)",
+    ) == excinfo.value.problems
+    assert str(excinfo.value).startswith("Invalid dependency graph\n- ")
+
+    # Only given resources and their dependencies are validated
+    parent.provide_constant(config, "config")
+    parent.validate()
+    child.validate(pool)
+    with pytest.raises(ValidationError) as excinfo:
+        child.validate(logger)
+    assert (f"{__name__}.logger",) == excinfo.value.missing
+    assert (f"{__name__}.logger is not provided",) == excinfo.value.problems
+
+    child.provide_constant(cache, "cache")
+    child.provide_constant(logger, "logger")
+    child.validate()
+
+    # Signatures are checked if requested
+    @child.plain(cache, pool, config)
+    def get_cache(pool):
+        pass  # pragma: no cover
+
+    child.validate()
+    with pytest.raises(ValidationError) as excinfo:
+        child.validate(check_signatures=True)
+    assert not excinfo.value.missing
+    (problem,) = excinfo.value.problems
+    assert problem.startswith("Cannot inject resources to ")
+    assert "get_cache(pool)" in problem
+
+    # and so are cycles
+    @child.plain(cache, service)
+    def get_cache_from_service(service):
+        pass  # pragma: no cover
+
+    with pytest.raises(ValidationError) as excinfo:
+        child.validate(check_signatures=True)
+    assert (
+        f"Circular dependency: {__name__}.service -> {__name__}.cache -> "
+        f"{__name__}.service",
+    ) == excinfo.value.problems
+
+
+def test_validate_linear():
+    resources = [Resource(f"r{i}", __name__) for i in range(20000)]
+
+    container = Container()
+    for i, resource in enumerate(resources):
+        # Each resource depends on two of the following resources
+        container.plain(resource, *resources[i + 1 : i + 3])(
+            lambda *args: None
+        )
+
+    start = time.perf_counter()
+    container.validate(check_signatures=True)
+    assert time.perf_counter() - start < 5
@@ -1,9 +1,21 @@
+import collections
 import contextlib
+import copy
+import threading
+import time
+import tracemalloc
 
 import pytest
 
 from autowire.container import Container
+from autowire.context import Context
+from autowire.exc import CircularDependencyError
+from autowire.implementation import (
+    Implementation,
+    PlainFunctionImplementation,
+)
 from autowire.resource import Resource
+from autowire.scope import Scope
 
 
 def test_pool():
@@ -138,3 +150,579 @@ def test_child():
 
     assert 1 == foo_refs
     assert 2 == bar_refs
+
+
+def test_parallel_preload():
+    config = Resource("config", __name__)
+    pools = [Resource(f"pool{i}", __name__) for i in range(4)]
+    service = Resource("service", __name__)
+
+    container = Container()
+    container.provide_constant(config, "config")
+
+    events = []
+
+    def slow(name):
+        @contextlib.contextmanager
+        def manager(config):
+            time.sleep(0.1)
+            try:
+                yield name
+            finally:
+                events.append(name)
+
+        return manager
+
+    for i, pool in enumerate(pools):
+        container.contextual(pool, config)(slow(f"pool{i}"))
+
+    @container.plain(service, *pools)
+    def get_service(*pools):
+        return "service"
+
+    started = time.monotonic()
+    with container.context(preload=[service, *pools], parallel=True) as ctx:
+        assert time.monotonic() - started < 0.3
+        # Pooled in deterministic order
+        assert [config, *pools, service] == list(ctx.resource_pool)
+    assert ["pool3", "pool2", "pool1", "pool0"] == events
+
+    with container.context() as context:
+        with context.child(preload=pools, parallel=True) as child:
+            assert [config, *pools] == list(child.resource_pool)
+
+
+def test_parallel_preload_failure():
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+    baz = Resource("baz", __name__)
+
+    container = Container()
+
+    foo_alive = False
+
+    @container.contextual(foo)
+    @contextlib.contextmanager
+    def with_foo():
+        nonlocal foo_alive
+        foo_alive = True
+        try:
+            yield "foo"
+        finally:
+            foo_alive = False
+
+    @container.plain(bar)
+    def get_bar():
+        time.sleep(0.01)
+        raise KeyError("bar")
+
+    @container.plain(baz, foo, bar)
+    def get_baz(foo, bar):
+        pass  # pragma: no cover
+
+    with container.context() as context:
+        with pytest.raises(KeyError):
+            context.preload([baz], parallel=True)
+        assert foo_alive is True
+        assert [foo] == list(context.resource_pool)
+    assert foo_alive is False
+
+
+def test_thread_safe():
+    config = Resource("config", __name__)
+    shared = [Resource(f"shared{i}", __name__) for i in range(8)]
+
+    container = Container()
+
+    lock = threading.Lock()
+    created = collections.Counter()
+    running = 0
+    max_running = 0
+
+    @container.plain(config)
+    def get_config():
+        with lock:
+            created["config"] += 1
+        time.sleep(0.01)
+        return "config"
+
+    def slow(name):
+        def get(config):
+            nonlocal running, max_running
+            with lock:
+                created[name] += 1
+                running += 1
+                max_running = max(running, max_running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return name
+
+        return get
+
+    for i, resource in enumerate(shared):
+        container.plain(resource, config)(slow(f"shared{i}"))
+
+    barrier = threading.Barrier(32)
+
+    def hammer(context, offset):
+        barrier.wait()
+        for i in range(100):
+            resource = shared[(offset + i) % len(shared)]
+            assert resource.name == context.resolve(resource)
+            assert "config" == context.resolve(config)
+
+    with container.context(thread_safe=True) as context:
+        threads = [
+            threading.Thread(target=hammer, args=(context, i))
+            for i in range(32)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert config == next(iter(context.resource_pool))
+        assert {config, *shared} == set(context.resource_pool)
+
+    # Each resource is created exactly once
+    assert {"config": 1, **{r.name: 1 for r in shared}} == created
+    # While different resources are created in parallel
+    assert max_running > 1
+
+
+def test_thread_safe_parallel_preload():
+    resources = [Resource(f"r{i}", __name__) for i in range(4)]
+
+    container = Container()
+
+    created = collections.Counter()
+
+    for resource in resources:
+
+        def get(name=resource.name):
+            created[name] += 1
+            time.sleep(0.01)
+            return name
+
+        container.plain(resource)(get)
+
+    with container.context(thread_safe=True) as context:
+        threads = [
+            threading.Thread(
+                target=context.preload,
+                args=(resources,),
+                kwargs={"parallel": True},
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert set(resources) == set(context.resource_pool)
+    assert {r.name: 1 for r in resources} == created
+
+
+def test_drain_many():
+    resources = [Resource(f"r{i}", __name__) for i in range(10000)]
+
+    container = Container()
+
+    released = []
+
+    for resource in resources:
+
+        @container.contextual(resource)
+        @contextlib.contextmanager
+        def manager(name=resource.name):
+            try:
+                yield name
+            finally:
+                released.append(name)
+
+    with container.context() as context:
+        for resource in resources[:5000]:
+            context.resolve(resource)
+        for resource in resources[5000:]:
+            child = Context(container, context)
+            context.children.append(child)
+            child.resolve(resource)
+
+    # Children first, then resources in reverse order
+    assert [r.name for r in reversed(resources)] == released
+
+
+def test_drain_exception_chain():
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+    baz = Resource("baz", __name__)
+
+    container = Container()
+
+    received = []
+
+    @container.contextual(foo)
+    @contextlib.contextmanager
+    def with_foo():
+        try:
+            yield "foo"
+        except BaseException as e:
+            received.append(e)
+            raise
+
+    @container.contextual(bar)
+    @contextlib.contextmanager
+    def with_bar():
+        try:
+            yield "bar"
+        finally:
+            raise KeyError("bar")
+
+    @container.contextual(baz)
+    @contextlib.contextmanager
+    def with_baz():
+        try:
+            yield "baz"
+        finally:
+            1 / 0
+
+    with pytest.raises(KeyError) as info:
+        with container.context(preload=[foo, bar, baz]):
+            pass
+    assert [info.value] == received
+    assert isinstance(info.value.__context__, ZeroDivisionError)
+
+
+def test_forget_finished_children():
+    foo = Resource("foo", __name__)
+
+    container = Container()
+    container.provide_constant(foo, "foo")
+
+    with container.context() as context:
+        with context.child() as child1:
+            with context.child() as child2:
+                assert [child1, child2] == context.children
+            assert [child1] == context.children
+        assert [] == context.children
+
+        # Children finished after the parent drained
+        with context.child():
+            context.drain()
+        assert [] == context.children
+
+        # Memory stays flat while many children come and go
+        def churn(count):
+            for _ in range(count):
+                with context.child() as child:
+                    child.resolve(foo)
+
+        churn(1000)
+        tracemalloc.start()
+        try:
+            churn(1000)
+            baseline, _ = tracemalloc.get_traced_memory()
+            churn(20000)
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert current - baseline < 10000
+
+
+def test_container_scope():
+    config = Resource("config", __name__)
+    pool = Resource("pool", __name__, scope=Scope.CONTAINER)
+    request = Resource("request", __name__)
+
+    container = Container()
+
+    created = collections.Counter()
+    released = []
+
+    @container.plain(config)
+    def get_config():
+        created["config"] += 1
+        return "config"
+
+    @container.contextual(pool, config)
+    @contextlib.contextmanager
+    def with_pool(config):
+        created["pool"] += 1
+        try:
+            yield f"pool.{config}"
+        finally:
+            released.append("pool")
+
+    @container.plain(request, pool)
+    def get_request(pool):
+        created["request"] += 1
+        return f"request.{pool}"
+
+    with container.context() as context:
+        for _ in range(3):
+            with context.child() as child:
+                with child.child() as grandchild:
+                    assert "request.pool.config" == grandchild.resolve(request)
+                assert [] == released
+            assert request not in context.resource_pool
+        # Pool and its dependencies are hoisted into the root context
+        assert [config, pool] == list(context.resource_pool)
+    assert ["pool"] == released
+    assert {"config": 1, "pool": 1, "request": 3} == created
+
+
+def test_transient_scope():
+    counter = Resource("counter", __name__, scope="transient")
+    handle = Resource("handle", __name__)
+    pair = Resource("pair", __name__)
+
+    container = Container()
+
+    count = 0
+    released = []
+
+    @container.contextual(counter)
+    @contextlib.contextmanager
+    def with_counter():
+        nonlocal count
+        count += 1
+        value = count
+        try:
+            yield value
+        finally:
+            released.append(value)
+
+    # Scope of implementations overrides scope of resources
+    container.provide(
+        handle,
+        PlainFunctionImplementation(
+            lambda counter: counter, (counter,), {}, scope=Scope.TRANSIENT
+        ),
+    )
+
+    @container.plain(pair, counter, counter)
+    def get_pair(a, b):
+        return (a, b)
+
+    with container.context() as context:
+        assert 1 == context.resolve(counter)
+        assert 2 == context.resolve(counter)
+        assert 3 == context.resolve(handle)
+        assert 4 == context.resolve(handle)
+        # Single instance is shared within a resolution
+        assert (5, 5) == context.resolve(pair)
+        assert counter not in context.resource_pool
+        assert [] == released
+    assert [5, 4, 3, 2, 1] == released
+
+
+def test_unmanaged_resources():
+    config = Resource("config", __name__)
+    session = Resource("session", __name__)
+    handler = Resource("handler", __name__, scope=Scope.TRANSIENT)
+    custom = Resource("custom", __name__)
+
+    container = Container()
+
+    released = []
+
+    container.provide_constant(config, "config")
+
+    @container.contextual(session, config)
+    @contextlib.contextmanager
+    def with_session(config):
+        try:
+            yield f"session.{config}"
+        finally:
+            released.append("session")
+
+    @container.plain(handler, session)
+    def get_handler(session):
+        return f"handler.{session}"
+
+    class CustomImplementation(Implementation):
+        managed = False
+
+        def reify(self, resource, provider):  # pragma: no cover
+            assert False, "Unmanaged implementations are not reified"
+
+        def create(self, resource, provider):
+            return f"custom.{provider.resolve(config)}"
+
+    container.provide(custom, CustomImplementation())
+
+    with container.context() as context:
+        assert "handler.session.config" == context.resolve(handler)
+        assert "custom.config" == context.resolve(custom)
+        # Nothing to be released for plain functions and constants
+        assert (None, None) == (
+            context.resource_pool[config][1],
+            context.resource_pool[custom][1],
+        )
+        # and transient ones are not even kept
+        assert [config, session, custom] == list(context.resource_pool)
+    assert ["session"] == released
+
+
+def test_circular_dependency_in_flight():
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+    baz = Resource("baz", __name__)
+
+    # Implementations resolving their own dependencies can't be checked
+    # before they are reified
+    class OpaqueImplementation(Implementation):
+        def __init__(self, dependency):
+            super().__init__()
+            self.dependency = dependency
+
+        @contextlib.contextmanager
+        def reify(self, resource, provider):
+            yield provider.resolve(self.dependency)
+
+    container = Container()
+    container.provide(foo, OpaqueImplementation(bar))
+
+    @container.plain(bar, baz)
+    def get_bar(baz):
+        pass  # pragma: no cover
+
+    container.provide(baz, OpaqueImplementation(foo))
+
+    for thread_safe in (False, True):
+        with container.context(thread_safe=thread_safe) as context:
+            with pytest.raises(CircularDependencyError) as excinfo:
+                context.resolve(foo)
+            assert (
+                f"{__name__}.foo",
+                f"{__name__}.baz",
+                f"{__name__}.foo",
+            ) == excinfo.value.path
+            assert not context.resource_pool
+
+
+def test_resolve_many():
+    config = Resource("config", __name__)
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+    failing = Resource("failing", __name__)
+
+    container = Container()
+
+    created = collections.Counter()
+
+    @container.plain(config)
+    def get_config():
+        created["config"] += 1
+        return "config"
+
+    @container.plain(foo, config)
+    def get_foo(config):
+        created["foo"] += 1
+        return f"foo.{config}"
+
+    @container.plain(bar, config, foo=foo)
+    def get_bar(config, *, foo):
+        created["bar"] += 1
+        return f"bar.{foo}"
+
+    @container.plain(failing, bar)
+    def get_failing(bar):
+        raise KeyError("failing")
+
+    with container.context() as context:
+        assert ("bar.foo.config", "foo.config", "bar.foo.config") == (
+            context.resolve_many([bar, foo, bar])
+        )
+        # Shared dependencies are created once in dependency order
+        assert [config, foo, bar] == list(context.resource_pool)
+        assert {"config": 1, "foo": 1, "bar": 1} == created
+        assert () == context.resolve_many([])
+
+        with context.child() as child:
+            with pytest.raises(KeyError):
+                child.resolve_many([foo, failing])
+            assert not child.resource_pool
+
+    # Preloading resolves resources at once
+    with container.context(preload=[foo, bar]) as context:
+        assert [config, foo, bar] == list(context.resource_pool)
+    assert {"config": 2, "foo": 2, "bar": 2} == created
+
+
+def test_resolve_many_transient():
+    token = Resource("token", __name__, scope=Scope.TRANSIENT)
+    user = Resource("user", __name__)
+    admin = Resource("admin", __name__)
+
+    container = Container()
+
+    count = 0
+
+    @container.contextual(token)
+    @contextlib.contextmanager
+    def create_token():
+        nonlocal count
+        count += 1
+        yield count
+
+    container.plain(user, token)(lambda token: ("user", token))
+    container.plain(admin, token)(lambda token: ("admin", token))
+
+    with container.context() as context:
+        # Created for each of them as if resolved one by one
+        assert (1, 2) == context.resolve_many([token, token])
+        assert (("user", 3), ("admin", 4), 5) == context.resolve_many(
+            [user, admin, token]
+        )
+
+
+def test_snapshot():
+    container = Container()
+    config = Resource("config", __name__)
+    template = Resource("template", __name__)
+    handler = Resource("handler", __name__)
+    log = []
+
+    @container.plain(config)
+    def get_config():
+        log.append("config")
+        return {"debug": False}
+
+    @container.contextual(template, config)
+    @contextlib.contextmanager
+    def with_template(config):
+        log.append("template")
+        yield ["header"]
+        log.append("release")
+
+    @container.plain(handler, template)
+    def get_handler(template):
+        log.append("handler")
+        return template
+
+    with container.context() as context:
+        with context.child() as warm:
+            snapshot = warm.snapshot([template])
+            assert template in snapshot
+            assert config not in snapshot
+            assert ["config", "template"] == log
+
+            for _ in range(3):
+                with context.child(snapshot=snapshot) as child:
+                    assert warm.resolve(template) is child.resolve(handler)
+            # Factories are not run again, nor released by forks
+            assert ["config", "template"] + ["handler"] * 3 == log
+
+            # Everything but transient resources are taken by default
+            assert 2 == len(warm.snapshot())
+
+            copied = warm.snapshot(copy=copy.deepcopy)
+            with context.child(snapshot=copied) as child:
+                child.resolve(config)["debug"] = True
+                child.resolve(template).append("footer")
+            assert {"debug": False} == warm.resolve(config)
+            assert ["header"] == warm.resolve(template)
+
+        assert log[-1] == "release"
+        assert 1 == log.count("release")
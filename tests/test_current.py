@@ -0,0 +1,124 @@
+import asyncio
+import contextlib
+import threading
+
+import pytest
+
+import autowire
+from autowire.container import Container
+from autowire.current import activate, current_context
+from autowire.exc import NoCurrentContextError
+from autowire.resource import Resource
+
+
+def test_resolve():
+    counter = Resource("counter", __name__)
+
+    container = Container()
+    count = iter(range(1000))
+    container.plain(counter)(lambda: next(count))
+
+    with pytest.raises(NoCurrentContextError):
+        autowire.resolve(counter)
+
+    with container.context() as context:
+        assert context is current_context()
+        assert context.resolve(counter) == autowire.resolve(counter)
+
+        with context.child() as child:
+            assert child is current_context()
+            with child.child() as grandchild:
+                assert grandchild is current_context()
+            assert child is current_context()
+
+        assert context is current_context()
+
+    with pytest.raises(NoCurrentContextError):
+        current_context()
+
+
+def test_resolve_threads():
+    container = Container()
+    seen = {}
+
+    def work(name, context=None):
+        try:
+            current = current_context()
+        except NoCurrentContextError:
+            current = None
+        if context is not None:
+            with activate(context):
+                current = current_context()
+        seen[name] = current
+
+    with container.context(thread_safe=True) as context:
+        with context.child() as child:
+            threads = [
+                threading.Thread(target=work, args=("new",)),
+                threading.Thread(target=work, args=("activated", child)),
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert child is current_context()
+
+    # Threads don't inherit the current context
+    assert seen["new"] is None
+    assert seen["activated"] is child
+
+
+def test_aresolve_tasks():
+    container = Container()
+    request = Resource("request", __name__)
+
+    @container.async_contextual(request)
+    @contextlib.asynccontextmanager
+    async def create_request():
+        yield object()
+
+    async def handle():
+        async with container.async_context() as context:
+            await asyncio.sleep(0)
+            assert context is current_context()
+            resolved = await autowire.aresolve(request)
+            assert resolved is await context.aresolve(request)
+            return context, resolved
+
+    async def main():
+        async with container.async_context() as outer:
+            (first, one), (second, other) = await asyncio.gather(
+                handle(), handle()
+            )
+            assert outer is current_context()
+            assert first is not second
+            assert one is not other
+
+            with outer.child():
+                # Children of asynchronous contexts are synchronous
+                with pytest.raises(NoCurrentContextError):
+                    await autowire.aresolve(request)
+
+    asyncio.run(main())
+
+
+def test_aresolve_async_child():
+    container = Container()
+    request = Resource("request", __name__)
+
+    @container.async_contextual(request)
+    @contextlib.asynccontextmanager
+    async def create_request():
+        yield object()
+
+    async def main():
+        async with container.async_context() as context:
+            async with context.async_child() as child:
+                assert child is current_context()
+                resolved = await autowire.aresolve(request)
+                assert resolved is await child.aresolve(request)
+                # Not pooled in the parent
+                assert request not in context.resource_pool
+            assert context is current_context()
+
+    asyncio.run(main())
@@ -0,0 +1,261 @@
+import asyncio
+import contextlib
+import threading
+import time
+
+from autowire.async_context import AsyncContext
+from autowire.container import Container
+from autowire.drain import release_managers
+from autowire.implementation import Implementation
+from autowire.resource import Resource
+
+
+def provide_graph(container, log, delays, pool, producers, handler):
+    def provide(resource, *dependencies):
+        @container.contextual(resource, *dependencies)
+        @contextlib.contextmanager
+        def manager(*args):
+            yield resource.name
+            log.append(f"close {resource.name}")
+            delay = delays.get(resource.name)
+            if isinstance(delay, threading.Event):
+                delay.wait()
+            elif isinstance(delay, BaseException):
+                raise delay
+            elif delay:
+                time.sleep(delay)
+            log.append(f"closed {resource.name}")
+
+    provide(pool)
+    for producer in producers:
+        provide(producer, pool)
+    provide(handler, *producers)
+
+
+def test_drain_concurrently():
+    container = Container()
+
+    log = []
+    delays = {f"producer{i}": 0.1 for i in range(3)}
+
+    pool = Resource("pool", __name__)
+    producers = [Resource(f"producer{i}", __name__) for i in range(3)]
+    handler = Resource("handler", __name__)
+
+    provide_graph(container, log, delays, pool, producers, handler)
+
+    context = container.context().__enter__()
+    context.resolve(handler)
+    with context.child() as child:
+        context.children.append(child)
+        child.resolve(handler)
+    start = time.monotonic()
+    report = context.drain_concurrently()
+    elapsed = time.monotonic() - start
+
+    assert report.ok
+    assert not context.resource_pool
+    # Independent producers are released at the same time
+    assert elapsed < 0.3
+    assert ["close handler", "closed handler"] == log[:2]
+    assert {f"close {p.name}" for p in producers} == set(log[2:5])
+    assert ["close pool", "closed pool"] == log[-2:]
+    assert handler.canonical_name == report.released[0]
+    assert {p.canonical_name for p in producers} == set(report.released[1:4])
+    assert pool.canonical_name == report.released[4]
+
+
+def test_drain_concurrently_failure():
+    container = Container()
+
+    log = []
+    error = ValueError("failed")
+    delays = {"producer1": error}
+
+    pool = Resource("pool", __name__)
+    producers = [Resource(f"producer{i}", __name__) for i in range(3)]
+    handler = Resource("handler", __name__)
+
+    provide_graph(container, log, delays, pool, producers, handler)
+
+    with container.context() as context:
+        context.resolve(handler)
+        report = context.drain_concurrently(max_workers=1)
+
+    assert not report.ok
+    assert [(producers[1].canonical_name, error)] == report.failed
+    assert 4 == len(report.released)
+    assert "closed pool" == log[-1]
+
+
+def test_drain_concurrently_timeout():
+    container = Container()
+
+    log = []
+    hung = threading.Event()
+    delays = {"producer0": hung, "pool": hung}
+
+    pool = Resource("pool", __name__)
+    producers = [Resource(f"producer{i}", __name__) for i in range(3)]
+    handler = Resource("handler", __name__)
+
+    provide_graph(container, log, delays, pool, producers, handler)
+
+    try:
+        context = container.context().__enter__()
+        context.resolve(handler)
+        report = context.drain_concurrently(resource_timeout=0.05)
+        # Dependencies are released without waiting for hung resources
+        assert [producers[0].canonical_name, pool.canonical_name] == (
+            report.timed_out
+        )
+        assert 3 == len(report.released)
+
+        context.resolve(handler)
+        report = context.drain_concurrently(timeout=0.05)
+        assert [producers[0].canonical_name, pool.canonical_name] == (
+            report.timed_out
+        )
+        assert report.seconds < 1
+    finally:
+        hung.set()
+
+
+def test_drain_concurrently_opaque():
+    container = Container()
+
+    log = []
+    delays = {}
+
+    pool = Resource("pool", __name__)
+    producers = [Resource(f"producer{i}", __name__) for i in range(3)]
+    handler = Resource("handler", __name__)
+    opaque = Resource("opaque", __name__)
+
+    provide_graph(container, log, delays, pool, producers, handler)
+
+    class OpaqueImplementation(Implementation):
+        @contextlib.contextmanager
+        def reify(self, resource, context):
+            context.resolve(pool)
+            yield "opaque"
+            log.append("close opaque")
+
+    container.provide(opaque, OpaqueImplementation())
+    with container.context() as context:
+        context.resolve(opaque)
+        context.resolve(producers[0])
+        report = context.drain_concurrently()
+
+    # Assumed to depend on everything created before it
+    assert report.ok
+    assert "close opaque" == log[2]
+    assert ["close pool", "closed pool"] == log[-2:]
+
+
+def test_adrain_concurrently():
+    container = Container()
+
+    log = []
+    delays = {}
+
+    pool = Resource("pool", __name__)
+    producers = [Resource(f"producer{i}", __name__) for i in range(3)]
+    handler = Resource("handler", __name__)
+    session = Resource("session", __name__)
+
+    provide_graph(container, log, delays, pool, producers, handler)
+
+    @container.async_contextual(session, pool)
+    @contextlib.asynccontextmanager
+    async def with_session(pool):
+        yield "session"
+        log.append("close session")
+        # Hangs until cancelled
+        await asyncio.Event().wait()
+
+    async def main():
+        async with container.async_context() as context:
+            await context.aresolve(session)
+            context.resolve(handler)
+            report = await context.adrain_concurrently(resource_timeout=0.05)
+            assert [session.canonical_name] == report.timed_out
+            assert 5 == len(report.released)
+            assert "closed pool" == log[-1]
+
+    asyncio.run(main())
+
+
+def test_adrain_concurrently_hung():
+    container = Container()
+    hung = Resource("hung", __name__)
+    interrupted = Resource("interrupted", __name__)
+    unblock = threading.Event()
+
+    @container.contextual(hung)
+    @contextlib.contextmanager
+    def with_hung():
+        yield "hung"
+        unblock.wait(5)
+
+    @container.async_contextual(interrupted)
+    @contextlib.asynccontextmanager
+    async def with_interrupted():
+        yield "interrupted"
+        raise KeyboardInterrupt()
+
+    async def main():
+        context = AsyncContext(container, None)
+        context.resolve(hung)
+        await context.aresolve(interrupted)
+        return await context.adrain_concurrently(resource_timeout=0.05)
+
+    start = time.monotonic()
+    try:
+        report = asyncio.run(main())
+        # Not waiting for the hung release on exit
+        assert time.monotonic() - start < 1.0
+    finally:
+        unblock.set()
+    assert [hung.canonical_name] == report.timed_out
+    [(name, exc)] = report.failed
+    assert interrupted.canonical_name == name
+    assert isinstance(exc, KeyboardInterrupt)
+
+
+def test_release_managers():
+    log = []
+    reported = []
+
+    @contextlib.contextmanager
+    def manager(name, error=None):
+        try:
+            yield
+        except BaseException as e:
+            log.append((name, type(e).__name__))
+            raise error or e
+        log.append((name, None))
+        if error is not None:
+            raise error
+
+    first = ValueError("first")
+    second = KeyError("second")
+    managers = [
+        ("a", manager("a")),
+        ("b", None),
+        ("c", manager("c", first)),
+        ("d", manager("d", second)),
+    ]
+    for _, m in managers:
+        if m is not None:
+            m.__enter__()
+
+    exc = release_managers(
+        reversed(managers),
+        report=lambda key, seconds, error: reported.append((key, error)),
+    )
+    # Exceptions are passed to the rest, and chained like ExitStack does
+    assert [("d", None), ("c", "KeyError"), ("a", "ValueError")] == log
+    assert exc is first
+    assert second is first.__context__
+    assert [("d", second), ("c", first), ("a", None)] == reported
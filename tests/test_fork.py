@@ -0,0 +1,144 @@
+import contextlib
+import os
+
+import pytest
+
+from autowire.cache import LRUCachePolicy
+from autowire.container import Container
+from autowire.fork import after_fork, fork_sensitivity
+from autowire.implementation import Implementation
+from autowire.lazy import Lazy
+from autowire.resource import Resource
+from autowire.scope import Scope
+
+
+class Connection(object):
+    def __init__(self, pid):
+        self.pid = pid
+
+
+def provide_connection(
+    container, log, config, connection, repository, session
+):
+    container.provide_constant(config, {"dsn": "db"})
+
+    @container.contextual(connection, config)
+    @contextlib.contextmanager
+    def connect(config):
+        log.append("connect")
+        yield Connection(os.getpid())
+        log.append("disconnect")
+
+    container.plain(repository, connection)(lambda connection: [connection])
+    container.plain(session, Lazy(connection))(lambda connection: connection)
+
+
+def test_fork_sensitivity():
+    container = Container()
+
+    log = []
+
+    config = Resource("config", __name__, scope=Scope.CONTAINER)
+    connection = Resource(
+        "connection", __name__, scope=Scope.CONTAINER, fork_sensitive=True
+    )
+    repository = Resource("repository", __name__, scope=Scope.CONTAINER)
+    session = Resource("session", __name__)
+    opaque = Resource("opaque", __name__)
+
+    provide_connection(container, log, config, connection, repository, session)
+
+    class OpaqueImplementation(Implementation):
+        def reify(self, resource, context):
+            return contextlib.nullcontext(context.resolve(connection))
+
+    container.provide(opaque, OpaqueImplementation())
+    sensitive = fork_sensitivity(container)
+    assert sensitive(connection)
+    assert sensitive(repository)
+    assert sensitive(Lazy(connection))
+    assert sensitive(session)
+    assert not sensitive(config)
+    # Not known to depend on the connection
+    assert not sensitive(opaque)
+
+
+def test_after_fork():
+    container = Container()
+
+    log = []
+
+    config = Resource("config", __name__, scope=Scope.CONTAINER)
+    connection = Resource(
+        "connection", __name__, scope=Scope.CONTAINER, fork_sensitive=True
+    )
+    repository = Resource("repository", __name__, scope=Scope.CONTAINER)
+    session = Resource("session", __name__)
+    handle = Resource(
+        "handle", __name__, cache=LRUCachePolicy(2), fork_sensitive=True
+    )
+
+    provide_connection(container, log, config, connection, repository, session)
+    container.plain(handle)(object)
+
+    with container.context() as context:
+        with context.child() as child:
+            first = child.resolve(repository)[0]
+            child.resolve(session)()
+            shared = child.resolve(config)
+            cached = context.resolve(handle)
+            assert cached is context.resolve(handle)
+            after_fork()
+
+            assert config in context.resource_pool
+            assert connection not in context.resource_pool
+            assert repository not in context.resource_pool
+            assert session not in child.resource_pool
+            # Created again
+            assert first is not child.resolve(repository)[0]
+            assert shared is child.resolve(config)
+            assert cached is not context.resolve(handle)
+    # Discarded ones are never released
+    assert ["connect", "connect", "disconnect"] == log
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_fork():
+    container = Container()
+
+    log = []
+
+    config = Resource("config", __name__, scope=Scope.CONTAINER)
+    connection = Resource(
+        "connection", __name__, scope=Scope.CONTAINER, fork_sensitive=True
+    )
+    repository = Resource("repository", __name__, scope=Scope.CONTAINER)
+    session = Resource("session", __name__)
+
+    provide_connection(container, log, config, connection, repository, session)
+
+    with container.context(thread_safe=True) as context:
+        parent = context.resolve(repository)[0]
+        shared = context.resolve(config)
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            try:
+                forked = context.resolve(repository)[0]
+                ok = (
+                    forked is not parent
+                    and forked.pid == os.getpid()
+                    and shared is context.resolve(config)
+                    and ["connect", "connect"] == log
+                )
+                context.drain()
+                ok = ok and ["connect", "connect", "disconnect"] == log
+                os.write(write, b"ok" if ok else b"no")
+            finally:
+                os._exit(0)
+        os.close(write)
+        with os.fdopen(read, "rb") as f:
+            assert b"ok" == f.read()
+        os.waitpid(pid, 0)
+        assert parent is context.resolve(repository)[0]
+    assert ["connect", "disconnect"] == log
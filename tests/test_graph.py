@@ -0,0 +1,94 @@
+import pytest
+
+from autowire.container import Container
+from autowire.exc import CircularDependencyError
+from autowire.resource import Resource
+
+
+def test_dependency_graph():
+    config = Resource("config", __name__)
+    pool = Resource("pool", __name__)
+    cache = Resource("cache", __name__)
+    service = Resource("service", __name__)
+    missing = Resource("missing", __name__)
+
+    parent = Container()
+    child = Container(parent)
+
+    @cache.plain(config)
+    def get_cache(config):
+        pass  # pragma: no cover
+
+    parent.provide_constant(config, "config")
+
+    @parent.plain(pool, config, missing)
+    def get_pool(config, missing):
+        pass  # pragma: no cover
+
+    @child.plain(service, pool, cache=cache)
+    def get_service(pool, *, cache):
+        pass  # pragma: no cover
+
+    graph = child.dependency_graph()
+    assert {
+        config: (),
+        pool: (config, missing),
+        cache: (config,),
+        service: (pool, cache),
+    } == graph.dependencies
+    assert {missing} == graph.missing
+    assert graph.find_cycle() is None
+    assert graph is child.dependency_graph()
+    child.check_cycles()
+
+    # Resources provided to children are not included in parents
+    assert service not in parent.dependency_graph()
+
+    # The graph is built again after providing to ancestors
+    parent.provide_constant(missing, "missing")
+    assert graph is not child.dependency_graph()
+    assert not child.dependency_graph().missing
+
+
+def test_check_cycles():
+    resources = [Resource(f"r{i}", __name__) for i in range(5)]
+
+    container = Container()
+
+    # r0 -> r1 -> r2 -> r3 -> r4 -> r2
+    for resource, dependency in zip(resources, resources[1:]):
+        container.plain(resource, dependency)(lambda value: value)
+    container.plain(resources[4], resources[2])(lambda value: value)
+
+    with pytest.raises(CircularDependencyError) as excinfo:
+        container.check_cycles()
+    assert (
+        tuple(
+            resource.canonical_name
+            for resource in resources[2:] + resources[2:3]
+        )
+        == excinfo.value.path
+    )
+    assert "r2 -> " in str(excinfo.value)
+
+    # Self dependency
+    container.plain(resources[4], resources[4])(lambda value: value)
+    with pytest.raises(CircularDependencyError) as excinfo:
+        container.check_cycles()
+    assert 2 == len(excinfo.value.path)
+
+    container.provide_constant(resources[4], "r4")
+    container.check_cycles()
+
+
+def test_check_cycles_linear():
+    # Long chains should neither recurse nor take quadratic time
+    resources = [Resource(f"r{i}", __name__) for i in range(20000)]
+
+    container = Container()
+    container.provide_constant(resources[-1], "last")
+    for resource, dependency in zip(resources, resources[1:]):
+        container.plain(resource, dependency)(lambda value: value)
+
+    container.check_cycles()
+    assert 20000 == len(container.dependency_graph())
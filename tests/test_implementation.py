@@ -38,6 +38,10 @@ def test_plain():
     with implementation.reify(resource_c, MockProvider()) as c:
         assert "foo.bar.baz" == c
 
+    # Plain functions are called directly without context managers
+    assert not implementation.managed
+    assert "foo.bar.baz" == implementation.create(resource_c, MockProvider())
+
 
 def test_contextual():
     """
@@ -68,6 +72,7 @@ def test_contextual():
     )
     with implementation.reify(resource_c, MockProvider()) as c:
         assert "foo.bar.baz" == c
+    assert implementation.managed
 
 
 def test_constant():
@@ -88,3 +93,5 @@ def test_constant():
     implementation = ConstantImplementation(value)
     with implementation.reify(resource, MockProvider()) as reified:
         assert value == reified
+    assert not implementation.managed
+    assert value is implementation.create(resource, MockProvider())
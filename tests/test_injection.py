@@ -0,0 +1,137 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from autowire import inject
+from autowire.container import Container
+from autowire.injection import find_injection
+from autowire.resource import Resource
+
+
+def provide_db(container, config, db):
+    container.provide_constant(config, "config")
+    container.plain(db, config)(lambda config: f"db.{config}")
+
+
+def test_call():
+    container = Container()
+
+    config = Resource("config", __name__)
+    db = Resource("db", __name__)
+
+    provide_db(container, config, db)
+
+    @inject(config, db=db)
+    def handle(config, request, *, db, verbose=False):
+        return (config, request, db, verbose)
+
+    with container.context() as context:
+        assert ("config", "request", "db.config", False) == context.call(
+            handle, "request"
+        )
+        assert ("config", "request", "db.config", True) == context.call(
+            handle, "request", verbose=True
+        )
+        # Resources to be injected are computed once for the function
+        assert (config, db) == find_injection(handle).resources
+
+    # Functions are left as is
+    assert ("c", "r", "d", False) == handle("c", "r", db="d")
+
+    def not_injected():
+        pass  # pragma: no cover
+
+    with container.context() as context:
+        with pytest.raises(TypeError):
+            context.call(not_injected)
+
+    # Plans are invalidated as usual
+    container.provide_constant(config, "other")
+    with container.context() as context:
+        assert "db.other" == context.call(handle, "request")[2]
+
+
+def test_acall():
+    container = Container()
+
+    config = Resource("config", __name__)
+    db = Resource("db", __name__)
+    session = Resource("session", __name__)
+
+    provide_db(container, config, db)
+
+    @container.async_contextual(session, config)
+    @contextlib.asynccontextmanager
+    async def with_session(config):
+        yield f"session.{config}"
+
+    @inject(session=session, db=db)
+    async def fetch(url, *, session, db):
+        await asyncio.sleep(0)
+        return (url, session, db)
+
+    @inject(session)
+    def get_session(session):
+        return session
+
+    @inject(db=db)
+    async def query(*, db):
+        return db
+
+    async def main():
+        async with container.async_context() as context:
+            assert ("url", "session.config", "db.config") == (
+                await context.acall(fetch, "url")
+            )
+            assert "session.config" == await context.acall(get_session)
+        # Coroutine functions can be called synchronously, to be awaited
+        with container.context() as context:
+            assert "db.config" == await context.call(query)
+
+    asyncio.run(main())
+
+
+def test_call_explicit():
+    container = Container()
+
+    config = Resource("config", __name__)
+    db = Resource("db", __name__)
+
+    provide_db(container, config, db)
+
+    @inject(config, db=db)
+    def handle(config, request, db=None):
+        return (config, request, db)
+
+    @inject(db=db)
+    def query(sql, db):
+        return (sql, db)
+
+    async def main():
+        async with container.async_context() as context:
+            assert ("config", "r", "mock") == await context.acall(
+                handle, "r", db="mock"
+            )
+            assert ("mock", "r", "db.config") == await context.acall(
+                handle, "r", config="mock"
+            )
+
+    with container.context() as context:
+        # Explicit arguments win over injected ones
+        assert ("config", "r", "mock") == context.call(handle, "r", db="mock")
+        assert ("config", "r", "mock") == context.call(handle, "r", "mock")
+        # Not resolved when given
+        assert db not in context.resource_pool
+        assert ("mock", "r", "db.config") == context.call(
+            handle, "r", config="mock"
+        )
+        assert ("mock", "r", "d") == context.call(
+            handle, "r", "d", config="mock"
+        )
+        assert ("select", "mock") == context.call(query, "select", "mock")
+        assert ("select", "db.config") == context.call(query, "select")
+        with pytest.raises(TypeError):
+            context.call(handle, "r", "d", "e", config="mock")
+
+    asyncio.run(main())
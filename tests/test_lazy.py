@@ -0,0 +1,277 @@
+import asyncio
+import contextlib
+import pickle
+
+import pytest
+
+from autowire import inject
+from autowire.container import Container
+from autowire.exc import ResourceNotProvidedError, ValidationError
+from autowire.lazy import Deferred, Lazy
+from autowire.resource import Resource
+from autowire.scope import Scope
+
+
+def provide_db(container, db, log):
+    @container.contextual(db)
+    @contextlib.contextmanager
+    def with_db():
+        log.append("open")
+        yield "db"
+        log.append("close")
+
+
+def test_lazy():
+    db = Resource("db", __name__)
+    service = Resource("service", __name__)
+    log = []
+
+    container = Container()
+
+    provide_db(container, db, log)
+
+    @container.plain(service, db=Lazy(db))
+    def get_service(*, db):
+        return db
+
+    with container.context() as context:
+        deferred = context.resolve(service)
+        assert isinstance(deferred, Deferred)
+        assert not deferred.resolved
+        assert [] == log
+
+        assert "db" == deferred()
+        assert deferred.resolved
+        assert ["open"] == log
+        # Pooled in the context as usual
+        assert "db" == context.resolve(db)
+        assert "db" == deferred()
+        assert ["open"] == log
+
+    assert ["open", "close"] == log
+
+    # Unused resources are never created
+    log.clear()
+    with container.context() as context:
+        context.resolve(service)
+    assert [] == log
+
+
+def test_lazy_in_child():
+    db = Resource("db", __name__)
+    service = Resource("service", __name__)
+    log = []
+
+    container = Container()
+
+    provide_db(container, db, log)
+
+    @container.plain(service, db=Lazy(db))
+    def get_service(*, db):
+        return db
+
+    with container.context() as context:
+        with context.child() as child:
+            deferred = child.resolve(service)
+            assert "db" == deferred()
+            assert db in child.resource_pool
+            assert db not in context.resource_pool
+            assert ["open"] == log
+        assert ["open", "close"] == log
+
+        # Resources pooled by ancestors are found first
+        context.resolve(db)
+        with context.child() as child:
+            assert "db" == child.resolve(service)()
+            assert db not in child.resource_pool
+        assert ["open", "close", "open"] == log
+
+
+def test_lazy_container_scope():
+    db = Resource("db", __name__)
+    root_service = Resource("root_service", __name__, scope=Scope.CONTAINER)
+    log = []
+
+    container = Container()
+
+    provide_db(container, db, log)
+
+    @container.plain(root_service, Lazy(db))
+    def get_root_service(db):
+        return db
+
+    with container.context() as context:
+        with context.child() as child:
+            assert "db" == child.resolve(root_service)()
+        # Resolved by the root context like eager dependencies
+        assert db in context.resource_pool
+        assert ["open"] == log
+
+
+def test_lazy_thread_safe():
+    db = Resource("db", __name__)
+    service = Resource("service", __name__)
+    log = []
+
+    container = Container()
+
+    provide_db(container, db, log)
+
+    @container.plain(service, db=Lazy(db))
+    def get_service(*, db):
+        return db
+
+    with container.context(thread_safe=True) as context:
+        deferred = context.resolve(service)
+        assert "db" == deferred()
+        assert ["open"] == log
+
+
+def test_lazy_cycle():
+    service = Resource("service", __name__)
+    handler = Resource("handler", __name__)
+
+    container = Container()
+
+    @container.plain(service, Lazy(handler))
+    def get_service(handler):
+        return handler
+
+    @container.plain(handler, service)
+    def get_handler(service):
+        return ("handler", service)
+
+    # Lazy dependencies can refer back to their dependents
+    container.check_cycles()
+    with container.context() as context:
+        deferred = context.resolve(handler)[1]
+        assert ("handler", deferred) == deferred()
+
+
+def test_lazy_not_provided():
+    db = Resource("db", __name__)
+    service = Resource("service", __name__)
+
+    container = Container()
+
+    @container.plain(service, Lazy(db))
+    def get_service(db):
+        return db
+
+    with pytest.raises(ValidationError) as exc_info:
+        container.validate()
+    assert (db.canonical_name,) == exc_info.value.missing
+
+    with container.context() as context:
+        deferred = context.resolve(service)
+        with pytest.raises(ResourceNotProvidedError):
+            deferred()
+
+
+def test_lazy_injection():
+    db = Resource("db", __name__)
+    log = []
+
+    container = Container()
+
+    provide_db(container, db, log)
+
+    @inject(db=Lazy(db))
+    def handle(flag, *, db):
+        return db() if flag else None
+
+    with container.context() as context:
+        assert context.call(handle, False) is None
+        assert [] == log
+        assert "db" == context.call(handle, True)
+        assert ["open"] == log
+
+
+def test_lazy_async():
+    db = Resource("db", __name__)
+    service = Resource("service", __name__)
+    log = []
+
+    container = Container()
+
+    provide_db(container, db, log)
+
+    @container.plain(service, db=Lazy(db))
+    def get_service(*, db):
+        return db
+
+    async def main():
+        async with container.async_context() as context:
+            deferred = await context.aresolve(service)
+            assert [] == log
+            assert "db" == deferred()
+            assert ["open"] == log
+
+    asyncio.run(main())
+    assert ["open", "close"] == log
+
+
+def test_lazy_resource():
+    db = Resource("db", __name__)
+
+    lazy = Lazy(db)
+    assert lazy == Lazy(db)
+    assert hash(lazy) == hash(Lazy(db))
+    assert lazy != db
+    assert db is lazy.resource
+    assert lazy == pickle.loads(pickle.dumps(lazy))
+
+
+def test_lazy_reify():
+    db = Resource("db", __name__)
+
+    container = Container()
+    container.plain(db)(lambda: "db")
+    lazy = Lazy(db)
+    implementation = container.find_implementation(lazy)
+
+    with container.context() as context:
+        with implementation.reify(lazy, context) as deferred:
+            assert isinstance(deferred, Deferred)
+            assert "db" == deferred()
+
+
+def test_lazy_release_order():
+    db = Resource("db", __name__)
+    service = Resource("service", __name__)
+    log = []
+
+    container = Container()
+
+    state = {"open": False}
+
+    @container.contextual(db)
+    @contextlib.contextmanager
+    def with_db():
+        log.append("db up")
+        state["open"] = True
+        yield "db"
+        state["open"] = False
+        log.append("db down")
+
+    @container.contextual(service, Lazy(db))
+    @contextlib.contextmanager
+    def with_service(db):
+        log.append("service up")
+        yield db
+        db()
+        log.append(f"service down, db open={state['open']}")
+
+    for drain in ("drain", "drain_concurrently"):
+        log.clear()
+        context = container.context().__enter__()
+        assert "db" == context.resolve(service)()
+        # Pooled as if the dependency was created first
+        assert [db, service] == list(context.resource_pool)
+        getattr(context, drain)()
+        assert [
+            "service up",
+            "db up",
+            "service down, db open=True",
+            "db down",
+        ] == log
@@ -0,0 +1,249 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from autowire.cache import LRUCachePolicy
+from autowire.container import Container
+from autowire.implementation import Implementation
+from autowire.metrics import Histogram, Metrics
+from autowire.profiler import Profiler
+from autowire.resource import Resource
+
+
+def test_histogram():
+    histogram = Histogram([0.1, 1.0])
+    for seconds in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(seconds)
+    assert [2, 3, 4] == histogram.cumulative()
+    assert 4 == histogram.count
+    assert {0.1: 2, 1.0: 3, float("inf"): 4} == histogram.as_dict()["buckets"]
+
+
+def test_metrics():
+    config = Resource("config", __name__)
+    pool = Resource("pool", __name__)
+    session = Resource("session", __name__)
+    broken = Resource("broken", __name__)
+    opaque = Resource("opaque", __name__)
+
+    container = Container()
+    container.provide_constant(config, {})
+
+    @container.contextual(pool, config)
+    @contextlib.contextmanager
+    def create_pool(config):
+        yield "pool"
+
+    @container.contextual(session, pool)
+    @contextlib.contextmanager
+    def create_session(pool):
+        yield "session"
+
+    @container.contextual(broken)
+    @contextlib.contextmanager
+    def create_broken():
+        yield "broken"
+        raise ValueError("broken")
+
+    class OpaqueImplementation(Implementation):
+        def reify(self, resource, context):
+            return contextlib.nullcontext(context.resolve(config))
+
+    container.provide(opaque, OpaqueImplementation())
+    metrics = Metrics(timings=True)
+
+    with container.context(metrics=metrics) as context:
+        context.resolve(pool)
+        for _ in range(3):
+            with context.child() as child:
+                child.resolve(session)
+        context.resolve(opaque)
+        context.resolve(broken)
+        # Children only looked up the one in the root
+        assert 1 == metrics.as_dict()[pool.canonical_name]["live"]
+        with pytest.raises(ValueError):
+            context.drain()
+
+    snapshot = metrics.as_dict()
+    pool_metrics = snapshot[pool.canonical_name]
+    # Once by itself, and three times as the dependency of sessions
+    assert 4 == pool_metrics["resolves"]
+    assert 3 == pool_metrics["hits"]
+    assert 1 == pool_metrics["created"]
+    assert 0 == pool_metrics["live"]
+    assert 1 == pool_metrics["released"]
+    assert 1 == pool_metrics["reify_seconds"]["count"]
+    assert 1 == pool_metrics["enter_seconds"]["count"]
+
+    session_metrics = snapshot[session.canonical_name]
+    assert 3 == session_metrics["created"]
+    assert 3 == session_metrics["released"]
+    assert 0 == session_metrics["hits"]
+
+    assert 0 == snapshot[opaque.canonical_name]["live"]
+    assert 1 == snapshot[broken.canonical_name]["exit_errors"]
+    # Constants have nothing to release
+    assert 1 == snapshot[config.canonical_name]["created"]
+    assert 0 == snapshot[config.canonical_name]["live"]
+    assert 0 == snapshot[config.canonical_name]["enter_seconds"]["count"]
+
+    metrics.reset()
+    assert {} == metrics.as_dict()
+
+
+def test_metrics_with_observer():
+    pool = Resource("pool", __name__)
+
+    container = Container()
+
+    @container.contextual(pool)
+    @contextlib.contextmanager
+    def create_pool():
+        yield "pool"
+
+    metrics = Metrics()
+    profiler = Profiler()
+
+    with container.context(observer=profiler, metrics=metrics) as context:
+        with context.child() as child:
+            child.resolve(pool)
+            child.resolve(pool)
+
+    assert {
+        "resolves": 2,
+        "hits": 1,
+        "created": 1,
+        "live": 0,
+        "released": 1,
+    }.items() <= metrics.as_dict()[pool.canonical_name].items()
+    assert 1 == profiler.profiles[pool.canonical_name].created
+
+
+def test_metrics_cached():
+    policy = LRUCachePolicy(2)
+    config = Resource("config", __name__)
+    model = Resource("model", __name__, cache=policy)
+    table = Resource("table", __name__, cache=policy)
+    service = Resource("service", __name__)
+
+    container = Container()
+    container.provide_constant(config, {})
+    container.plain(model)(lambda: "model")
+    container.plain(table, config)(lambda config: "table")
+    container.plain(service, model, table)(lambda model, table: "service")
+
+    metrics = Metrics()
+
+    with container.context(metrics=metrics) as context:
+        for _ in range(5):
+            context.resolve(model)
+            context.resolve(table)
+        with context.child() as child:
+            child.resolve(service)
+
+    snapshot = metrics.as_dict()
+    # Found in the cache rather than the resource pool
+    for resource in (model, table):
+        assert {
+            "resolves": 6,
+            "hits": 5,
+            "created": 1,
+        }.items() <= snapshot[resource.canonical_name].items()
+
+    metrics.reset()
+
+    async def main():
+        async with container.async_context(metrics=metrics) as context:
+            for _ in range(5):
+                await context.aresolve(table)
+
+    asyncio.run(main())
+    assert {
+        "resolves": 5,
+        "hits": 4,
+        "created": 1,
+    }.items() <= metrics.as_dict()[table.canonical_name].items()
+
+
+def test_metrics_async():
+    pool = Resource("pool", __name__)
+    connection = Resource("connection", __name__)
+    broken = Resource("broken", __name__)
+
+    container = Container()
+    container.plain(pool)(lambda: "pool")
+
+    @container.async_contextual(connection, pool)
+    @contextlib.asynccontextmanager
+    async def connect(pool):
+        yield "connection"
+
+    @container.contextual(broken)
+    @contextlib.contextmanager
+    def create_broken():
+        yield "broken"
+        raise ValueError("broken")
+
+    metrics = Metrics()
+
+    async def main():
+        async with container.async_context(metrics=metrics) as context:
+            await context.aresolve(connection)
+            await context.aresolve(connection)
+            context.resolve(broken)
+            with pytest.raises(ValueError):
+                await context.adrain()
+
+    asyncio.run(main())
+    snapshot = metrics.as_dict()
+    assert 2 == snapshot[connection.canonical_name]["resolves"]
+    assert 1 == snapshot[connection.canonical_name]["created"]
+    assert 1 == snapshot[connection.canonical_name]["released"]
+    assert 1 == snapshot[pool.canonical_name]["created"]
+    assert 1 == snapshot[broken.canonical_name]["exit_errors"]
+
+
+def test_prometheus_text():
+    pool = Resource("pool", __name__)
+
+    container = Container()
+
+    @container.contextual(pool)
+    @contextlib.contextmanager
+    def create_pool():
+        yield "pool"
+
+    metrics = Metrics(buckets=[0.5, 0.1], timings=True)
+
+    with container.context(metrics=metrics) as context:
+        context.resolve(pool)
+
+    text = metrics.prometheus_text()
+    lines = text.splitlines()
+    name = pool.canonical_name
+    assert "# TYPE autowire_resolves_total counter" in lines
+    assert f'autowire_resolves_total{{resource="{name}"}} 1' in lines
+    assert f'autowire_live{{resource="{name}"}} 0' in lines
+    assert "# TYPE autowire_reify_seconds histogram" in lines
+    assert (
+        f'autowire_reify_seconds_bucket{{resource="{name}",le="+Inf"}} 1'
+        in lines
+    )
+    assert f'autowire_reify_seconds_count{{resource="{name}"}} 1' in lines
+    bounds = [
+        line.split('le="')[1].split('"')[0]
+        for line in lines
+        if line.startswith(f'autowire_enter_seconds_bucket{{resource="{name}"')
+    ]
+    assert ["0.1", "0.5", "+Inf"] == bounds
+    assert text.endswith("\n")
+
+    # Creations are only counted without timings
+    metrics = Metrics()
+    with container.context(metrics=metrics) as context:
+        context.resolve(pool)
+    assert "reify_seconds" not in metrics.as_dict()[name]
+    lines = metrics.prometheus_text().splitlines()
+    assert f'autowire_created_total{{resource="{name}"}} 1' in lines
+    assert "# TYPE autowire_reify_seconds histogram" not in lines
@@ -0,0 +1,131 @@
+import contextlib
+
+import pytest
+
+from autowire.container import Container
+from autowire.exc import CircularDependencyError
+from autowire.implementation import Implementation
+from autowire.plan import compile_plan
+from autowire.resource import Resource
+
+
+def test_compile():
+    """
+    Test for topological order of plan steps
+
+    """
+    config = Resource("config", __name__)
+    pool = Resource("pool", __name__)
+    cache = Resource("cache", __name__)
+    service = Resource("service", __name__)
+
+    container = Container()
+    container.provide_constant(config, {})
+
+    @container.plain(pool, config)
+    def get_pool(config):
+        return "pool"
+
+    @container.plain(cache, config)
+    def get_cache(config):
+        return "cache"
+
+    @container.plain(service, pool, cache=cache)
+    def get_service(pool, *, cache):
+        return "service"
+
+    plan = compile_plan(container, service)
+
+    assert [config, pool, cache, service] == [step.resource for step in plan]
+    assert service == plan.resource
+    assert (1,) == plan.steps[-1].arg_slots
+    assert (("cache", 2),) == plan.steps[-1].kwarg_slots
+    assert (1, 2) == plan.steps[-1].dependency_slots
+
+
+def test_opaque_implementation():
+    """
+    Test for implementations that resolve dependencies by themselves
+
+    """
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+
+    container = Container()
+    container.provide_constant(bar, "bar")
+
+    class OpaqueImplementation(Implementation):
+        @contextlib.contextmanager
+        def reify(self, resource, provider):
+            yield "foo." + provider.resolve(bar)
+
+    container.provide(foo, OpaqueImplementation())
+
+    plan = compile_plan(container, foo)
+    assert [foo] == [step.resource for step in plan]
+    assert plan.steps[0].factory is None
+
+    with container.context() as context:
+        assert "foo.bar" == context.resolve(foo)
+
+
+def test_circular_dependency():
+    foo = Resource("foo", __name__)
+    bar = Resource("bar", __name__)
+
+    container = Container()
+
+    @container.plain(foo, bar)
+    def get_foo(bar):
+        pass  # pragma: no cover
+
+    @container.plain(bar, foo)
+    def get_bar(foo):
+        pass  # pragma: no cover
+
+    with pytest.raises(CircularDependencyError) as excinfo:
+        compile_plan(container, foo)
+    assert (
+        f"{__name__}.foo",
+        f"{__name__}.bar",
+        f"{__name__}.foo",
+    ) == excinfo.value.path
+    # Still a RecursionError for compatibility
+    assert isinstance(excinfo.value, RecursionError)
+
+
+def test_skip_dependencies_of_pooled():
+    """
+    Dependencies of pooled resources must not be created again
+
+    """
+    base = Resource("base", __name__)
+    middle = Resource("middle", __name__)
+    top = Resource("top", __name__)
+
+    container = Container()
+
+    created = []
+
+    @container.plain(base)
+    def get_base():
+        created.append("base")
+        return "base"
+
+    @container.plain(middle, base)
+    def get_middle(base):
+        created.append("middle")
+        return "middle"
+
+    @container.plain(top, middle)
+    def get_top(middle):
+        created.append("top")
+        return "top"
+
+    with container.context(preload=[middle]) as parent:
+        with parent.child() as child:
+            # Drop base from the parent so that only middle is pooled
+            parent.resource_pool.pop(base)
+            assert "top" == child.resolve(top)
+            assert middle not in child.resource_pool
+    assert ["base", "middle", "top"] == created
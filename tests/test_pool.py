@@ -0,0 +1,255 @@
+import asyncio
+import contextlib
+import itertools
+import threading
+import time
+
+import pytest
+
+from autowire.container import Container
+from autowire.exc import PoolExhaustedError
+from autowire.pool import PooledImplementation
+from autowire.resource import Resource
+
+
+def provide_sessions(container, config, session, log, **kwargs):
+    container.provide_constant(config, "config")
+    count = itertools.count(1)
+
+    @contextlib.contextmanager
+    def open_session(config):
+        name = f"session{next(count)}.{config}"
+        log.append(f"open {name}")
+        yield {"name": name, "dirty": False}
+        log.append(f"close {name}")
+
+    impl = PooledImplementation(open_session, (config,), **kwargs)
+    container.provide(session, impl)
+    return impl
+
+
+def test_pool():
+    container = Container()
+
+    log = []
+
+    config = Resource("config", __name__)
+    session = Resource("session", __name__)
+
+    def reset(session):
+        session.update(dirty=False)
+
+    impl = provide_sessions(container, config, session, log, reset=reset)
+
+    with container.context() as context:
+        for _ in range(3):
+            with context.child() as child:
+                value = child.resolve(session)
+                assert "session1.config" == value["name"]
+                assert not value["dirty"]
+                value["dirty"] = True
+        # Returned instead of being released
+        assert ["open session1.config"] == log
+
+        with context.child() as first, context.child() as second:
+            assert first.resolve(session) is not second.resolve(session)
+            assert 2 == impl.size
+            assert 0 == impl.idle
+        assert 2 == impl.idle
+
+    assert {
+        "hits": 3,
+        "misses": 2,
+        "waits": 0,
+        "timeouts": 0,
+        "created": 2,
+        "closed": 0,
+        "unhealthy": 0,
+    } == impl.stats.as_dict()
+
+    impl.close()
+    assert 0 == impl.size
+    assert ["close session2.config", "close session1.config"] == log[-2:]
+    with container.context() as context:
+        with pytest.raises(RuntimeError):
+            context.resolve(session)
+
+
+def test_pool_health():
+    container = Container()
+
+    log = []
+
+    config = Resource("config", __name__)
+    session = Resource("session", __name__)
+
+    def check(session):
+        return not session["dirty"]
+
+    impl = provide_sessions(container, config, session, log, check=check)
+
+    with container.context() as context:
+        context.resolve(session)["dirty"] = True
+    with container.context() as context:
+        assert "session2.config" == context.resolve(session)["name"]
+    assert ["close session1.config"] == log[1:2]
+    assert 1 == impl.stats.unhealthy
+    assert 1 == impl.size
+
+    def reset(session):
+        raise ValueError()
+
+    impl.reset = reset
+    with container.context() as context:
+        context.resolve(session)
+    assert 0 == impl.size
+    assert "close session2.config" == log[-1]
+
+
+def test_pool_idle():
+    container = Container()
+
+    log = []
+
+    config = Resource("config", __name__)
+    session = Resource("session", __name__)
+
+    impl = provide_sessions(container, config, session, log, max_idle=0.05)
+
+    with container.context() as context:
+        with context.child() as first, context.child() as second:
+            first.resolve(session)
+            second.resolve(session)
+    assert 2 == impl.idle
+
+    impl.prune()
+    assert 2 == impl.idle
+    time.sleep(0.1)
+    # Expired instances are released when the pool is used
+    with container.context() as context:
+        assert "session3.config" == context.resolve(session)["name"]
+        assert 1 == impl.size
+    assert 2 == impl.stats.closed
+
+
+def test_pool_wait():
+    container = Container()
+
+    log = []
+
+    config = Resource("config", __name__)
+    session = Resource("session", __name__)
+
+    impl = provide_sessions(
+        container, config, session, log, max_size=1, timeout=0.05
+    )
+
+    with container.context(thread_safe=True) as context:
+        with context.child() as first:
+            value = first.resolve(session)
+            with context.child() as second:
+                with pytest.raises(PoolExhaustedError):
+                    second.resolve(session)
+            assert 1 == impl.stats.timeouts
+
+            impl.timeout = None
+            resolved = []
+
+            def resolve():
+                with context.child() as child:
+                    resolved.append(child.resolve(session))
+
+            thread = threading.Thread(target=resolve)
+            thread.start()
+            while not impl.stats.waits > 1:
+                time.sleep(0.001)
+            assert not resolved
+        # Waiting context gets the instance returned by the first one
+        thread.join()
+        assert [value] == resolved
+    assert 1 == impl.stats.created
+    # Counted once for each acquisition however many times it woke up
+    assert 2 == impl.stats.waits
+
+
+def test_pool_async_wait():
+    container = Container()
+    session = Resource("session", __name__)
+    count = 0
+
+    @contextlib.contextmanager
+    def open_session():
+        nonlocal count
+        count += 1
+        yield f"session{count}"
+
+    impl = PooledImplementation(open_session, max_size=1, timeout=1.0)
+    container.provide(session, impl)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    async def handle(context):
+        async with context.async_child() as child:
+            value = await child.aresolve(session)
+            await asyncio.sleep(0.05)
+            return value
+
+    async def main():
+        ticker = asyncio.ensure_future(tick())
+        async with container.async_context() as context:
+            start = time.monotonic()
+            results = await asyncio.gather(
+                *[handle(context) for _ in range(3)]
+            )
+            # Others waited for the first one to return the instance, without
+            # blocking the event loop
+            assert ["session1"] * 3 == results
+            assert time.monotonic() - start < 0.5
+            assert ticks > 10
+
+            impl.timeout = 0.05
+            async with context.async_child() as first:
+                await first.aresolve(session)
+                async with context.async_child() as second:
+                    with pytest.raises(PoolExhaustedError):
+                        await second.aresolve(session)
+        ticker.cancel()
+
+    asyncio.run(main())
+    assert 1 == impl.stats.created
+    assert 1 == impl.stats.timeouts
+    # Counted once for each acquisition, though the last one of gathered
+    # ones was woken up twice
+    assert 3 == impl.stats.waits
+
+
+def test_pool_async_dependencies():
+    container = Container()
+    config = Resource("config", __name__)
+    session = Resource("session", __name__)
+
+    @container.async_contextual(config)
+    @contextlib.asynccontextmanager
+    async def load_config():
+        await asyncio.sleep(0)
+        yield "config"
+
+    @contextlib.contextmanager
+    def open_session(config):
+        yield f"session.{config}"
+
+    impl = PooledImplementation(open_session, (config,))
+    container.provide(session, impl)
+
+    async def main():
+        async with container.async_context() as context:
+            # Asynchronous dependencies are resolved on the event loop
+            assert "session.config" == await context.aresolve(session)
+
+    asyncio.run(main())
+    assert 1 == impl.stats.created
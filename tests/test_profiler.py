@@ -0,0 +1,177 @@
+import asyncio
+import contextlib
+import time
+
+from autowire.container import Container
+from autowire.observer import Observer
+from autowire.profiler import Profiler
+from autowire.resource import Resource
+
+
+class RecordingObserver(Observer):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def on_lookup(self, context, resource, hit, depth):
+        self.events.append(("lookup", resource.name, hit, depth))
+
+    def on_resolve_start(self, context, resource):
+        self.events.append(("start", resource.name))
+
+    def on_resolve_end(self, context, resource):
+        self.events.append(("end", resource.name))
+
+    def on_reify(self, context, resource, seconds):
+        assert seconds >= 0
+        self.events.append(("reify", resource.name))
+
+    def on_enter(self, context, resource, seconds):
+        assert seconds >= 0
+        self.events.append(("enter", resource.name))
+
+    def on_exit(self, context, resource, seconds):
+        assert seconds >= 0
+        self.events.append(("exit", resource.name))
+
+
+def provide_service(container, config, pool, service):
+    container.provide_constant(config, "config")
+
+    @container.contextual(pool, config)
+    @contextlib.contextmanager
+    def with_pool(config):
+        time.sleep(0.01)
+        yield "pool"
+
+    container.plain(service, pool)(lambda pool: "service")
+
+
+def test_observer():
+    container = Container()
+
+    config = Resource("config", __name__)
+    pool = Resource("pool", __name__)
+    service = Resource("service", __name__)
+
+    provide_service(container, config, pool, service)
+
+    observer = RecordingObserver()
+
+    with container.context(observer=observer) as context:
+        with context.child() as child:
+            child.resolve(service)
+            child.resolve(service)
+            assert [
+                ("lookup", "service", False, 1),
+                ("start", "service"),
+                ("lookup", "pool", False, 1),
+                ("lookup", "config", False, 1),
+                ("start", "config"),
+                ("reify", "config"),
+                ("end", "config"),
+                ("start", "pool"),
+                ("reify", "pool"),
+                ("enter", "pool"),
+                ("end", "pool"),
+                ("reify", "service"),
+                ("end", "service"),
+                ("lookup", "service", True, 0),
+            ] == observer.events
+            del observer.events[:]
+
+            context.resolve(config)
+            with child.child() as grandchild:
+                grandchild.resolve(pool)
+            assert [
+                ("lookup", "config", False, 0),
+                ("start", "config"),
+                ("reify", "config"),
+                ("end", "config"),
+                ("lookup", "pool", True, 1),
+            ] == observer.events
+            del observer.events[:]
+        # Only resources with teardown are exited
+        assert [("exit", "pool")] == observer.events
+
+
+def test_async_observer():
+    container = Container()
+
+    config = Resource("config", __name__)
+    pool = Resource("pool", __name__)
+    service = Resource("service", __name__)
+
+    provide_service(container, config, pool, service)
+
+    observer = RecordingObserver()
+
+    async def main():
+        async with container.async_context(observer=observer) as context:
+            await context.aresolve(service)
+
+    asyncio.run(main())
+    assert [
+        ("lookup", "service", False, 0),
+        ("start", "service"),
+        ("lookup", "pool", False, 0),
+        ("lookup", "config", False, 0),
+        ("start", "config"),
+        ("reify", "config"),
+        ("end", "config"),
+        ("start", "pool"),
+        ("reify", "pool"),
+        ("enter", "pool"),
+        ("end", "pool"),
+        ("reify", "service"),
+        ("end", "service"),
+        ("exit", "pool"),
+    ] == observer.events
+
+
+def test_profiler():
+    container = Container()
+
+    config = Resource("config", __name__)
+    pool = Resource("pool", __name__)
+    service = Resource("service", __name__)
+
+    provide_service(container, config, pool, service)
+
+    profiler = Profiler()
+
+    for _ in range(2):
+        with container.context(observer=profiler) as context:
+            context.resolve(service)
+            context.resolve(pool)
+
+    profile = profiler.profiles[pool.canonical_name]
+    assert 2 == profile.created
+    assert 2 == profile.exited
+    assert (2, 2) == (profile.hits, profile.misses)
+    assert profile.enter_seconds >= 0.02
+
+    report = profiler.report().splitlines()
+    assert report[0].startswith("resource ")
+    # Sorted by total time
+    assert report[1].startswith(pool.canonical_name)
+    assert 4 == len(report)
+    assert 2 == len(profiler.report(limit=1).splitlines())
+
+    stacks = dict(
+        line.rsplit(" ", 1)
+        for line in profiler.collapsed_stacks().splitlines()
+    )
+    assert {
+        service.canonical_name,
+        f"{service.canonical_name};{config.canonical_name}",
+        f"{service.canonical_name};{pool.canonical_name}",
+    } == set(stacks)
+    # Time of dependencies is not counted as self time of dependents
+    assert int(stacks[f"{service.canonical_name};{pool.canonical_name}"]) > (
+        int(stacks[service.canonical_name])
+    )
+
+    profiler.reset()
+    assert not profiler.profiles
+    assert "" == profiler.collapsed_stacks()
@@ -1,4 +1,5 @@
 import contextlib
+import pickle
 
 import pytest
 
@@ -105,3 +106,24 @@ def test_constant():
     impl = resource.default_implementation
     assert isinstance(impl, ConstantImplementation)
     assert impl.value == value
+
+
+def test_immutable():
+    """
+    Test for immutability of resources
+    """
+    wired = Resource("wired", "auto")
+
+    with pytest.raises(AttributeError):
+        wired.name = "tired"
+    with pytest.raises(AttributeError):
+        wired.canonical_name = "auto.tired"
+    with pytest.raises(AttributeError):
+        del wired.namespace
+    with pytest.raises(AttributeError):
+        wired.extra = "extra"
+
+    copied = pickle.loads(pickle.dumps(wired))
+    assert wired == copied
+    assert hash(wired) == hash(copied)
+    assert "auto.wired" == copied.canonical_name
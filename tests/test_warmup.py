@@ -0,0 +1,176 @@
+import asyncio
+import contextlib
+import threading
+import time
+
+import pytest
+
+from autowire.container import Container
+from autowire.resource import Resource
+from autowire.scope import Scope
+
+
+def test_eager_resources():
+    container = Container()
+
+    config = Resource("config", __name__)
+    templates = Resource(
+        "templates", __name__, scope=Scope.CONTAINER, eager=True
+    )
+    model = Resource("model", __name__, scope=Scope.CONTAINER, eager=True)
+
+    container.provide_constant(config, {})
+    container.plain(templates, config)(lambda config: "templates")
+    assert (templates,) == container.eager_resources()
+
+    child = Container(container)
+    child.plain(model)(lambda: "model")
+    assert {templates, model} == set(child.eager_resources())
+
+
+def test_warm_up():
+    config = Resource("config", __name__)
+    templates = Resource(
+        "templates", __name__, scope=Scope.CONTAINER, eager=True
+    )
+    model = Resource("model", __name__, scope=Scope.CONTAINER, eager=True)
+    release = threading.Event()
+    log = []
+
+    container = Container()
+    container.provide_constant(config, {})
+
+    @container.contextual(templates, config)
+    @contextlib.contextmanager
+    def load_templates(config):
+        log.append("load templates")
+        release.wait()
+        yield "templates"
+        log.append("unload templates")
+
+    @container.plain(model)
+    def load_model():
+        log.append("load model")
+        return "model"
+
+    with container.context(warm_up=True) as context:
+        warming = context.warming
+        assert context.thread_safe
+        assert 2 == warming.total
+        assert not warming.ready
+
+        # Waits for the resource being created
+        resolved = []
+        with context.child() as child:
+            thread = threading.Thread(
+                target=lambda: resolved.append(child.resolve(templates))
+            )
+            thread.start()
+            assert templates.canonical_name in warming.pending
+            release.set()
+            thread.join()
+        assert ["templates"] == resolved
+
+        assert warming.join()
+        assert 1.0 == warming.progress
+        assert {
+            "ready": True,
+            "total": 2,
+            "completed": 2,
+            "pending": [],
+            "failed": [],
+        } == warming.as_dict()
+    assert ["load model", "load templates", "unload templates"] == sorted(log)
+    assert 1 == log.count("load templates")
+
+
+def test_warm_up_failure():
+    broken = Resource("broken", __name__, eager=True)
+    error = ValueError("broken")
+    attempts = []
+
+    container = Container()
+
+    @container.plain(broken)
+    def create():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise error
+        return "fixed"
+
+    with container.context(thread_safe=True) as context:
+        warming = context.warm_up(max_workers=1)
+        assert not warming.join()
+        assert warming.done
+        assert {broken.canonical_name: error} == warming.failed
+        # Created again when it is resolved
+        assert "fixed" == context.resolve(broken)
+
+    with pytest.raises(ValueError):
+        with container.context() as context:
+            context.warm_up()
+
+
+def test_warm_up_drain():
+    templates = Resource(
+        "templates", __name__, scope=Scope.CONTAINER, eager=True
+    )
+    model = Resource("model", __name__, scope=Scope.CONTAINER, eager=True)
+    started = threading.Event()
+    release = threading.Event()
+    log = []
+
+    container = Container()
+
+    @container.contextual(templates)
+    @contextlib.contextmanager
+    def load_templates():
+        started.set()
+        release.wait()
+        yield "templates"
+        log.append("unload templates")
+
+    container.plain(model)(lambda: log.append("load model"))
+
+    context = container.context(thread_safe=True).__enter__()
+    warming = context.warm_up([templates, model], max_workers=1)
+    started.wait()
+    drainer = threading.Thread(target=context.drain)
+    drainer.start()
+    while not warming.completed:
+        # Until the model is cancelled
+        time.sleep(0.001)
+    release.set()
+    drainer.join()
+
+    # Resources being created are released, and others are not created
+    assert ["unload templates"] == log
+    assert warming.done
+    assert not warming.ready
+
+
+def test_awarm_up():
+    templates = Resource(
+        "templates", __name__, scope=Scope.CONTAINER, eager=True
+    )
+    log = []
+    container = Container()
+
+    @container.async_contextual(templates)
+    @contextlib.asynccontextmanager
+    async def load_templates():
+        log.append("load templates")
+        await asyncio.sleep(0.01)
+        yield "templates"
+        log.append("unload templates")
+
+    async def main():
+        async with container.async_context(warm_up=True) as context:
+            warming = context.warming
+            assert not warming.done
+            assert "templates" == await context.aresolve(templates)
+            assert await warming.ajoin()
+            assert ["load templates"] == log
+
+    asyncio.run(main())
+    assert ["load templates", "unload templates"] == log